@@ -0,0 +1,19 @@
+"""
+Users looked up by id for authentication, cached per worker and in Redis (blog.local_cache).
+
+Saving or deleting a user invalidates its entry (see signals). Bulk updates
+skip the signals, so a cached user's followers_count may lag behind; nothing
+reads it from here.
+"""
+import copy
+
+from blog.local_cache import TieredCache
+from .models import User
+
+users = TieredCache('user')
+
+
+def get_user(user_id):
+    """Return a copy of the user, safe to modify for the current request, or None."""
+    user = users.get(user_id, lambda: User.objects.filter(pk=user_id).first())
+    return copy.copy(user) if user is not None else None
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand, CommandError
+from authentication.models import User
+from posts.deletion import delete_user
+
+
+class Command(BaseCommand):
+    help = "Delete a user with their posts, comments, likes and follows in batches"
+
+    def add_arguments(self, parser):
+        parser.add_argument('email')
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(email=options['email'])
+        except User.DoesNotExist:
+            raise CommandError(f"No user with email {options['email']}")
+
+        delete_user(user)
+        self.stdout.write(self.style.SUCCESS(f"Deleted {options['email']}"))
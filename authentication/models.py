@@ -25,6 +25,7 @@ class UserManager(BaseUserManager):
 class User(AbstractUser):
     email = models.EmailField(unique=True)
     username = models.CharField(max_length=150, unique=True, blank=True, null=True)
+    followers_count = models.PositiveIntegerField(default=0)
     
     objects = UserManager()
     
@@ -0,0 +1,6 @@
+from drf_spectacular.contrib.rest_framework_simplejwt import SimpleJWTScheme
+
+
+class CachedJWTScheme(SimpleJWTScheme):
+    """Document CachedJWTAuthentication like the JWTAuthentication it extends."""
+    target_class = 'authentication.authentication.CachedJWTAuthentication'
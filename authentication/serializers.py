@@ -1,6 +1,6 @@
 from rest_framework import serializers
 from django.contrib.auth import authenticate
-from django.db import transaction
+from django.db import IntegrityError, transaction
 from rest_framework_simplejwt.tokens import RefreshToken
 from .models import User
 
@@ -36,12 +36,13 @@ class UserSignupSerializer(serializers.ModelSerializer):
             with transaction.atomic():
                 user = User.objects.create_user(**validated_data)
                 return user
-        except Exception as e:
-            if 'email' in str(e) and 'Duplicate entry' in str(e):
-                raise serializers.ValidationError({
-                    'email': ['A user with this email already exists']
-                })
-            raise e
+        except IntegrityError:
+            if not User.objects.filter(email=validated_data['email']).exists():
+                raise
+            # Lost a race with a concurrent signup for the same email
+            raise serializers.ValidationError({
+                'email': ['A user with this email already exists']
+            })
 
 
 class UserLoginSerializer(serializers.Serializer):
@@ -74,12 +75,12 @@ class UserSerializer(serializers.ModelSerializer):
 class PasswordResetRequestSerializer(serializers.Serializer):
     email = serializers.EmailField()
     
-    def validate_email(self, value):
+    def validate(self, attrs):
         try:
-            User.objects.get(email=value)
+            attrs['user'] = User.objects.get(email=attrs['email'])
         except User.DoesNotExist:
-            raise serializers.ValidationError("No user found with this email address")
-        return value
+            raise serializers.ValidationError({'email': ["No user found with this email address"]})
+        return attrs
 
 
 class PasswordResetConfirmSerializer(serializers.Serializer):
@@ -91,11 +92,8 @@ class PasswordResetConfirmSerializer(serializers.Serializer):
     def validate(self, attrs):
         if attrs['new_password'] != attrs['confirm_password']:
             raise serializers.ValidationError("Passwords don't match")
-        return attrs
-    
-    def validate_email(self, value):
         try:
-            User.objects.get(email=value)
+            attrs['user'] = User.objects.get(email=attrs['email'])
         except User.DoesNotExist:
-            raise serializers.ValidationError("No user found with this email address")
-        return value
+            raise serializers.ValidationError({'email': ["No user found with this email address"]})
+        return attrs
@@ -3,7 +3,6 @@ from rest_framework.response import Response
 from rest_framework import status
 from rest_framework_simplejwt.tokens import RefreshToken
 from drf_spectacular.utils import extend_schema
-from .models import User
 from .serializers import (
     UserSignupSerializer, 
     UserLoginSerializer, 
@@ -17,6 +16,7 @@ from .utils import send_password_reset_otp
 
 class UserSignupView(APIView):
     serializer_class = UserSignupSerializer
+    throttle_scope = 'signup'
     @extend_schema(
         tags=['Auth'],
         summary="User Registration",
@@ -76,6 +76,7 @@ class UserSignupView(APIView):
 
 class UserLoginView(APIView):
     serializer_class = UserLoginSerializer
+    throttle_scope = 'login'
     @extend_schema(
         tags=['Auth'],
         summary="User Login",
@@ -182,6 +183,7 @@ class TokenRefreshView(APIView):
 
 class PasswordResetRequestView(APIView):
     serializer_class = PasswordResetRequestSerializer
+    throttle_scope = 'password_reset'
     @extend_schema(
         tags=['Auth'],
         summary="Request Password Reset",
@@ -202,7 +204,7 @@ class PasswordResetRequestView(APIView):
         serializer = PasswordResetRequestSerializer(data=request.data)
         if serializer.is_valid():
             email = serializer.validated_data['email']
-            user = User.objects.get(email=email)
+            user = serializer.validated_data['user']
             
             otp = PasswordResetOTP.create_otp(user)
             email_sent = send_password_reset_otp(user, otp.otp_code)
@@ -222,6 +224,7 @@ class PasswordResetRequestView(APIView):
 
 class PasswordResetConfirmView(APIView):
     serializer_class = PasswordResetConfirmSerializer
+    throttle_scope = 'password_confirm'
     @extend_schema(
         tags=['Auth'],
         summary="Confirm Password Reset",
@@ -240,41 +243,33 @@ class PasswordResetConfirmView(APIView):
     def post(self, request):
         serializer = PasswordResetConfirmSerializer(data=request.data)
         if serializer.is_valid():
-            email = serializer.validated_data['email']
+            user = serializer.validated_data['user']
             otp_code = serializer.validated_data['otp_code']
             new_password = serializer.validated_data['new_password']
             
-            try:
-                user = User.objects.get(email=email)
-                
-                otp = PasswordResetOTP.objects.filter(
-                    user=user,
-                    otp_code=otp_code,
-                    is_used=False
-                ).first()
-                
-                if not otp:
-                    return Response({
-                        'error': 'Invalid OTP code'
-                    }, status=status.HTTP_400_BAD_REQUEST)
-                
-                if not otp.is_valid():
-                    return Response({
-                        'error': 'OTP has expired. Please request a new one.'
-                    }, status=status.HTTP_400_BAD_REQUEST)
-                
-                user.set_password(new_password)
-                user.save()
-                otp.is_used = True
-                otp.save()
-                
+            otp = PasswordResetOTP.objects.filter(
+                user=user,
+                otp_code=otp_code,
+                is_used=False
+            ).first()
+            
+            if not otp:
                 return Response({
-                    'message': 'Password reset successfully'
-                }, status=status.HTTP_200_OK)
-                
-            except User.DoesNotExist:
+                    'error': 'Invalid OTP code'
+                }, status=status.HTTP_400_BAD_REQUEST)
+            
+            if not otp.is_valid():
                 return Response({
-                    'error': 'User not found'
+                    'error': 'OTP has expired. Please request a new one.'
                 }, status=status.HTTP_400_BAD_REQUEST)
+            
+            user.set_password(new_password)
+            user.save(update_fields=['password'])
+            otp.is_used = True
+            otp.save(update_fields=['is_used'])
+            
+            return Response({
+                'message': 'Password reset successfully'
+            }, status=status.HTTP_200_OK)
         
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
@@ -12,5 +12,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "blog.settings")
+# Persistent per-thread database connections leak under ASGI (see DB_POOL in settings)
+os.environ.setdefault("DJANGO_ASGI", "True")
 
 application = get_asgi_application()
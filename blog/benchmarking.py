@@ -0,0 +1,63 @@
+import statistics
+import uuid
+from datetime import timedelta
+
+from django.utils import timezone
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers."""
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize(timings_ms):
+    return {
+        'requests': len(timings_ms),
+        'mean_ms': round(statistics.mean(timings_ms), 3),
+        'p50_ms': round(percentile(timings_ms, 50), 3),
+        'p95_ms': round(percentile(timings_ms, 95), 3),
+        'p99_ms': round(percentile(timings_ms, 99), 3),
+    }
+
+
+def build_post_page(size):
+    """Unsaved posts shaped like a feed page, so render benchmarks need no database."""
+    from authentication.models import User
+    from posts.models import Post
+
+    author = User(id=1, email='author@example.com', username='author@example.com')
+    now = timezone.now()
+    posts = []
+    for i in range(size):
+        post = Post(
+            id=uuid.uuid4(), title=f'Post number {i} — a title', body='Lorem ipsum dolor sit amet. ' * 40,
+            cover_photo=f'posts/covers/{i}.jpg' if i % 3 == 0 else None,
+            author=author, created_at=now - timedelta(minutes=i), updated_at=now,
+        )
+        post.likes_total = i * 3
+        post.comments_total = i
+        posts.append(post)
+    return posts
+
+
+def build_comment_page(size):
+    """Unsaved comments shaped like a comment thread."""
+    from authentication.models import User
+    from comments.models import Comment
+
+    now = timezone.now()
+    comments = []
+    for i in range(size):
+        author = User(
+            id=i + 1, email=f'user{i}@example.com', first_name=f'User{i}', last_name='Example',
+            date_joined=now - timedelta(days=i),
+        )
+        comment = Comment(
+            id=uuid.uuid4(), body=f'Comment {i} on this post', author=author,
+            created_at=now - timedelta(seconds=i),
+        )
+        comment.likes_total = i % 7
+        comments.append(comment)
+    return comments
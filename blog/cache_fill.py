@@ -0,0 +1,125 @@
+"""
+Cache fills for expensive values that many requests ask for at once.
+
+When a popular entry expires, every request that misses it would recompute it
+at the same time. get_or_fill() stores the value with its expiry time and how
+long it took to compute, and avoids that in three ways:
+
+- Probabilistic early expiration: each read may refresh the value before it
+  expires, more likely the closer the expiry and the slower the computation,
+  so a single request usually refreshes it before anyone misses.
+- Single flight: only the request holding the fill lock recomputes. The lock
+  is a Redis lock (cache.add() without REDIS_URL) that expires after
+  CACHE_FILL_LOCK_SECONDS, should its holder die.
+- Stale while revalidate: while another request holds the lock, readers get
+  the previous value, for up to CACHE_FILL_STALE_SECONDS (or the `stale`
+  argument) past its expiry. With no previous value they wait for the fill,
+  for up to CACHE_FILL_LOCK_SECONDS, before computing it themselves.
+"""
+import logging
+import math
+import random
+import time
+from contextlib import contextmanager
+from typing import Any, NamedTuple
+
+from django.conf import settings
+from django.core.cache import cache
+from redis.exceptions import LockError, RedisError
+from . import metrics
+from .redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+WAIT_INTERVAL = 0.05
+
+
+class Entry(NamedTuple):
+    value: Any
+    expires: float
+    duration: float
+
+
+def store(key, value, timeout, duration=0.0, stale=None):
+    """Cache `value` for get_or_fill(), e.g. after computing it some other way."""
+    if stale is None:
+        stale = settings.CACHE_FILL_STALE_SECONDS
+    cache.set(key, Entry(value, time.time() + timeout, duration), timeout + stale)
+
+
+def _fresh(entry):
+    # XFetch: treat the entry as expired up to duration * beta * -ln(u) early
+    early = entry.duration * settings.CACHE_FILL_BETA * -math.log(1.0 - random.random())
+    return time.time() + early < entry.expires
+
+
+@contextmanager
+def _fill_lock(key):
+    """Yield whether this caller may compute `key`."""
+    name = f'fill-lock:{key}'
+    client = get_redis()
+    if client is None:
+        acquired = cache.add(name, 1, settings.CACHE_FILL_LOCK_SECONDS)
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                cache.delete(name)
+        return
+
+    lock = client.lock(name, timeout=settings.CACHE_FILL_LOCK_SECONDS, blocking=False)
+    try:
+        acquired = lock.acquire()
+    except RedisError:
+        logger.warning("Could not take the fill lock for %s", key, exc_info=True)
+        yield True
+        return
+    try:
+        yield acquired
+    finally:
+        if acquired:
+            try:
+                lock.release()
+            except (LockError, RedisError):
+                # Expired while computing; the next fill is already allowed
+                pass
+
+
+def _fill(key, compute, timeout, stale):
+    start = time.perf_counter()
+    value = compute()
+    store(key, value, timeout, time.perf_counter() - start, stale)
+    return value
+
+
+def get_or_fill(name, key, compute, timeout, stale=None):
+    """
+    Return the cached value of `key`, calling compute() to (re)fill it; `name` labels the metrics.
+
+    `stale` caps how long past its expiry the value may still be served, in seconds.
+    """
+    entry = cache.get(key)
+    if not isinstance(entry, Entry):
+        entry = None
+    if entry is not None and _fresh(entry):
+        metrics.cache_fill.inc(name, 'hit')
+        return entry.value
+
+    with _fill_lock(key) as acquired:
+        if acquired:
+            metrics.cache_fill.inc(name, 'refresh' if entry is not None else 'fill')
+            return _fill(key, compute, timeout, stale)
+
+    if entry is not None:
+        metrics.cache_fill.inc(name, 'stale')
+        return entry.value
+
+    deadline = time.monotonic() + settings.CACHE_FILL_LOCK_SECONDS
+    while time.monotonic() < deadline:
+        time.sleep(WAIT_INTERVAL)
+        entry = cache.get(key)
+        if isinstance(entry, Entry):
+            metrics.cache_fill.inc(name, 'waited')
+            return entry.value
+    metrics.cache_fill.inc(name, 'fill')
+    return _fill(key, compute, timeout, stale)
@@ -0,0 +1,93 @@
+"""
+Database-specific fast paths, with portable fallbacks for other backends.
+"""
+from django.db import connections, router
+
+_TOGGLE_SQL = """
+WITH inserted AS (
+    INSERT INTO {table} ({columns}) VALUES ({placeholders})
+    ON CONFLICT DO NOTHING
+    RETURNING 1
+), deleted AS (
+    DELETE FROM {table} WHERE {conditions} AND NOT EXISTS (SELECT 1 FROM inserted)
+    RETURNING 1
+)
+SELECT EXISTS (SELECT 1 FROM inserted)
+"""
+
+
+def is_postgresql(using):
+    return connections[using].vendor == 'postgresql'
+
+
+def toggle_row(model, **values):
+    """
+    Delete the `model` row matching `values` if it exists, otherwise insert it.
+
+    Returns True if the row was inserted. `values` must be covered by a unique
+    constraint. On PostgreSQL this is one INSERT ... ON CONFLICT statement.
+    """
+    using = router.db_for_write(model)
+    if not is_postgresql(using):
+        if model._default_manager.using(using).filter(**values).delete()[0]:
+            return False
+        model._default_manager.using(using).bulk_create([model(**values)], ignore_conflicts=True)
+        return True
+
+    connection = connections[using]
+    quote_name = connection.ops.quote_name
+    fields = [model._meta.get_field(name) for name in values]
+    columns = [quote_name(field.column) for field in fields]
+    sql = _TOGGLE_SQL.format(
+        table=quote_name(model._meta.db_table),
+        columns=', '.join(columns),
+        placeholders=', '.join(['%s'] * len(columns)),
+        conditions=' AND '.join(f'{column} = %s' for column in columns),
+    )
+    params = [field.get_db_prep_save(value, connection) for field, value in zip(fields, values.values())]
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params + params)
+        return cursor.fetchone()[0]
+
+
+def table_count(model, estimate_above):
+    """
+    Row count of `model`'s table, taken from planner statistics when they put
+    it at `estimate_above` rows or more, and counted exactly otherwise.
+
+    Returns None on backends without cheap statistics.
+    """
+    using = router.db_for_read(model)
+    if not is_postgresql(using):
+        return None
+    table = connections[using].ops.quote_name(model._meta.db_table)
+    with connections[using].cursor() as cursor:
+        # reltuples is -1 until the table has been analyzed
+        cursor.execute(
+            f"SELECT CASE WHEN reltuples >= %s THEN reltuples::bigint ELSE (SELECT COUNT(*) FROM {table}) END "
+            "FROM pg_class WHERE oid = %s::regclass",
+            [estimate_above, table],
+        )
+        return cursor.fetchone()[0]
+
+
+def delete_in_batches(queryset, batch_size):
+    """
+    Delete the rows of `queryset` with plain DELETE statements of at most
+    `batch_size` rows, so no statement holds locks on the whole set.
+
+    Rows are not loaded and no signals are sent, so rows that reference them
+    must already be gone. Returns the number of rows deleted.
+    """
+    using = router.db_for_write(queryset.model)
+    manager = queryset.model._base_manager.using(using)
+    pks = queryset.using(using).order_by().values('pk')
+    # MySQL can't take a LIMIT subquery in IN, so the batch's keys make a round trip there
+    sliced_subquery = connections[using].features.allow_sliced_subqueries_with_in
+    deleted = 0
+    while True:
+        batch = pks[:batch_size] if sliced_subquery else list(pks.values_list('pk', flat=True)[:batch_size])
+        count = manager.filter(pk__in=batch)._raw_delete(using)
+        deleted += count
+        if count < batch_size:
+            return deleted
@@ -0,0 +1,33 @@
+"""
+MySQL backend drawing connections from a bounded per-process pool.
+
+Django only pools PostgreSQL connections natively. Under ASGI each request
+runs its queries in a new thread, so CONN_MAX_AGE cannot keep connections;
+with this backend, closing a connection at the end of a request returns it to
+the pool instead, and the next request in any thread reuses it. The first
+connection opens DB_POOL_MIN_SIZE at once, so later requests find them ready.
+"""
+from django.db.backends.mysql.base import Database, DatabaseWrapper as MySQLDatabaseWrapper
+from blog.db_pool import PoolTimeout, get_pool
+
+
+class DatabaseWrapper(MySQLDatabaseWrapper):
+    def get_new_connection(self, conn_params):
+        try:
+            return get_pool(self.alias).get(
+                connect=lambda: super(DatabaseWrapper, self).get_new_connection(conn_params),
+                ping=lambda conn: conn.ping(),
+            )
+        except PoolTimeout as exc:
+            raise Database.OperationalError(str(exc)) from exc
+
+    def _close(self):
+        if self.connection is None:
+            return
+        pool = get_pool(self.alias)
+        # A connection closed mid-transaction or after an error may be unusable, so never reuse it
+        if self.in_atomic_block or not self.autocommit or self.errors_occurred:
+            with self.wrap_database_errors:
+                pool.discard(self.connection)
+        else:
+            pool.put(self.connection)
@@ -0,0 +1,128 @@
+"""
+Bounded per-process database connection pool.
+
+Used by the blog.db_backends.mysql_pool backend; PostgreSQL uses Django's native
+pool instead. pool_stats() reports both kinds for /metrics.
+"""
+import queue
+import threading
+import time
+
+from django.conf import settings
+from django.db import connections
+from . import metrics
+
+# Database alias -> ConnectionPool, per process
+pools = {}
+_pools_lock = threading.Lock()
+
+
+class PoolTimeout(Exception):
+    pass
+
+
+class ConnectionPool:
+    """
+    Hand out at most `max_size` DB-API connections, reusing idle ones.
+
+    The first checkout opens `min_size` connections at once, keeping the extra
+    ones idle. Idle connections are pinged before being handed out again; dead
+    ones are discarded and replaced.
+    """
+
+    def __init__(self, alias, max_size, timeout, min_size=1):
+        self.alias = alias
+        self.min_size = min(min_size, max_size)
+        self.max_size = max_size
+        self.timeout = timeout
+        self.size = 0
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(max_size)
+        self._lock = threading.Lock()
+        self._filled = False
+
+    def get(self, connect, ping):
+        start = time.perf_counter()
+        if not self._slots.acquire(timeout=self.timeout):
+            raise PoolTimeout(f"No connection to {self.alias!r} became free within {self.timeout}s")
+        metrics.db_pool_wait.observe(time.perf_counter() - start, self.alias)
+        try:
+            self._fill(connect)
+            while True:
+                try:
+                    conn = self._idle.get_nowait()
+                except queue.Empty:
+                    break
+                try:
+                    ping(conn)
+                    return conn
+                except Exception:
+                    self._close(conn)
+            conn = connect()
+            with self._lock:
+                self.size += 1
+            return conn
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def _fill(self, connect):
+        with self._lock:
+            if self._filled:
+                return
+            self._filled = True
+        for _ in range(self.min_size):
+            conn = connect()
+            with self._lock:
+                self.size += 1
+            self._idle.put(conn)
+
+    def put(self, conn):
+        self._idle.put(conn)
+        self._slots.release()
+
+    def discard(self, conn):
+        self._close(conn)
+        self._slots.release()
+
+    def _close(self, conn):
+        with self._lock:
+            self.size -= 1
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def stats(self):
+        idle = self._idle.qsize()
+        return {'size': self.size, 'idle': idle, 'in_use': self.size - idle, 'max_size': self.max_size}
+
+
+def get_pool(alias):
+    with _pools_lock:
+        if alias not in pools:
+            pools[alias] = ConnectionPool(
+                alias, settings.DB_POOL_MAX_SIZE, settings.DB_POOL_TIMEOUT, min_size=settings.DB_POOL_MIN_SIZE,
+            )
+        return pools[alias]
+
+
+def pool_stats():
+    """Return {alias: {'size', 'idle', 'in_use', 'max_size'}} for every pooled database in this process."""
+    stats = {alias: pool.stats() for alias, pool in list(pools.items())}
+    for alias in connections:
+        pool_options = connections.settings[alias].get('OPTIONS', {}).get('pool')
+        if not pool_options or alias in stats:
+            continue
+        # Django's PostgreSQL pool, created on first use
+        pool = type(connections[alias])._connection_pools.get(alias)
+        if pool is None:
+            continue
+        pg_stats = pool.get_stats()
+        stats[alias] = {
+            'size': pg_stats['pool_size'],
+            'idle': pg_stats['pool_available'],
+            'in_use': pg_stats['pool_size'] - pg_stats['pool_available'],
+            'max_size': pool.max_size,
+        }
+    return stats
@@ -0,0 +1,118 @@
+"""
+Read replica routing.
+
+ReplicaMiddleware picks a replica for each GET request and stores it in a
+context variable; ReplicaRouter sends ORM reads to it. Everything else
+(writes, reads outside a request, reads in requests that write, and reads of
+users who wrote recently) goes to the primary.
+"""
+import contextvars
+import random
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import InterfaceError, OperationalError, connections
+import jwt
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+
+_read_alias = contextvars.ContextVar('read_alias', default=None)
+
+# Replica alias -> time.monotonic() until which it is skipped, per process
+_unhealthy = {}
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        return _read_alias.get()
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same data as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db not in settings.DATABASE_REPLICAS
+
+
+class use_replica:
+    """Route ORM reads in the block to `alias` (None for the primary)."""
+
+    def __init__(self, alias):
+        self.alias = alias
+
+    def __enter__(self):
+        self.token = _read_alias.set(self.alias)
+
+    def __exit__(self, *exc_info):
+        _read_alias.reset(self.token)
+
+
+def token_user_id(request):
+    """
+    The user id claimed by the request's access token, or None.
+
+    The token is not verified here: the result only decides where the request
+    reads from, and authentication still rejects forged tokens.
+    """
+    authentication = JWTAuthentication()
+    header = authentication.get_header(request)
+    if header is None:
+        return None
+    try:
+        raw_token = authentication.get_raw_token(header)
+        if raw_token is None:
+            return None
+        return jwt.decode(raw_token, options={'verify_signature': False}).get(jwt_settings.USER_ID_CLAIM)
+    except (AuthenticationFailed, jwt.PyJWTError):
+        return None
+
+
+def _pin_key(user_id):
+    return f'db:pin:{user_id}'
+
+
+def pin_to_primary(user_id):
+    """Read from the primary for DB_REPLICA_PIN_SECONDS, so the user sees their own writes."""
+    cache.set(_pin_key(user_id), 1, settings.DB_REPLICA_PIN_SECONDS)
+
+
+def is_pinned(user_id):
+    return user_id is not None and cache.get(_pin_key(user_id)) is not None
+
+
+def mark_unhealthy(alias):
+    _unhealthy[alias] = time.monotonic() + settings.DB_REPLICA_RETRY_SECONDS
+
+
+def choose_replica():
+    """Return a reachable replica alias, or None to read from the primary."""
+    now = time.monotonic()
+    candidates = [alias for alias in settings.DATABASE_REPLICAS if _unhealthy.get(alias, 0) <= now]
+    random.shuffle(candidates)
+    for alias in candidates:
+        try:
+            connections[alias].ensure_connection()
+        except (InterfaceError, OperationalError):
+            mark_unhealthy(alias)
+            continue
+        return alias
+    return None
+
+
+class ReplicaErrorGuard:
+    """Execute wrapper recording whether a query on the replica failed."""
+
+    def __init__(self):
+        self.failed = False
+
+    def __call__(self, execute, sql, params, many, context):
+        try:
+            return execute(sql, params, many, context)
+        except (InterfaceError, OperationalError):
+            self.failed = True
+            raise
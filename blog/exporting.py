@@ -0,0 +1,139 @@
+"""
+Streaming export of users, posts, comments and likes to JSONL or CSV.
+
+Each table is read in primary key order one batch at a time (keyset
+pagination), so memory stays flat whatever the table size. Every batch is
+appended to the table's file as a unit: with gzip, as a gzip member of its
+own. Then a checkpoint beside the file records the last key and the file
+size. A resumed export truncates the file to the checkpointed size and
+carries on after the last key.
+
+Batches are separate queries, so the export is not a point-in-time snapshot.
+"""
+import csv
+import gzip
+import io
+import json
+import os
+import time
+from datetime import datetime
+
+from django.db import connections
+from authentication.models import User
+from comments.models import Comment
+from posts.models import Post
+from .renderers import FastJSONRenderer
+
+# Users are exported without credentials, emails or permission flags
+TABLES = {
+    'users': (User.objects, ['id', 'first_name', 'last_name', 'date_joined', 'followers_count']),
+    'posts': (
+        Post.all_objects,
+        ['id', 'author_id', 'title', 'body', 'cover_photo', 'created_at', 'updated_at', 'deleted_at'],
+    ),
+    'comments': (Comment.all_objects, ['id', 'post_id', 'author_id', 'body', 'created_at', 'deleted_at']),
+    'post_likes': (Post.likes.through.objects, ['post_id', 'user_id']),
+    'comment_likes': (Comment.likes.through.objects, ['comment_id', 'user_id']),
+}
+
+FORMATS = ('jsonl', 'csv')
+
+
+def export_path(directory, table, fmt, compress):
+    return os.path.join(directory, f"{table}.{fmt}{'.gz' if compress else ''}")
+
+
+def _checkpoint_path(path):
+    return path + '.checkpoint'
+
+
+def _read_checkpoint(path):
+    try:
+        with open(_checkpoint_path(path)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def _write_checkpoint(path, checkpoint):
+    tmp = _checkpoint_path(path) + '.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(checkpoint, f)
+    os.replace(tmp, _checkpoint_path(path))
+
+
+def _csv_value(value):
+    if value is None:
+        return ''
+    if isinstance(value, datetime):
+        return value.isoformat().replace('+00:00', 'Z')
+    return value
+
+
+def _encode_jsonl(fields, rows, header):
+    render = FastJSONRenderer().render
+    return b''.join(render(dict(zip(fields, row))) + b'\n' for row in rows)
+
+
+def _encode_csv(fields, rows, header):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(fields)
+    writer.writerows([_csv_value(value) for value in row] for row in rows)
+    return buffer.getvalue().encode()
+
+
+def export_table(table, directory, fmt='jsonl', compress=False, batch_size=5000, using='default', resume=False):
+    """
+    Export one table into `directory` and return (rows, seconds).
+
+    With `resume`, continues from the table's checkpoint; a finished table is
+    not exported again.
+    """
+    manager, fields = TABLES[table]
+    encode = _encode_jsonl if fmt == 'jsonl' else _encode_csv
+    path = export_path(directory, table, fmt, compress)
+    checkpoint = _read_checkpoint(path) if resume else None
+    if checkpoint and checkpoint['done']:
+        return 0, 0.0
+    checkpoint = checkpoint or {'last_pk': None, 'size': 0, 'rows': 0, 'done': False}
+
+    start = time.perf_counter()
+    exported = 0
+    queryset = manager.using(using).order_by('pk').values_list('pk', *fields)
+    with open(path, 'r+b' if os.path.exists(path) and checkpoint['size'] else 'wb') as f:
+        f.truncate(checkpoint['size'])
+        f.seek(checkpoint['size'])
+        while True:
+            batch = queryset
+            if checkpoint['last_pk'] is not None:
+                batch = batch.filter(pk__gt=checkpoint['last_pk'])
+            rows = list(batch[:batch_size])
+            if not rows:
+                break
+
+            data = encode(fields, [row[1:] for row in rows], header=checkpoint['size'] == 0)
+            f.write(gzip.compress(data, compresslevel=6) if compress else data)
+            f.flush()
+            os.fsync(f.fileno())
+
+            exported += len(rows)
+            last_pk = rows[-1][0]
+            checkpoint.update(
+                last_pk=last_pk if isinstance(last_pk, int) else str(last_pk),
+                size=f.tell(), rows=checkpoint['rows'] + len(rows),
+            )
+            _write_checkpoint(path, checkpoint)
+
+    checkpoint['done'] = True
+    _write_checkpoint(path, checkpoint)
+    return exported, time.perf_counter() - start
+
+
+def export_table_in_process(*args, **kwargs):
+    """export_table() for a worker process; the parent must close its connections before forking."""
+    try:
+        return export_table(*args, **kwargs)
+    finally:
+        connections.close_all()
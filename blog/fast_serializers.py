@@ -0,0 +1,133 @@
+"""
+Compiled read-only serialization for list payloads.
+
+DRF's Serializer.to_representation walks every field through get_attribute,
+SkipField handling and per-field dispatch for every row. For read-only list
+endpoints the field list never changes, so it is resolved once per serializer
+class into (name, getter, converter) steps applied with plain attribute access.
+The output is identical to `serializer_class(objs, many=True).data` for
+serializers built without context.
+"""
+import contextvars
+from functools import cache
+from operator import attrgetter
+
+from django.conf import settings
+from django.db import models
+from django.utils import timezone
+from rest_framework import ISO_8601, fields, relations, serializers
+from rest_framework.settings import api_settings
+from .middleware import serializer_timer
+
+# Resolved once per many() call instead of once per datetime value
+_current_timezone = contextvars.ContextVar('current_timezone', default=None)
+
+
+def _identity(obj):
+    return obj
+
+
+def _datetime_converter(field):
+    output_format = getattr(field, 'format', api_settings.DATETIME_FORMAT)
+    if output_format is None or output_format.lower() != ISO_8601 or hasattr(field, 'timezone'):
+        return None
+    fallback = field.to_representation
+
+    def convert(value):
+        tz = _current_timezone.get()
+        if tz is None or isinstance(value, str) or value.tzinfo is None:
+            return fallback(value)
+        try:
+            value = value.astimezone(tz).isoformat()
+        except OverflowError:
+            return fallback(value)
+        if value.endswith('+00:00'):
+            value = value[:-6] + 'Z'
+        return value
+    return convert
+
+
+def _simple_converter(field):
+    """Return a faster equivalent to field.to_representation, if there is one."""
+    if type(field) is fields.DateTimeField:
+        return _datetime_converter(field)
+    if type(field) in (fields.CharField, fields.EmailField, relations.StringRelatedField):
+        return str
+    if type(field) is fields.IntegerField:
+        return int
+    if type(field) is fields.UUIDField and field.uuid_format == 'hex_verbose':
+        return str
+    return None
+
+
+def _nested_list_converter(child):
+    def convert(value):
+        if isinstance(value, models.manager.BaseManager):
+            value = value.all()
+        return [child.to_representation(item) for item in value]
+    return convert
+
+
+class CompiledSerializer:
+    def __init__(self, serializer_class):
+        if serializer_class.to_representation is not serializers.Serializer.to_representation:
+            raise TypeError(f"{serializer_class.__name__} overrides to_representation and cannot be compiled")
+
+        self.serializer_class = serializer_class
+        self.steps = []
+        for field in serializer_class()._readable_fields:
+            if isinstance(field, serializers.ListSerializer):
+                convert = _nested_list_converter(compile_serializer(type(field.child)))
+            elif isinstance(field, serializers.BaseSerializer):
+                convert = compile_serializer(type(field)).to_representation
+            else:
+                convert = _simple_converter(field) or field.to_representation
+
+            if field.source_attrs:
+                getter = attrgetter('.'.join(field.source_attrs))
+            else:
+                getter = _identity
+            self.steps.append((field.field_name, getter, '__'.join(field.source_attrs), convert))
+
+    def to_representation(self, obj):
+        """Represent a model instance, or a `.values()` row keyed by field source."""
+        ret = {}
+        if isinstance(obj, dict):
+            for name, _, key, convert in self.steps:
+                value = obj[key]
+                ret[name] = None if value is None else convert(value)
+            return ret
+
+        for name, getter, _, convert in self.steps:
+            value = getter(obj)
+            if callable(value):
+                value = value()
+            ret[name] = None if value is None else convert(value)
+        return ret
+
+    def many(self, objs):
+        token = _current_timezone.set(timezone.get_current_timezone() if settings.USE_TZ else None)
+        try:
+            with serializer_timer():
+                to_representation = self.to_representation
+                return [to_representation(obj) for obj in objs]
+        finally:
+            _current_timezone.reset(token)
+
+    def iter(self, objs):
+        """Lazily yield representations, for streaming responses."""
+        tz = timezone.get_current_timezone() if settings.USE_TZ else None
+        to_representation = self.to_representation
+        for obj in objs:
+            # Not held across the yield: the consumer may resume us in another context
+            token = _current_timezone.set(tz)
+            try:
+                ret = to_representation(obj)
+            finally:
+                _current_timezone.reset(token)
+            yield ret
+
+
+@cache
+def compile_serializer(serializer_class):
+    return CompiledSerializer(serializer_class)
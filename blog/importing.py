@@ -0,0 +1,185 @@
+"""
+Bulk import of users, follows, posts, comments and likes from JSONL files.
+
+Input is a directory with one JSONL file per table (optionally gzipped), or
+several files per table to import in parallel, e.g. posts.1.jsonl and
+posts.2.jsonl. Tables are loaded in dependency order. Rows are inserted with
+bulk_create(ignore_conflicts=True), so an interrupted import can simply be run
+again. No signals are sent, and the timestamps in the input are kept.
+Counters and timelines are rebuilt once at the end.
+
+export_blog leaves emails out, so users without one get a placeholder
+address (PLACEHOLDER_EMAIL) that can be changed later.
+"""
+import glob
+import gzip
+import json
+import os
+import time
+from contextlib import contextmanager
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.color import no_style
+from django.db import connections, router, transaction
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from authentication.models import User
+from comments.models import Comment
+from follows.models import Follow
+from follows.timeline import rebuild_timeline
+from posts.models import Post
+
+# Reserved TLD (RFC 2606): never delivered anywhere
+PLACEHOLDER_EMAIL = 'user-{id}@imported.invalid'
+
+
+def _user(row, now, password):
+    email = row.get('email') or PLACEHOLDER_EMAIL.format(id=row['id'])
+    return User(
+        id=row['id'], email=email, username=email, password=password,
+        first_name=row.get('first_name', ''), last_name=row.get('last_name', ''),
+        date_joined=row.get('date_joined') or now,
+    )
+
+
+def _follow(row, now, password):
+    return Follow(follower_id=row['follower_id'], followee_id=row['followee_id'], created_at=row.get('created_at') or now)
+
+
+def _post(row, now, password):
+    created_at = row.get('created_at') or now
+    return Post(
+        id=row['id'], author_id=row['author_id'], title=row['title'], body=row['body'],
+        cover_photo=row.get('cover_photo') or '', created_at=created_at, updated_at=row.get('updated_at') or created_at, deleted_at=row.get('deleted_at'),
+    )
+
+
+def _comment(row, now, password):
+    return Comment(
+        id=row['id'], post_id=row['post_id'], author_id=row['author_id'], body=row['body'],
+        created_at=row.get('created_at') or now, deleted_at=row.get('deleted_at'),
+    )
+
+
+def _post_like(row, now, password):
+    return Post.likes.through(post_id=row['post_id'], user_id=row['user_id'])
+
+
+def _comment_like(row, now, password):
+    return Comment.likes.through(comment_id=row['comment_id'], user_id=row['user_id'])
+
+
+# In dependency order: each table only references the ones before it
+TABLES = {
+    'users': (User, _user),
+    'follows': (Follow, _follow),
+    'posts': (Post, _post),
+    'comments': (Comment, _comment),
+    'post_likes': (Post.likes.through, _post_like),
+    'comment_likes': (Comment.likes.through, _comment_like),
+}
+
+
+def input_files(directory, table):
+    return sorted(
+        glob.glob(os.path.join(directory, f'{table}.jsonl'))
+        + glob.glob(os.path.join(directory, f'{table}.jsonl.gz'))
+        + glob.glob(os.path.join(directory, f'{table}.*.jsonl'))
+        + glob.glob(os.path.join(directory, f'{table}.*.jsonl.gz'))
+    )
+
+
+class InvalidRow(Exception):
+    pass
+
+
+@contextmanager
+def explicit_timestamps():
+    """Let bulk_create keep the input's timestamps instead of auto_now/auto_now_add."""
+    fields = [
+        field for model in (Post, Comment, Follow) for field in model._meta.concrete_fields
+        if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False)
+    ]
+    saved = [(field, field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+def import_file(table, path, batch_size=5000):
+    """Import one JSONL file and return (rows read, seconds); rows already present are skipped."""
+    model, build = TABLES[table]
+    # Imported users sign in after a password reset
+    password = make_password(None)
+    now = timezone.now()
+    start = time.perf_counter()
+    read = 0
+    with explicit_timestamps(), (gzip.open if path.endswith('.gz') else open)(path, 'rb') as f:
+        batch = []
+        for number, line in enumerate(f, 1):
+            if line.strip():
+                try:
+                    batch.append(build(json.loads(line), now, password))
+                except KeyError as exc:
+                    raise InvalidRow(f"{path}:{number}: missing required field {exc.args[0]!r}")
+                except (ValueError, TypeError) as exc:
+                    raise InvalidRow(f"{path}:{number}: {exc!r}")
+            if len(batch) >= batch_size:
+                model.objects.bulk_create(batch, ignore_conflicts=True)
+                read += len(batch)
+                batch = []
+        if batch:
+            model.objects.bulk_create(batch, ignore_conflicts=True)
+            read += len(batch)
+    return read, time.perf_counter() - start
+
+
+def import_file_in_process(*args, **kwargs):
+    """import_file() for a worker process; the parent must close its connections before forking."""
+    try:
+        return import_file(*args, **kwargs)
+    finally:
+        connections.close_all()
+
+
+def finish_import(tables, rebuild_timelines=True):
+    """Rebuild what bulk inserts skip: sequences, statistics, counters, timelines and the like buffer."""
+    using = router.db_for_write(User)
+    connection = connections[using]
+    if 'users' in tables:
+        # Users were inserted with explicit ids; move the id sequence past them
+        with connection.cursor() as cursor:
+            for sql in connection.ops.sequence_reset_sql(no_style(), [User]):
+                cursor.execute(sql)
+
+    if connection.vendor == 'postgresql':
+        # Fresh planner statistics for query plans and the feed's estimated count
+        with connection.cursor() as cursor:
+            for model, _ in TABLES.values():
+                cursor.execute(f'ANALYZE {connection.ops.quote_name(model._meta.db_table)}')
+
+    if 'follows' in tables:
+        followers = (
+            Follow.objects.filter(followee=OuterRef('pk'))
+            .order_by().values('followee').annotate(n=Count('*')).values('n')
+        )
+        User.objects.filter(pk__in=Follow.objects.values('followee_id')).update(
+            followers_count=Coalesce(Subquery(followers), 0)
+        )
+
+    if rebuild_timelines and {'follows', 'posts'} & set(tables):
+        user_ids = list(User.objects.order_by('pk').values_list('pk', flat=True))
+        for i in range(0, len(user_ids), 1000):
+            # One commit per chunk of users rather than per user
+            with transaction.atomic(using=using):
+                for user_id in user_ids[i:i + 1000]:
+                    rebuild_timeline(user_id)
+
+    from posts import like_buffer
+    if 'post_likes' in tables and like_buffer.enabled():
+        like_buffer.rebuild()
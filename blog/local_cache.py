@@ -0,0 +1,183 @@
+"""
+Per-process cache in front of the shared cache, for hot objects.
+
+A TieredCache looks a key up in a small LRU in the worker's memory first,
+then in the shared cache (Redis), and only then calls the loader. Entries
+live LOCAL_CACHE_SECONDS in memory and SHARED_CACHE_SECONDS in Redis, and
+each process keeps at most LOCAL_CACHE_MAX_ENTRIES per cache.
+
+invalidate() runs once the transaction commits: it deletes the shared entry
+and publishes the key on Redis, where a listener thread in every process
+drops its own copy. If that connection drops, the listener empties the local
+caches before subscribing again, since it may have missed messages. The TTLs
+bound how stale an entry can get when a change skips invalidate(). Without
+REDIS_URL there is no shared level, and invalidation only reaches the
+current process, which is enough for tests and single-process development.
+While Redis is unreachable, lookups skip the shared level and fall back to the
+loader and the local cache.
+"""
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import redis
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from redis.exceptions import RedisError
+from . import metrics
+from .redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = 'local_cache:invalidate'
+
+_caches = {}
+_listener_pid = None
+_listener_lock = threading.Lock()
+
+
+class LocalCache:
+    """Thread-safe LRU with a TTL."""
+
+    def __init__(self, max_entries, timeout):
+        self.max_entries = max_entries
+        self.timeout = timeout
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return default
+            expires, value = entry
+            if expires < time.monotonic():
+                del self._entries[key]
+                return default
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.timeout, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class TieredCache:
+    def __init__(self, name):
+        self.name = name
+        self.local = LocalCache(settings.LOCAL_CACHE_MAX_ENTRIES, settings.LOCAL_CACHE_SECONDS)
+        _caches[name] = self
+
+    def _shared_key(self, key):
+        return f'{self.name}:{key}'
+
+    def get(self, key, load):
+        """Return the value for `key`, calling load() on a miss; None from load() is not cached."""
+        key = str(key)
+        _start_listener()
+        value = self.local.get(key)
+        if value is not None:
+            metrics.local_cache_lookups.inc(self.name, 'local')
+            return value
+
+        value = None
+        shared = get_redis() is not None
+        if shared:
+            try:
+                value = cache.get(self._shared_key(key))
+            except RedisError:
+                # Serve from the database and this process until Redis is back
+                logger.warning("Could not read %s from the shared cache", self._shared_key(key), exc_info=True)
+                shared = False
+        if value is not None:
+            metrics.local_cache_lookups.inc(self.name, 'shared')
+        else:
+            metrics.local_cache_lookups.inc(self.name, 'miss')
+            value = load()
+            if value is None:
+                return None
+            if shared:
+                try:
+                    cache.set(self._shared_key(key), value, settings.SHARED_CACHE_SECONDS)
+                except RedisError:
+                    logger.warning("Could not write %s to the shared cache", self._shared_key(key), exc_info=True)
+        self.local.set(key, value)
+        return value
+
+    def invalidate(self, key):
+        """Drop `key` from the shared cache and from every process, after the transaction commits."""
+        key = str(key)
+        transaction.on_commit(lambda: self._invalidate_now(key))
+
+    def _invalidate_now(self, key):
+        self.local.delete(key)
+        client = get_redis()
+        if client is None:
+            return
+        try:
+            cache.delete(self._shared_key(key))
+            client.publish(CHANNEL, self._shared_key(key))
+        except RedisError:
+            logger.warning("Could not invalidate %s", self._shared_key(key), exc_info=True)
+
+
+def clear_local_caches():
+    """Empty every local cache in this process."""
+    for local_cache in _caches.values():
+        local_cache.local.clear()
+
+
+def _handle(message):
+    name, _, key = message.decode().partition(':')
+    local_cache = _caches.get(name)
+    if local_cache is not None:
+        local_cache.local.delete(key)
+
+
+def _listen():
+    # Its own client: the shared one times out reads, and a subscriber waits for messages indefinitely
+    client = redis.Redis.from_url(settings.REDIS_URL, socket_connect_timeout=settings.REDIS_CONNECT_TIMEOUT)
+    while True:
+        try:
+            pubsub = client.pubsub(ignore_subscribe_messages=True)
+            pubsub.subscribe(CHANNEL)
+            # Whatever was published while we were not subscribed is lost
+            clear_local_caches()
+            for message in pubsub.listen():
+                if message['type'] == 'message':
+                    _handle(message['data'])
+        except RedisError:
+            logger.warning("Local cache invalidation listener lost its Redis connection", exc_info=True)
+            time.sleep(1)
+
+
+def _start_listener():
+    """Start the invalidation listener once per process, after any fork."""
+    global _listener_pid
+    if _listener_pid == os.getpid():
+        return
+    with _listener_lock:
+        if _listener_pid == os.getpid():
+            return
+        _listener_pid = os.getpid()
+        if get_redis() is not None:
+            threading.Thread(target=_listen, name='local-cache-invalidation', daemon=True).start()
@@ -0,0 +1,287 @@
+import json
+import logging
+import os
+import platform
+import re
+import secrets
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.test import Client, override_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+from authentication.models import User
+from comments.models import Comment
+from posts.models import Post
+from blog.benchmarking import summarize
+from blog.seeding import SEED_EMAIL_DOMAIN, SEED_PASSWORD, seed_dataset
+
+SERVER_TIMING_QUERIES = re.compile(r'desc="(\d+) queries"')
+WORKER_REQUESTS = re.compile(r'^worker_requests_total\{pid="(\d+)"\} (\S+)$', re.MULTILINE)
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the API hot paths through the Django test client and a gunicorn "
+        "process, writing latency, queries per request and throughput as JSON"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', action='store_true', help="Seed a synthetic dataset before running")
+        parser.add_argument('--users', type=int, default=200)
+        parser.add_argument('--posts', type=int, default=2000)
+        parser.add_argument('--comments', type=int, default=10000)
+        parser.add_argument('--likes', type=int, default=50000)
+        parser.add_argument('--random-seed', type=int, default=0)
+        parser.add_argument('--mode', choices=['client', 'gunicorn', 'both'], default='client')
+        parser.add_argument('--iterations', type=int, default=200, help="Requests per endpoint")
+        parser.add_argument('--workers', type=int, default=3, help="gunicorn workers")
+        parser.add_argument(
+            '--worker-class', choices=['sync', 'gthread', 'uvicorn'], default='gthread',
+            help="gunicorn worker class (GUNICORN_WORKER_CLASS in gunicorn.conf.py)",
+        )
+        parser.add_argument('--concurrency', type=int, default=4, help="Concurrent requests against gunicorn")
+        parser.add_argument('--port', type=int, default=8765)
+        parser.add_argument('--output', default='benchmark.json')
+        parser.add_argument('--compare', help="Previous JSON artifact to compare against")
+
+    def handle(self, *args, **options):
+        if options['seed']:
+            created = seed_dataset(
+                users=options['users'], posts=options['posts'], comments=options['comments'],
+                likes=options['likes'], seed=options['random_seed'],
+            )
+            self.stdout.write(f"Seeded {created}")
+
+        scenarios = self.build_scenarios()
+
+        results = {}
+        if options['mode'] in ('client', 'both'):
+            results['client'] = self.run_client(scenarios, options['iterations'])
+        if options['mode'] in ('gunicorn', 'both'):
+            results['gunicorn'] = self.run_gunicorn(scenarios, options)
+
+        artifact = {'meta': self.metadata(options), 'results': results}
+        with open(options['output'], 'w') as f:
+            json.dump(artifact, f, indent=2)
+
+        self.report(results)
+        if options['compare']:
+            self.compare(options['compare'], results)
+        self.stdout.write(self.style.SUCCESS(f"Results written to {options['output']}"))
+
+    def build_scenarios(self):
+        users = list(User.objects.filter(email__endswith=f'@{SEED_EMAIL_DOMAIN}').order_by('id')[:50])
+        hot_post = Post.objects.annotate(n=Count('likes')).order_by('-n').first()
+        hot_thread = Post.objects.annotate(n=Count('comments')).order_by('-n').first()
+        if not users or hot_post is None:
+            raise CommandError("No seeded data found; run with --seed")
+
+        refresh_tokens = [RefreshToken.for_user(user) for user in users]
+        access = [str(token.access_token) for token in refresh_tokens]
+        refresh = [str(token) for token in refresh_tokens]
+
+        def auth(i):
+            return access[i % len(users)]
+
+        api = f'/api/{settings.API_VERSION}'
+        return {
+            'feed': lambda i: ('GET', f'{api}/posts/', None, auth(i)),
+            'post_detail': lambda i: ('GET', f'{api}/posts/{hot_post.id}/', None, auth(i)),
+            'comment_list': lambda i: ('GET', f'{api}/comments/?post_id={hot_thread.id}', None, auth(i)),
+            'like_toggle': lambda i: ('POST', f'{api}/posts/{hot_post.id}/like/', None, auth(i)),
+            'login': lambda i: (
+                'POST', f'{api}/auth/login/',
+                {'email': users[i % len(users)].email, 'password': SEED_PASSWORD}, None,
+            ),
+            'token_refresh': lambda i: (
+                'POST', f'{api}/auth/token/refresh/', {'refresh': refresh[i % len(users)]}, None,
+            ),
+        }
+
+    def run_client(self, scenarios, iterations):
+        client = Client(HTTP_HOST='localhost')
+        # Query budget warnings would drown the report; query counts are collected below
+        logging.getLogger('blog.middleware').setLevel(logging.ERROR)
+        results = {}
+        with override_settings(PERF_SERVER_TIMING=True):
+            for name, scenario in scenarios.items():
+                timings, queries, errors = [], [], 0
+                wall_start = time.perf_counter()
+                for i in range(iterations):
+                    method, path, body, token = scenario(i)
+                    headers = {'REMOTE_ADDR': f'10.{i // 65536 % 256}.{i // 256 % 256}.{i % 256}'}
+                    if token:
+                        headers['HTTP_AUTHORIZATION'] = f'Bearer {token}'
+                    start = time.perf_counter()
+                    response = client.generic(
+                        method, path, json.dumps(body) if body else '',
+                        content_type='application/json', **headers
+                    )
+                    if response.streaming:
+                        b''.join(response.streaming_content)
+                    timings.append((time.perf_counter() - start) * 1000)
+                    queries.append(self.query_count(response.headers.get('Server-Timing', '')))
+                    errors += response.status_code >= 400
+                queries = [count for count in queries if count is not None]
+                results[name] = self.summarize(timings, queries, errors, time.perf_counter() - wall_start)
+        return results
+
+    def run_gunicorn(self, scenarios, options, extra_env=None):
+        base_url = f"http://127.0.0.1:{options['port']}"
+        env = dict(
+            os.environ, PERF_SERVER_TIMING='True', GUNICORN_WORKER_CLASS=options.get('worker_class', 'gthread'),
+            **(extra_env or {}),
+        )
+        # /metrics is not served without a token outside DEBUG
+        env['METRICS_TOKEN'] = settings.METRICS_TOKEN or secrets.token_urlsafe()
+        # Every request comes from 127.0.0.1, so lift the per-IP limits
+        for scope in settings.REST_FRAMEWORK['DEFAULT_THROTTLE_RATES']:
+            env[f'THROTTLE_RATE_{scope.upper()}'] = '1000000/s'
+
+        process = subprocess.Popen(
+            [
+                sys.executable, '-m', 'gunicorn', '--config', 'gunicorn.conf.py',
+                '--bind', f"127.0.0.1:{options['port']}", '--workers', str(options['workers']),
+            ],
+            cwd=settings.BASE_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        try:
+            self.wait_for_server(base_url, process)
+            results = {}
+            with ThreadPoolExecutor(max_workers=options['concurrency']) as pool:
+                for name, scenario in scenarios.items():
+                    wall_start = time.perf_counter()
+                    samples = list(pool.map(
+                        lambda i: self.http_request(base_url, *scenario(i)), range(options['iterations'])
+                    ))
+                    elapsed = time.perf_counter() - wall_start
+                    timings = [sample[0] for sample in samples]
+                    queries = [sample[1] for sample in samples if sample[1] is not None]
+                    errors = sum(sample[2] for sample in samples)
+                    results[name] = self.summarize(timings, queries, errors, elapsed)
+            requests_per_worker = self.requests_per_worker(base_url, options['workers'], env['METRICS_TOKEN'])
+            self.stdout.write(
+                f"Requests per worker ({env['GUNICORN_WORKER_CLASS']}): "
+                + ', '.join(f'{pid}={count:.0f}' for pid, count in sorted(requests_per_worker.items()))
+            )
+            return results
+        finally:
+            process.terminate()
+            process.wait(timeout=30)
+
+    def wait_for_server(self, base_url, process, timeout=30):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if process.poll() is not None:
+                raise CommandError("gunicorn exited during startup")
+            try:
+                urllib.request.urlopen(f'{base_url}/metrics', timeout=1)
+                return
+            except urllib.error.HTTPError:
+                return
+            except OSError:
+                time.sleep(0.2)
+        raise CommandError("gunicorn did not start in time")
+
+    @staticmethod
+    def requests_per_worker(base_url, workers, token):
+        """Scrape /metrics until every worker has answered once; each scrape reaches one worker."""
+        counts = {}
+        request = urllib.request.Request(f'{base_url}/metrics')
+        request.add_header('Authorization', f'Bearer {token}')
+        for _ in range(workers * 20):
+            with urllib.request.urlopen(request, timeout=10) as response:
+                for match in WORKER_REQUESTS.finditer(response.read().decode()):
+                    counts[int(match.group(1))] = float(match.group(2))
+            if len(counts) >= workers:
+                break
+        return counts
+
+    @staticmethod
+    def http_request(base_url, method, path, body, token):
+        data = json.dumps(body).encode() if body else None
+        request = urllib.request.Request(base_url + path, data=data, method=method)
+        request.add_header('Content-Type', 'application/json')
+        if token:
+            request.add_header('Authorization', f'Bearer {token}')
+
+        start = time.perf_counter()
+        try:
+            with urllib.request.urlopen(request, timeout=60) as response:
+                response.read()
+                server_timing, error = response.headers.get('Server-Timing', ''), False
+        except urllib.error.HTTPError as exc:
+            exc.read()
+            server_timing, error = exc.headers.get('Server-Timing', ''), True
+        elapsed = (time.perf_counter() - start) * 1000
+
+        return elapsed, Command.query_count(server_timing), error
+
+    @staticmethod
+    def query_count(server_timing):
+        match = SERVER_TIMING_QUERIES.search(server_timing)
+        return int(match.group(1)) if match else None
+
+    @staticmethod
+    def summarize(timings, queries, errors, elapsed):
+        summary = summarize(timings)
+        summary['queries_per_request'] = round(sum(queries) / len(queries), 2) if queries else None
+        summary['throughput_rps'] = round(len(timings) / elapsed, 1)
+        summary['errors'] = errors
+        return summary
+
+    def metadata(self, options):
+        try:
+            commit = subprocess.run(
+                ['git', 'rev-parse', 'HEAD'], cwd=settings.BASE_DIR, capture_output=True, text=True
+            ).stdout.strip() or None
+        except OSError:
+            commit = None
+        return {
+            'commit': commit,
+            'timestamp': datetime.now(timezone.utc).isoformat(),
+            'database': connection.vendor,
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'iterations': options['iterations'],
+            'dataset': {
+                'users': User.objects.count(),
+                'posts': Post.objects.count(),
+                'comments': Comment.objects.count(),
+                'likes': Post.likes.through.objects.count(),
+            },
+        }
+
+    def report(self, results):
+        for mode, scenarios in results.items():
+            self.stdout.write(f"\n[{mode}]")
+            for name, r in scenarios.items():
+                self.stdout.write(
+                    f"{name:>14}: p50={r['p50_ms']:.2f}ms p95={r['p95_ms']:.2f}ms p99={r['p99_ms']:.2f}ms "
+                    f"queries={r['queries_per_request']} rps={r['throughput_rps']} errors={r['errors']}"
+                )
+
+    def compare(self, path, results):
+        with open(path) as f:
+            previous = json.load(f)['results']
+        self.stdout.write(f"\nChange in p50 / p95 vs {path}:")
+        for mode, scenarios in results.items():
+            for name, r in scenarios.items():
+                before = previous.get(mode, {}).get(name)
+                if not before:
+                    continue
+                deltas = [
+                    f"{(r[key] - before[key]) / before[key] * 100:+.1f}%" if before[key] else 'n/a'
+                    for key in ('p50_ms', 'p95_ms')
+                ]
+                self.stdout.write(f"{mode}/{name}: {deltas[0]} / {deltas[1]}")
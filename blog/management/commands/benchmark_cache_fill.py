@@ -0,0 +1,93 @@
+import threading
+import time
+import uuid
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from blog.benchmarking import percentile
+from blog.cache_fill import get_or_fill
+from blog.redis_client import get_redis
+
+
+def _naive(key, compute, timeout):
+    value = cache.get(key)
+    if value is None:
+        value = compute()
+        cache.set(key, value, timeout)
+    return value
+
+
+MODES = {
+    'cache.get/set': _naive,
+    'get_or_fill': lambda key, compute, timeout: get_or_fill('benchmark', key, compute, timeout),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Hammer one cache key from many threads across several expiries and count how often the value "
+        "is recomputed, with a plain cache.get/set and with blog.cache_fill.get_or_fill"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=32)
+        parser.add_argument('--expiries', type=int, default=4, help="Cache lifetimes to run for")
+        parser.add_argument('--timeout', type=float, default=3.0, help="Cache lifetime in seconds")
+        parser.add_argument('--compute-ms', type=float, default=100, help="Time to compute the value")
+
+    def handle(self, *args, **options):
+        if options['compute_ms'] >= options['timeout'] * 1000:
+            raise CommandError("--compute-ms must be shorter than --timeout")
+        self.stdout.write(f"Lock and cache: {'redis' if get_redis() is not None else 'django cache'}")
+        self.stdout.write(
+            f"{'mode':<15}{'computations':>14}{'per expiry':>12}{'at once':>9}{'requests':>10}"
+            f"{'p50 ms':>9}{'p99 ms':>9}{'max ms':>9}"
+        )
+        for mode, lookup in MODES.items():
+            computations, most_at_once, timings = self.run(lookup, options)
+            self.stdout.write(
+                f"{mode:<15}{computations:>14}{computations / options['expiries']:>12.1f}{most_at_once:>9}"
+                f"{len(timings):>10}{percentile(timings, 50):>9.1f}{percentile(timings, 99):>9.1f}"
+                f"{max(timings):>9.1f}"
+            )
+
+    def run(self, lookup, options):
+        key = f'benchmark:cache_fill:{uuid.uuid4().hex}'
+        timeout = options['timeout']
+        computations = running = most_at_once = 0
+        lock = threading.Lock()
+
+        def compute():
+            nonlocal computations, running, most_at_once
+            with lock:
+                computations += 1
+                running += 1
+                most_at_once = max(most_at_once, running)
+            time.sleep(options['compute_ms'] / 1000)
+            with lock:
+                running -= 1
+            return 'value'
+
+        # Fill once up front, so every recomputation counted is one caused by an expiry
+        lookup(key, compute, timeout)
+        computations = most_at_once = 0
+        deadline = time.monotonic() + options['expiries'] * timeout
+        timings = []
+
+        def worker():
+            samples = []
+            while time.monotonic() < deadline:
+                start = time.perf_counter()
+                lookup(key, compute, timeout)
+                samples.append((time.perf_counter() - start) * 1000)
+                time.sleep(0.005)
+            with lock:
+                timings.extend(samples)
+
+        threads = [threading.Thread(target=worker) for _ in range(options['threads'])]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        cache.delete(key)
+        return computations, most_at_once, timings
@@ -0,0 +1,44 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from blog.management.commands.benchmark_api import Command as BenchmarkAPICommand
+
+SCENARIOS = ('post_detail', 'feed')
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare per-request latency under gunicorn with a new database connection per request, "
+        "persistent connections and (on MySQL/PostgreSQL) the connection pool"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=500, help="Requests per endpoint")
+        parser.add_argument('--workers', type=int, default=2, help="gunicorn workers")
+        parser.add_argument('--concurrency', type=int, default=2, help="Concurrent requests")
+        parser.add_argument('--port', type=int, default=8765)
+
+    def handle(self, *args, **options):
+        benchmark = BenchmarkAPICommand(stdout=self.stdout, stderr=self.stderr)
+        scenarios = {name: scenario for name, scenario in benchmark.build_scenarios().items() if name in SCENARIOS}
+
+        modes = {
+            'reconnect': {'DB_CONN_MAX_AGE': '0', 'DB_POOL': 'False'},
+            'persistent': {'DB_CONN_MAX_AGE': '600', 'DB_POOL': 'False'},
+        }
+        if settings.DATABASES['default']['ENGINE'] != 'django.db.backends.sqlite3':
+            modes['pool'] = {'DB_POOL': 'True'}
+
+        results = {}
+        for mode, env in modes.items():
+            self.stdout.write(f"Running {mode}...")
+            results[mode] = benchmark.run_gunicorn(scenarios, options, extra_env=env)
+
+        baseline = results['reconnect']
+        self.stdout.write(f"{'':<12}{'endpoint':<14}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'vs reconnect':>15}")
+        for mode, mode_results in results.items():
+            for name, summary in mode_results.items():
+                change = (summary['p50_ms'] / baseline[name]['p50_ms'] - 1) * 100
+                self.stdout.write(
+                    f"{mode:<12}{name:<14}{summary['p50_ms']:>10.2f}{summary['p95_ms']:>10.2f}"
+                    f"{summary['p99_ms']:>10.2f}{change:>+14.1f}%"
+                )
@@ -0,0 +1,38 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+from posts.serializers import PostSerializer
+from blog.benchmarking import build_post_page
+from blog.renderers import FastJSONRenderer
+
+
+class Command(BaseCommand):
+    help = "Compare JSON render time of a PostSerializer page across renderers"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--page-size', type=int, default=100)
+        parser.add_argument('--iterations', type=int, default=500)
+
+    def handle(self, *args, **options):
+        data = PostSerializer(build_post_page(options['page_size']), many=True).data
+
+        # Identical bytes are only promised for serializer output, which this is
+        baseline = JSONRenderer().render(data)
+        if FastJSONRenderer().render(data) != baseline:
+            raise CommandError("FastJSONRenderer output differs from JSONRenderer")
+
+        self.stdout.write(f"Page of {options['page_size']} posts, {len(baseline)} bytes")
+        results = {}
+        for renderer in (JSONRenderer(), FastJSONRenderer()):
+            timings = []
+            for _ in range(options['iterations']):
+                start = time.perf_counter()
+                renderer.render(data)
+                timings.append((time.perf_counter() - start) * 1000)
+            results[type(renderer).__name__] = statistics.median(timings)
+            self.stdout.write(f"{type(renderer).__name__:>18}: median={results[type(renderer).__name__]:.3f}ms")
+
+        speedup = results['JSONRenderer'] / results['FastJSONRenderer']
+        self.stdout.write(self.style.SUCCESS(f"Speedup: {speedup:.1f}x"))
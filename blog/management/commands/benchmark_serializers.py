@@ -0,0 +1,59 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+from comments.models import Comment
+from comments.serializers import CommentSerializer
+from posts.models import Post
+from posts.serializers import PostSerializer
+from blog.benchmarking import build_comment_page, build_post_page
+from blog.fast_serializers import compile_serializer
+
+
+class Command(BaseCommand):
+    help = (
+        "Check that compiled serializers render byte-identical output to the DRF serializers "
+        "and compare their speed on a list page"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--page-size', type=int, default=100)
+        parser.add_argument('--iterations', type=int, default=200)
+
+    def handle(self, *args, **options):
+        size = options['page_size']
+        cases = [
+            ('PostSerializer', PostSerializer, build_post_page(size)),
+            ('CommentSerializer', CommentSerializer, build_comment_page(size)),
+        ]
+        # Rows from the database too, when there are any
+        posts = list(Post.objects.with_counts()[:size])
+        if posts:
+            cases.append(('PostSerializer (db)', PostSerializer, posts))
+        comments = list(Comment.objects.with_counts()[:size])
+        if comments:
+            cases.append(('CommentSerializer (db)', CommentSerializer, comments))
+
+        renderer = JSONRenderer()
+        for name, serializer_class, objs in cases:
+            compiled = compile_serializer(serializer_class)
+            expected = renderer.render(serializer_class(objs, many=True).data)
+            if renderer.render(compiled.many(objs)) != expected:
+                raise CommandError(f"{name}: compiled output differs from DRF output")
+
+            drf = self.measure(lambda: serializer_class(objs, many=True).data, options['iterations'])
+            fast = self.measure(lambda: compiled.many(objs), options['iterations'])
+            self.stdout.write(
+                f"{name:>24}: {len(objs)} rows identical, drf={drf:.3f}ms compiled={fast:.3f}ms "
+                f"({drf / fast:.1f}x)"
+            )
+
+    @staticmethod
+    def measure(func, iterations):
+        timings = []
+        for _ in range(iterations):
+            start = time.perf_counter()
+            func()
+            timings.append((time.perf_counter() - start) * 1000)
+        return statistics.median(timings)
@@ -0,0 +1,137 @@
+import os
+import subprocess
+import sys
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from blog.benchmarking import summarize
+from blog.management.commands.benchmark_api import Command as BenchmarkAPICommand
+
+# Overrides for gunicorn.conf.py; sync workers, so only preloading differs
+MODES = {
+    'default': {'GUNICORN_WORKER_CLASS': 'sync', 'GUNICORN_PRELOAD': 'False'},
+    'preload': {'GUNICORN_WORKER_CLASS': 'sync', 'GUNICORN_PRELOAD': 'True'},
+}
+
+
+def _children(pid):
+    children = []
+    for entry in os.listdir('/proc'):
+        if entry.isdigit():
+            try:
+                with open(f'/proc/{entry}/stat') as f:
+                    # The command name in parentheses may contain spaces
+                    ppid = int(f.read().rsplit(')', 1)[1].split()[1])
+            except (OSError, IndexError, ValueError):
+                continue
+            if ppid == pid:
+                children.append(int(entry))
+    return children
+
+
+def _memory_kb(pid):
+    """Return (pss, uss) of a process in kB."""
+    values = {}
+    with open(f'/proc/{pid}/smaps_rollup') as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == 'kB':
+                values[parts[0].rstrip(':')] = int(parts[1])
+    return values['Pss'], values['Private_Clean'] + values['Private_Dirty']
+
+
+def _cpu_seconds(pid):
+    with open(f'/proc/{pid}/stat') as f:
+        fields = f.read().rsplit(')', 1)[1].split()
+    # utime and stime, in clock ticks
+    return (int(fields[11]) + int(fields[12])) / os.sysconf('SC_CLK_TCK')
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare gunicorn with and without --preload: time to serve the first request, CPU spent "
+        "booting, memory (PSS/USS) of the workers, and latency while --max-requests recycles workers"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=3, help="gunicorn workers")
+        parser.add_argument('--requests', type=int, default=300, help="Requests sent while workers recycle")
+        parser.add_argument('--max-requests', type=int, default=25, help="gunicorn --max-requests while measuring")
+        parser.add_argument('--concurrency', type=int, default=4)
+        parser.add_argument('--port', type=int, default=8766)
+
+    def handle(self, *args, **options):
+        if not os.path.exists('/proc/self/smaps_rollup'):
+            raise CommandError("Memory is read from /proc/<pid>/smaps_rollup, which needs Linux 4.14+")
+
+        results = {mode: self.measure(mode_env, options) for mode, mode_env in MODES.items()}
+
+        self.stdout.write(
+            f"{'mode':<10}{'ready s':>9}{'boot cpu s':>12}{'PSS MB':>9}{'worker USS MB':>15}"
+            f"{'p50 ms':>9}{'p99 ms':>9}{'max ms':>9}{'rps':>8}"
+        )
+        for mode, r in results.items():
+            self.stdout.write(
+                f"{mode:<10}{r['ready_s']:>9.2f}{r['boot_cpu_s']:>12.2f}{r['pss_mb']:>9.1f}"
+                f"{r['worker_uss_mb']:>15.1f}{r['p50_ms']:>9.2f}{r['p99_ms']:>9.2f}{r['max_ms']:>9.2f}"
+                f"{r['throughput_rps']:>8.1f}"
+            )
+
+    def measure(self, mode_env, options):
+        base_url = f"http://127.0.0.1:{options['port']}"
+        env = dict(os.environ, **mode_env)
+        # Every request comes from 127.0.0.1, so lift the per-IP limits
+        for scope in settings.REST_FRAMEWORK['DEFAULT_THROTTLE_RATES']:
+            env[f'THROTTLE_RATE_{scope.upper()}'] = '1000000/s'
+
+        start = time.perf_counter()
+        process = subprocess.Popen(
+            [
+                sys.executable, '-m', 'gunicorn', '--config', 'gunicorn.conf.py',
+                '--bind', f"127.0.0.1:{options['port']}", '--workers', str(options['workers']),
+                '--max-requests', str(options['max_requests']), '--max-requests-jitter', '0',
+            ],
+            cwd=settings.BASE_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        try:
+            BenchmarkAPICommand().wait_for_server(base_url, process)
+            ready = time.perf_counter() - start
+            # Let every worker finish booting before counting CPU and memory
+            deadline = time.monotonic() + 30
+            while len(_children(process.pid)) < options['workers'] and time.monotonic() < deadline:
+                time.sleep(0.1)
+            time.sleep(1)
+            workers = _children(process.pid)
+            boot_cpu = _cpu_seconds(process.pid) + sum(_cpu_seconds(pid) for pid in workers)
+
+            # One request per worker first, so each has touched its memory
+            for _ in range(options['workers'] * 2):
+                urllib.request.urlopen(f'{base_url}/healthz', timeout=10).read()
+            memory = [_memory_kb(pid) for pid in [process.pid, *_children(process.pid)]]
+            worker_uss = [uss for _, uss in memory[1:]]
+
+            def request(i):
+                request_start = time.perf_counter()
+                urllib.request.urlopen(f'{base_url}/healthz', timeout=60).read()
+                return (time.perf_counter() - request_start) * 1000
+
+            wall_start = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=options['concurrency']) as pool:
+                timings = list(pool.map(request, range(options['requests'])))
+            elapsed = time.perf_counter() - wall_start
+        finally:
+            process.terminate()
+            process.wait(timeout=30)
+
+        return {
+            'ready_s': ready,
+            'boot_cpu_s': boot_cpu,
+            'pss_mb': sum(pss for pss, _ in memory) / 1024,
+            'worker_uss_mb': sum(worker_uss) / len(worker_uss) / 1024,
+            'max_ms': max(timings),
+            'throughput_rps': len(timings) / elapsed,
+            **summarize(timings),
+        }
@@ -0,0 +1,50 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from rest_framework.test import APIRequestFactory
+from rest_framework.views import APIView
+from blog.benchmarking import percentile
+from blog.redis_client import get_redis
+from blog.throttling import (
+    AnonSlidingWindowThrottle, ScopedSlidingWindowThrottle, UserSlidingWindowThrottle
+)
+
+
+class BenchmarkView(APIView):
+    throttle_scope = 'login'
+
+
+class Command(BaseCommand):
+    help = "Measure the per-request overhead of the configured throttles"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=2000)
+        parser.add_argument('--budget-ms', type=float, default=1.0)
+
+    def handle(self, *args, **options):
+        backend = 'redis' if get_redis() is not None else 'cache'
+        self.stdout.write(f"Counter store: {backend}")
+
+        request = APIRequestFactory().post('/')
+        request = BenchmarkView().initialize_request(request)
+        view = BenchmarkView()
+
+        over_budget = False
+        for throttle_class in (AnonSlidingWindowThrottle, UserSlidingWindowThrottle, ScopedSlidingWindowThrottle):
+            timings = []
+            for i in range(options['iterations']):
+                request.META['REMOTE_ADDR'] = f'10.0.{i // 250 % 250}.{i % 250}'
+                start = time.perf_counter()
+                throttle_class().allow_request(request, view)
+                timings.append((time.perf_counter() - start) * 1000)
+
+            mean = statistics.mean(timings)
+            p99 = percentile(timings, 99)
+            over_budget = over_budget or mean > options['budget_ms']
+            self.stdout.write(f"{throttle_class.__name__:>28}: mean={mean:.3f}ms p99={p99:.3f}ms")
+
+        if over_budget:
+            self.stdout.write(self.style.WARNING(f"Mean overhead exceeds {options['budget_ms']}ms budget"))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"All throttles within {options['budget_ms']}ms budget"))
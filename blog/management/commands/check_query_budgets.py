@@ -0,0 +1,70 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from blog.query_budgets import BUDGETS_FILE, budget_requests, load_budgets
+
+
+class Command(BaseCommand):
+    help = (
+        "Count the SQL queries every endpoint runs against a small seeded test database "
+        "and fail if any exceeds its budget in query_budgets.json"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--budgets', default=str(BUDGETS_FILE))
+        parser.add_argument('--update', action='store_true', help="Rewrite the budgets file with the current counts")
+
+    def handle(self, *args, **options):
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            with override_settings(
+                EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+                LIKE_BUFFER_ENABLED=False,
+            ):
+                counts = self.measure()
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+        if options['update']:
+            with open(options['budgets'], 'w') as f:
+                json.dump(counts, f, indent=2)
+                f.write('\n')
+            self.stdout.write(self.style.SUCCESS(f"Wrote {len(counts)} budgets to {options['budgets']}"))
+            return
+
+        budgets = load_budgets(options['budgets'])
+
+        failures = []
+        for name, count in counts.items():
+            budget = budgets.get(name)
+            if budget is None:
+                failures.append(name)
+                self.stdout.write(self.style.ERROR(f"{name}: {count} queries (no budget)"))
+            elif count > budget:
+                failures.append(name)
+                self.stdout.write(self.style.ERROR(f"{name}: {count} queries (budget {budget})"))
+            elif count < budget:
+                self.stdout.write(self.style.WARNING(
+                    f"{name}: {count} queries (budget {budget}; run with --update to tighten)"
+                ))
+            else:
+                self.stdout.write(f"{name}: {count} queries")
+
+        if failures:
+            raise CommandError(f"Query budget exceeded for: {', '.join(failures)}")
+        self.stdout.write(self.style.SUCCESS("All endpoints within budget"))
+
+    def measure(self):
+        counts = {}
+        for name, send in budget_requests():
+            # Counted like assertNumQueries, which the tests check the budgets with
+            with CaptureQueriesContext(connection) as queries:
+                response = send()
+            if response.status_code >= 400:
+                raise CommandError(f"{name} returned {response.status_code}: {response.content[:200]!r}")
+            counts[name] = len(queries)
+        return counts
@@ -0,0 +1,56 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+from blog.exporting import FORMATS, TABLES, export_table, export_table_in_process
+
+
+class Command(BaseCommand):
+    help = (
+        "Stream users, posts, comments and likes to JSONL or CSV files, one per table, "
+        "in keyset batches with resumable checkpoints"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('output', help="Directory for the exported files")
+        parser.add_argument('--format', choices=FORMATS, default='jsonl')
+        parser.add_argument('--gzip', action='store_true', help="Compress each file")
+        parser.add_argument('--tables', nargs='+', choices=list(TABLES), default=list(TABLES))
+        parser.add_argument('--batch-size', type=int, default=5000, help="Rows per query and per write")
+        parser.add_argument('--jobs', type=int, default=1, help="Tables exported in parallel processes")
+        parser.add_argument('--resume', action='store_true', help="Continue from the checkpoints of an earlier run")
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS, help="Database alias to read, e.g. a replica")
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1 or options['jobs'] < 1:
+            raise CommandError("--batch-size and --jobs must be positive")
+        os.makedirs(options['output'], exist_ok=True)
+
+        arguments = {
+            table: (table, options['output'], options['format'], options['gzip'],
+                    options['batch_size'], options['database'], options['resume'])
+            for table in options['tables']
+        }
+        start = time.perf_counter()
+        if options['jobs'] == 1:
+            results = {table: export_table(*args) for table, args in arguments.items()}
+        else:
+            # Worker processes open their own connections
+            connections.close_all()
+            with ProcessPoolExecutor(max_workers=options['jobs'], initializer=django.setup) as executor:
+                futures = {table: executor.submit(export_table_in_process, *args) for table, args in arguments.items()}
+                results = {table: future.result() for table, future in futures.items()}
+        elapsed = time.perf_counter() - start
+
+        total = 0
+        self.stdout.write(f"{'table':<15}{'rows':>12}{'seconds':>10}{'rows/s':>12}")
+        for table, (rows, seconds) in results.items():
+            total += rows
+            rate = rows / seconds if seconds else 0
+            self.stdout.write(f"{table:<15}{rows:>12}{seconds:>10.2f}{rate:>12.0f}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Exported {total} rows in {elapsed:.2f}s ({total / elapsed if elapsed else 0:.0f} rows/s)"
+        ))
@@ -0,0 +1,68 @@
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from blog.importing import TABLES, InvalidRow, finish_import, import_file, import_file_in_process, input_files
+
+
+class Command(BaseCommand):
+    help = (
+        "Bulk load users, follows, posts, comments and likes from JSONL files "
+        "(see 'Data Import' in the README for the format)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('input', help="Directory with <table>.jsonl[.gz] or <table>.<part>.jsonl[.gz] files")
+        parser.add_argument(
+            '--tables', nargs='+', choices=list(TABLES), default=list(TABLES),
+            help="Tables to import (default: all that have input files)",
+        )
+        parser.add_argument('--batch-size', type=int, default=5000, help="Rows per bulk insert")
+        parser.add_argument('--jobs', type=int, default=1, help="Files of the same table imported in parallel processes")
+        parser.add_argument('--skip-timelines', action='store_true', help="Don't rebuild home timelines afterwards")
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1 or options['jobs'] < 1:
+            raise CommandError("--batch-size and --jobs must be positive")
+        files = {table: input_files(options['input'], table) for table in TABLES if table in options['tables']}
+        files = {table: paths for table, paths in files.items() if paths}
+        if not files:
+            raise CommandError(f"No <table>.jsonl files in {options['input']}")
+
+        start = time.perf_counter()
+        self.stdout.write(f"{'table':<15}{'files':>6}{'rows read':>12}{'inserted':>12}{'seconds':>10}{'rows/s':>12}")
+        total_read = total_inserted = 0
+        # Worker processes open their own connections
+        connections.close_all()
+        with ProcessPoolExecutor(max_workers=options['jobs'], initializer=django.setup) as executor:
+            for table, paths in files.items():
+                # Rows already present are skipped, so only the table's growth tells how many were new
+                model = TABLES[table][0]
+                before = model._base_manager.count()
+                table_start = time.perf_counter()
+                try:
+                    if options['jobs'] == 1:
+                        results = [import_file(table, path, options['batch_size']) for path in paths]
+                    else:
+                        futures = [executor.submit(import_file_in_process, table, path, options['batch_size']) for path in paths]
+                        results = [future.result() for future in futures]
+                except InvalidRow as exc:
+                    raise CommandError(f"Invalid row in {exc}")
+                rows = sum(rows for rows, _ in results)
+                seconds = time.perf_counter() - table_start
+                inserted = model._base_manager.count() - before
+                total_read += rows
+                total_inserted += inserted
+                self.stdout.write(
+                    f"{table:<15}{len(paths):>6}{rows:>12}{inserted:>12}{seconds:>10.2f}{rows / seconds:>12.0f}"
+                )
+        loaded = time.perf_counter() - start
+
+        finish_import(list(files), rebuild_timelines=not options['skip_timelines'])
+        elapsed = time.perf_counter() - start
+        self.stdout.write(self.style.SUCCESS(
+            f"Read {total_read} rows and inserted {total_inserted} in {loaded:.2f}s "
+            f"({total_read / loaded:.0f} rows/s); counters and timelines rebuilt in {elapsed - loaded:.2f}s"
+        ))
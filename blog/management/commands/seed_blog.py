@@ -0,0 +1,79 @@
+import time
+from itertools import repeat
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from blog.importing import finish_import
+from blog.seeding import SEED_TABLES, generate_chunk, insert_chunk, seed_chunk_in_process, seed_chunks, seed_plan
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate a large synthetic dataset with Zipf-distributed popularity, "
+        "deterministic by --random-seed, in parallel worker processes"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100_000)
+        parser.add_argument('--posts', type=int, default=1_000_000)
+        parser.add_argument('--comments', type=int, default=3_000_000)
+        parser.add_argument('--post-likes', type=int, default=5_000_000)
+        parser.add_argument('--comment-likes', type=int, default=1_000_000)
+        parser.add_argument('--random-seed', type=int, default=0)
+        parser.add_argument('--skew', type=float, default=1.1, help="Zipf exponent of author, post and comment popularity")
+        parser.add_argument('--days', type=int, default=365, help="Posts are spread over this many days up to now")
+        parser.add_argument('--batch-size', type=int, default=5000, help="Rows per bulk insert")
+        parser.add_argument('--jobs', type=int, default=1, help="Worker processes generating and inserting chunks")
+
+    def handle(self, *args, **options):
+        if options['users'] < 1 or options['posts'] < 1 or options['comments'] < 1:
+            raise CommandError("--users, --posts and --comments must be positive")
+        if options['batch_size'] < 1 or options['jobs'] < 1:
+            raise CommandError("--batch-size and --jobs must be positive")
+        plan = seed_plan(
+            options['users'], options['posts'], options['comments'],
+            options['post_likes'], options['comment_likes'],
+            seed=options['random_seed'], skew=options['skew'], days=options['days'],
+        )
+
+        # SQLite allows one writer at a time: workers only generate rows there
+        workers_insert = connections['default'].vendor != 'sqlite'
+        start = time.perf_counter()
+        total = 0
+        self.stdout.write(f"{'table':<15}{'rows':>12}{'seconds':>10}{'rows/s':>12}")
+        # Worker processes open their own connections
+        connections.close_all()
+        with ProcessPoolExecutor(max_workers=options['jobs'], initializer=django.setup) as executor:
+            # Tables run one after another since each references the ones before
+            for table in SEED_TABLES:
+                table_start = time.perf_counter()
+                chunks = seed_chunks(plan, table)
+                if options['jobs'] == 1:
+                    rows = sum(
+                        insert_chunk(table, generate_chunk(plan, table, chunk), options['batch_size'])
+                        for chunk in chunks
+                    )
+                elif workers_insert:
+                    rows = sum(executor.map(
+                        seed_chunk_in_process, repeat(plan), repeat(table), chunks, repeat(options['batch_size'])
+                    ))
+                else:
+                    rows = 0
+                    # A few chunks at a time, so generated rows don't pile up waiting to be inserted
+                    window = options['jobs'] * 2
+                    for i in range(0, len(chunks), window):
+                        for objs in executor.map(seed_chunk_in_process, repeat(plan), repeat(table), chunks[i:i + window]):
+                            rows += insert_chunk(table, objs, options['batch_size'])
+                seconds = time.perf_counter() - table_start
+                total += rows
+                rate = rows / seconds if seconds else 0
+                self.stdout.write(f"{table:<15}{rows:>12}{seconds:>10.2f}{rate:>12.0f}")
+        seeded = time.perf_counter() - start
+
+        # Counters, the user id sequence, planner statistics and the like buffer
+        finish_import(SEED_TABLES, rebuild_timelines=False)
+        self.stdout.write(self.style.SUCCESS(
+            f"Seeded {total} rows in {seeded:.2f}s ({total / seeded:.0f} rows/s)"
+        ))
@@ -0,0 +1,182 @@
+"""
+In-process Prometheus metrics.
+
+Each gunicorn worker keeps its own registry; scrape results reflect the worker
+that served the /metrics request. The worker_* metrics are labeled with its
+process id, so series from different workers never overwrite each other.
+"""
+import bisect
+import os
+import threading
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+POOL_WAIT_BUCKETS = (0.0001, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+
+
+class Histogram:
+    def __init__(self, name, help_text, buckets, labelnames):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = buckets
+        self.labelnames = labelnames
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        with self._lock:
+            counts, total = self._values.get(labels, (None, 0.0))
+            if counts is None:
+                counts = [0] * (len(self.buckets) + 1)
+            counts[bisect.bisect_left(self.buckets, value)] += 1
+            self._values[labels] = (counts, total + value)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for labels, (counts, total) in items:
+            label_str = ','.join(f'{k}="{v}"' for k, v in zip(self.labelnames, labels))
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{label_str},le="{bound}"}} {cumulative}')
+            cumulative += counts[-1]
+            lines.append(f'{self.name}_bucket{{{label_str},le="+Inf"}} {cumulative}')
+            lines.append(f'{self.name}_sum{{{label_str}}} {total}')
+            lines.append(f'{self.name}_count{{{label_str}}} {cumulative}')
+        return '\n'.join(lines)
+
+
+class Gauge:
+    """A gauge whose values are read from `collect()` ({labels: value}) at scrape time."""
+
+    def __init__(self, name, help_text, labelnames, collect):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = labelnames
+        self.collect = collect
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} gauge"]
+        for labels, value in sorted(self.collect().items()):
+            label_str = ','.join(f'{k}="{v}"' for k, v in zip(self.labelnames, labels))
+            lines.append(f'{self.name}{{{label_str}}} {value}')
+        return '\n'.join(lines)
+
+
+class Counter:
+    def __init__(self, name, help_text, labelnames):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = labelnames
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for labels, value in items:
+            label_str = ','.join(f'{k}="{v}"' for k, v in zip(self.labelnames, labels))
+            lines.append(f'{self.name}{{{label_str}}} {value}')
+        return '\n'.join(lines)
+
+
+REGISTRY = []
+
+
+def register(metric):
+    REGISTRY.append(metric)
+    return metric
+
+
+def render_metrics():
+    return '\n'.join(metric.render() for metric in REGISTRY) + '\n'
+
+
+REQUEST_LABELS = ('view', 'method')
+
+request_duration = register(Histogram(
+    'http_request_duration_seconds', 'Total request latency.', LATENCY_BUCKETS, REQUEST_LABELS
+))
+db_query_count = register(Histogram(
+    'http_request_db_queries', 'SQL queries executed per request.', QUERY_COUNT_BUCKETS, REQUEST_LABELS
+))
+db_duration = register(Histogram(
+    'http_request_db_duration_seconds', 'Time spent in SQL queries per request.', LATENCY_BUCKETS, REQUEST_LABELS
+))
+serializer_duration = register(Histogram(
+    'http_request_serializer_duration_seconds', 'Time spent in compiled serializers and rendering JSON per request.',
+    LATENCY_BUCKETS, REQUEST_LABELS
+))
+query_budget_exceeded = register(Counter(
+    'http_request_query_budget_exceeded_total', 'Requests that ran more SQL queries than PERF_QUERY_BUDGET.',
+    REQUEST_LABELS
+))
+
+
+WORKER_LABELS = ('pid',)
+
+worker_requests = register(Counter(
+    'worker_requests_total', 'Requests served by this worker process.', WORKER_LABELS
+))
+
+
+class _InFlight:
+    def __init__(self):
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        with self._lock:
+            self.count += 1
+
+    def __exit__(self, *exc_info):
+        with self._lock:
+            self.count -= 1
+
+
+worker_in_flight = _InFlight()
+register(Gauge(
+    'worker_in_flight_requests', 'Requests this worker process is handling right now.', WORKER_LABELS,
+    lambda: {(os.getpid(),): worker_in_flight.count},
+))
+
+
+local_cache_lookups = register(Counter(
+    'local_cache_lookups_total', 'Tiered cache lookups by the level that answered: local, shared or miss.',
+    ('cache', 'level')
+))
+
+
+cache_fill = register(Counter(
+    'cache_fill_total',
+    'blog.cache_fill lookups by outcome: hit, stale, waited, or fill/refresh when this request computed the value.',
+    ('cache', 'result')
+))
+
+
+def _pool_stats():
+    from .db_pool import pool_stats
+
+    return pool_stats()
+
+
+db_pool_connections = register(Gauge(
+    'db_pool_connections', 'Open pooled database connections in this worker, by state.', ('database', 'state'),
+    lambda: {
+        (alias, state): stats[state] for alias, stats in _pool_stats().items() for state in ('idle', 'in_use')
+    },
+))
+db_pool_max_connections = register(Gauge(
+    'db_pool_max_connections', 'Pool size limit per worker.', ('database',),
+    lambda: {(alias,): stats['max_size'] for alias, stats in _pool_stats().items()},
+))
+db_pool_wait = register(Histogram(
+    'db_pool_wait_seconds', 'Time spent waiting for a free pooled connection.', POOL_WAIT_BUCKETS, ('database',)
+))
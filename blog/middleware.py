@@ -0,0 +1,262 @@
+import contextvars
+import logging
+import os
+import time
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.db import connections
+from django.middleware.gzip import GZipMiddleware
+from django.utils.cache import patch_vary_headers
+from . import db_router, metrics
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+_current = contextvars.ContextVar('request_metrics', default=None)
+
+
+class RequestMetrics:
+    def __init__(self):
+        self.query_count = 0
+        self.db_time = 0.0
+        self.serializer_time = 0.0
+        self.serializer_depth = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - start
+            self.query_count += 1
+
+
+@contextmanager
+def serializer_timer():
+    """Attribute the time spent in the block to the current request's serializer time."""
+    request_metrics = _current.get()
+    if request_metrics is None or request_metrics.serializer_depth:
+        yield
+        return
+    request_metrics.serializer_depth += 1
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        request_metrics.serializer_time += time.perf_counter() - start
+        request_metrics.serializer_depth -= 1
+
+
+class PerformanceMiddleware:
+    """
+    Record per-request SQL query count and time, serializer time and latency.
+
+    Serializer time covers the compiled serializers and FastJSONRenderer, which
+    time themselves with serializer_timer(). Metrics are exported at /metrics, labeled by URL name. With
+    PERF_SERVER_TIMING enabled they are also returned as a Server-Timing header.
+    Requests running more than PERF_QUERY_BUDGET queries are logged.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request_metrics = RequestMetrics()
+        token = _current.set(request_metrics)
+        start = time.perf_counter()
+        try:
+            with metrics.worker_in_flight, self.wrap_connections(request_metrics):
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+
+        match = request.resolver_match
+        view = match.view_name if match else 'unmatched'
+        if view == 'metrics':
+            return response
+        metrics.worker_requests.inc(os.getpid())
+
+        if settings.PERF_SERVER_TIMING:
+            # For streaming responses this only covers the work done before the first chunk
+            response['Server-Timing'] = ', '.join([
+                f'db;dur={request_metrics.db_time * 1000:.2f};desc="{request_metrics.query_count} queries"',
+                f'serialize;dur={request_metrics.serializer_time * 1000:.2f}',
+                f'total;dur={(time.perf_counter() - start) * 1000:.2f}',
+            ])
+
+        if response.streaming and not response.is_async:
+            response.streaming_content = self.stream(
+                response.streaming_content, request, view, request_metrics, start
+            )
+        else:
+            self.observe(request, view, request_metrics, time.perf_counter() - start)
+        return response
+
+    @staticmethod
+    def wrap_connections(request_metrics):
+        stack = ExitStack()
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(request_metrics))
+        return stack
+
+    def stream(self, content, request, view, request_metrics, start):
+        """Keep counting queries while the body is consumed, and record the request when it ends."""
+        content = iter(content)
+        try:
+            while True:
+                # Only wrap the work of producing a chunk, not the time the server spends sending it
+                with self.wrap_connections(request_metrics):
+                    chunk = next(content, None)
+                if chunk is None:
+                    break
+                yield chunk
+        finally:
+            self.observe(request, view, request_metrics, time.perf_counter() - start)
+
+    def observe(self, request, view, request_metrics, total):
+        labels = (view, request.method)
+        metrics.request_duration.observe(total, *labels)
+        metrics.db_query_count.observe(request_metrics.query_count, *labels)
+        metrics.db_duration.observe(request_metrics.db_time, *labels)
+        metrics.serializer_duration.observe(request_metrics.serializer_time, *labels)
+
+        if request_metrics.query_count > settings.PERF_QUERY_BUDGET:
+            metrics.query_budget_exceeded.inc(*labels)
+            logger.warning(
+                "%s %s (%s) ran %d queries, over the budget of %d",
+                request.method, request.path, view,
+                request_metrics.query_count, settings.PERF_QUERY_BUDGET,
+            )
+
+
+class ReplicaMiddleware:
+    """
+    Serve GET requests from a read replica when DATABASE_REPLICAS is set.
+
+    Users are pinned to the primary for DB_REPLICA_PIN_SECONDS after a
+    successful write so they read their own writes. If the replica fails
+    mid-request, it is marked unhealthy and the request is retried on the primary.
+    """
+    safe_methods = ('GET', 'HEAD', 'OPTIONS')
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.DATABASE_REPLICAS:
+            return self.get_response(request)
+
+        if request.method not in self.safe_methods:
+            response = self.get_response(request)
+            user = getattr(request, 'user', None)
+            if response.status_code < 400 and user is not None and user.is_authenticated:
+                db_router.pin_to_primary(user.pk)
+            return response
+
+        alias = None if db_router.is_pinned(db_router.token_user_id(request)) else db_router.choose_replica()
+        if alias is None:
+            return self.get_response(request)
+
+        guard = db_router.ReplicaErrorGuard()
+        with connections[alias].execute_wrapper(guard), db_router.use_replica(alias):
+            response = self.get_response(request)
+
+        if guard.failed:
+            db_router.mark_unhealthy(alias)
+            if not response.streaming:
+                logger.warning("Read replica %s failed, retrying %s on the primary", alias, request.path)
+                return self.get_response(request)
+        if response.streaming and not response.is_async:
+            response.streaming_content = self.stream(response.streaming_content, alias, guard)
+        return response
+
+    @staticmethod
+    def stream(content, alias, guard):
+        """Keep reading from the replica while a streamed body is produced."""
+        content = iter(content)
+        try:
+            while True:
+                with connections[alias].execute_wrapper(guard), db_router.use_replica(alias):
+                    chunk = next(content, None)
+                if chunk is None:
+                    break
+                yield chunk
+        finally:
+            if guard.failed:
+                db_router.mark_unhealthy(alias)
+
+
+def _accepted_encodings(header):
+    """Parse Accept-Encoding into {coding: qvalue}."""
+    accepted = {}
+    for part in header.split(','):
+        coding, _, params = part.partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        qvalue = 1.0
+        for param in params.split(';'):
+            name, _, value = param.partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    qvalue = float(value)
+                except ValueError:
+                    qvalue = 0.0
+        accepted[coding] = qvalue
+    return accepted
+
+
+def _brotli_sequence(sequence, quality):
+    compressor = brotli.Compressor(quality=quality)
+    for item in sequence:
+        data = compressor.process(item)
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+class CompressionMiddleware(GZipMiddleware):
+    """
+    GZipMiddleware with brotli support and a configurable size threshold.
+
+    Brotli is preferred when the client accepts it and the brotli package is
+    installed. Responses smaller than COMPRESS_MIN_SIZE bytes are sent as is;
+    streaming responses are always compressed since their size is unknown,
+    except server-sent event streams, whose events must not wait in a buffer.
+    """
+    brotli_quality = 5
+
+    def process_response(self, request, response):
+        if not response.streaming and len(response.content) < settings.COMPRESS_MIN_SIZE:
+            return response
+        if response.has_header('Content-Encoding') or response.get('Content-Type', '').startswith('text/event-stream'):
+            return response
+
+        accepted = _accepted_encodings(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        if brotli is None or accepted.get('br', 0) <= 0 or (response.streaming and response.is_async):
+            if accepted.get('gzip', 0) > 0:
+                return super().process_response(request, response)
+            patch_vary_headers(response, ('Accept-Encoding',))
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        if response.streaming:
+            response.streaming_content = _brotli_sequence(response.streaming_content, self.brotli_quality)
+            del response.headers['Content-Length']
+        else:
+            compressed_content = brotli.compress(response.content, quality=self.brotli_quality)
+            if len(compressed_content) >= len(response.content):
+                return response
+            response.content = compressed_content
+            response.headers['Content-Length'] = str(len(response.content))
+
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        response.headers['Content-Encoding'] = 'br'
+        return response
@@ -0,0 +1,93 @@
+import hashlib
+from functools import partial
+
+from django.conf import settings
+from django.core.paginator import EmptyPage, Page, PageNotAnInteger, Paginator
+from django.db.models import QuerySet
+from django.utils.functional import cached_property
+from rest_framework.pagination import PageNumberPagination
+from .cache_fill import get_or_fill, store
+from .database import table_count
+
+
+class ApproximatePage(Page):
+    def __init__(self, object_list, number, paginator, has_next):
+        super().__init__(object_list, number, paginator)
+        self._has_next = has_next
+
+    def has_next(self):
+        return self._has_next
+
+
+class ApproximateCountPaginator(Paginator):
+    """
+    Paginator that avoids running COUNT(*) over a queryset on every page.
+
+    Unfiltered large tables take their total from planner statistics
+    (PostgreSQL), which also count soft-deleted rows; other totals are
+    cached for PAGINATION_COUNT_CACHE_SECONDS.
+    Since the total can be off, page numbers are not checked against it and
+    each page fetches one extra row to tell whether there is a next page.
+    Lists, and querysets with `exact=True`, are paginated exactly.
+    """
+
+    def __init__(self, object_list, per_page, orphans=0, allow_empty_first_page=True, exact=False):
+        super().__init__(object_list, per_page, orphans, allow_empty_first_page)
+        self.exact = exact or not isinstance(object_list, QuerySet)
+
+    def count_cache_key(self):
+        sql, params = self.object_list.query.sql_with_params()
+        return 'pagination:count:' + hashlib.md5(repr((sql, params)).encode()).hexdigest()
+
+    @cached_property
+    def count(self):
+        if self.exact:
+            count = super().count
+            if isinstance(self.object_list, QuerySet):
+                store(self.count_cache_key(), count, settings.PAGINATION_COUNT_CACHE_SECONDS)
+            return count
+
+        # Only the default manager's own filter (e.g. soft deletes) counts as unfiltered
+        if self.object_list.query.where == self.object_list.model._default_manager.all().query.where:
+            count = table_count(self.object_list.model, settings.PAGINATION_ESTIMATE_THRESHOLD)
+            if count is not None:
+                return count
+
+        return get_or_fill(
+            'pagination_count', self.count_cache_key(),
+            lambda: super(ApproximateCountPaginator, self).count, settings.PAGINATION_COUNT_CACHE_SECONDS,
+        )
+
+    def validate_number(self, number):
+        if self.exact:
+            return super().validate_number(number)
+        try:
+            if isinstance(number, float) and not number.is_integer():
+                raise ValueError
+            number = int(number)
+        except (TypeError, ValueError):
+            raise PageNotAnInteger(self.error_messages['invalid_page'])
+        if number < 1:
+            raise EmptyPage(self.error_messages['min_page'])
+        return number
+
+    def page(self, number):
+        if self.exact:
+            return super().page(number)
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        rows = list(self.object_list[bottom:bottom + self.per_page + 1])
+        if not rows and number > 1:
+            raise EmptyPage(self.error_messages['no_results'])
+        return ApproximatePage(rows[:self.per_page], number, self, has_next=len(rows) > self.per_page)
+
+
+class ApproximateCountPagination(PageNumberPagination):
+    """PageNumberPagination with approximate totals; `?exact_count=true` asks for an exact one."""
+    django_paginator_class = ApproximateCountPaginator
+    exact_count_query_param = 'exact_count'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if request.query_params.get(self.exact_count_query_param, '').lower() in ('1', 'true', 'yes'):
+            self.django_paginator_class = partial(ApproximateCountPaginator, exact=True)
+        return super().paginate_queryset(queryset, request, view)
@@ -0,0 +1,222 @@
+"""
+Publish/subscribe for live events, over Redis or in process.
+
+publish() is called from sync views. Subscriptions live on the ASGI event
+loop, which shares a single Redis pub/sub connection between them. Without
+REDIS_URL, a LocalBroker delivers messages to subscribers in the same
+process, which is enough for tests and single-process development.
+
+A message has an event name, an optional coalesce key and pre-encoded JSON
+data. Messages with a coalesce key replace any pending message with the same
+key and are delivered at most once per `coalesce_interval`. The other
+messages are queued; a subscriber whose queue fills up, or whose Redis
+connection drops, is sent RESYNC instead.
+"""
+import asyncio
+import logging
+import threading
+from collections import defaultdict
+from contextlib import asynccontextmanager
+
+from django.conf import settings
+from redis.exceptions import RedisError
+from .redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+RESYNC = (b'resync', b'{}')
+
+
+def encode_message(event, data, coalesce_key=''):
+    return f'{event}\n{coalesce_key}\n'.encode() + data
+
+
+def decode_message(message):
+    event, coalesce_key, data = message.split(b'\n', 2)
+    return event, coalesce_key, data
+
+
+class Subscription:
+    def __init__(self, channel, max_queue, coalesce_interval):
+        self.channel = channel
+        self.loop = asyncio.get_running_loop()
+        self.coalesce_interval = coalesce_interval
+        self.needs_resync = False
+        self._queue = asyncio.Queue(max_queue)
+        self._pending = {}
+        self._next_flush = 0.0
+        self._flush_handle = None
+
+    def deliver(self, message):
+        """Accept a raw message; must be called on the subscription's loop."""
+        event, coalesce_key, data = decode_message(message)
+        if not coalesce_key:
+            self._put((event, data))
+            return
+        self._pending[coalesce_key] = (event, data)
+        if self._flush_handle is None:
+            delay = max(0.0, self._next_flush - self.loop.time())
+            self._flush_handle = self.loop.call_later(delay, self._flush)
+
+    def _flush(self):
+        self._flush_handle = None
+        self._next_flush = self.loop.time() + self.coalesce_interval
+        pending, self._pending = self._pending, {}
+        for item in pending.values():
+            self._put(item)
+
+    def _put(self, item):
+        if self.needs_resync:
+            return
+        try:
+            self._queue.put_nowait(item)
+        except asyncio.QueueFull:
+            # Too slow to keep up: the client has to refetch and reconnect
+            self.needs_resync = True
+
+    async def get(self, timeout):
+        """Return the next (event, data), RESYNC after an overflow, or None after `timeout` seconds."""
+        if self.needs_resync:
+            return RESYNC
+        try:
+            return await asyncio.wait_for(self._queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return RESYNC if self.needs_resync else None
+
+    def close(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+
+
+class LocalBroker:
+    """In-process broker, used when REDIS_URL is not configured."""
+
+    def __init__(self):
+        self._subscribers = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def publish(self, channel, message):
+        with self._lock:
+            subscribers = list(self._subscribers.get(channel, ()))
+        for subscription in subscribers:
+            subscription.loop.call_soon_threadsafe(subscription.deliver, message)
+
+    async def subscribe(self, subscription):
+        with self._lock:
+            self._subscribers[subscription.channel].add(subscription)
+
+    async def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers[subscription.channel].discard(subscription)
+            if not self._subscribers[subscription.channel]:
+                del self._subscribers[subscription.channel]
+
+
+class _LoopReader:
+    def __init__(self, client):
+        self.client = client
+        self.pubsub = client.pubsub()
+        self.subscribers = defaultdict(set)
+        self.task = None
+
+    async def listen(self):
+        while True:
+            message = await self.pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+            if message is None:
+                continue
+            for subscription in list(self.subscribers.get(message['channel'].decode(), ())):
+                subscription.deliver(message['data'])
+
+    async def close(self):
+        if self.task is not None:
+            self.task.cancel()
+        await self.pubsub.aclose()
+        await self.client.aclose()
+
+
+class RedisBroker:
+    """
+    Redis pub/sub over one connection per event loop, shared by all
+    subscriptions on it and closed when the last one ends.
+    """
+
+    def __init__(self):
+        # redis.asyncio connections are bound to the loop they were created on
+        self._readers = {}
+
+    def publish(self, channel, message):
+        get_redis().publish(channel, message)
+
+    async def subscribe(self, subscription):
+        reader = self._readers.get(subscription.loop)
+        if reader is None:
+            import redis.asyncio
+
+            reader = self._readers[subscription.loop] = _LoopReader(
+                redis.asyncio.Redis.from_url(settings.REDIS_URL, socket_connect_timeout=settings.REDIS_CONNECT_TIMEOUT)
+            )
+        subscribers = reader.subscribers[subscription.channel]
+        subscribers.add(subscription)
+        if len(subscribers) == 1:
+            await reader.pubsub.subscribe(subscription.channel)
+        if reader.task is None:
+            reader.task = subscription.loop.create_task(self._listen(reader))
+
+    async def _listen(self, reader):
+        try:
+            await reader.listen()
+        except RedisError:
+            # Messages may have been lost: send every subscriber away to resync
+            logger.warning("Redis pub/sub connection lost", exc_info=True)
+            if self._readers.get(asyncio.get_running_loop()) is reader:
+                del self._readers[asyncio.get_running_loop()]
+            for subscribers in reader.subscribers.values():
+                for subscription in subscribers:
+                    subscription.needs_resync = True
+            reader.task = None
+            await reader.close()
+
+    async def unsubscribe(self, subscription):
+        reader = self._readers.get(subscription.loop)
+        subscribers = reader.subscribers.get(subscription.channel, set()) if reader else set()
+        if subscription not in subscribers:
+            return
+        subscribers.discard(subscription)
+        if subscribers:
+            return
+        del reader.subscribers[subscription.channel]
+        if reader.subscribers:
+            await reader.pubsub.unsubscribe(subscription.channel)
+        else:
+            del self._readers[subscription.loop]
+            await reader.close()
+
+
+_broker = None
+
+
+def get_broker():
+    global _broker
+    if _broker is None:
+        _broker = RedisBroker() if get_redis() is not None else LocalBroker()
+    return _broker
+
+
+def publish(channel, event, data, coalesce_key=''):
+    """Publish pre-encoded JSON `data` as `event` on `channel`; live events are best effort."""
+    try:
+        get_broker().publish(channel, encode_message(event, data, coalesce_key))
+    except RedisError:
+        logger.warning("Could not publish %s on %s", event, channel, exc_info=True)
+
+
+@asynccontextmanager
+async def subscribe(channel):
+    subscription = Subscription(channel, settings.LIVE_EVENTS_QUEUE_SIZE, settings.LIVE_COALESCE_INTERVAL)
+    broker = get_broker()
+    await broker.subscribe(subscription)
+    try:
+        yield subscription
+    finally:
+        subscription.close()
+        await broker.unsubscribe(subscription)
@@ -0,0 +1,99 @@
+"""
+Requests that query budgets (query_budgets.json) are measured on.
+
+budget_requests() seeds a small dataset and yields one request per endpoint.
+Everything a request needs is prepared, and the caches are emptied, before
+the request is yielded, so that counting around the call only counts the
+endpoint's own queries against a cold cache. Both check_query_budgets and
+the tests run them, and need a test database in autocommit mode, as in
+production, so on_commit work such as timeline fan-out is counted too.
+"""
+import json
+from pathlib import Path
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+from authentication.models import PasswordResetOTP, User
+from comments.models import Comment
+from posts.models import Post
+from .local_cache import clear_local_caches
+from .seeding import SEED_PASSWORD, seed_dataset
+
+BUDGETS_FILE = Path(settings.BASE_DIR) / 'query_budgets.json'
+
+
+def load_budgets(path=BUDGETS_FILE):
+    with open(path) as f:
+        return json.load(f)
+
+
+def budget_requests():
+    """Yield (name, send) for each endpoint; send() makes the request and returns the response."""
+    seed_dataset(users=5, posts=12, comments=40, likes=30, seed=0)
+    owner, other = User.objects.order_by('id')[:2]
+    hot_post = Post.objects.order_by('id').first()
+    own_post = Post.objects.create(title='Owned post', body='Owned post body text', author=owner)
+    own_comment = Comment.objects.create(post=hot_post, body='Owned comment', author=owner)
+    own_comment.likes.add(other)
+    refresh = RefreshToken.for_user(owner)
+
+    client = APIClient(HTTP_HOST='localhost')
+    api = f'/api/{settings.API_VERSION}'
+
+    def latest_otp():
+        return PasswordResetOTP.objects.filter(user=owner).latest('created_at').otp_code
+
+    # Data may be a callable evaluated (uncounted) just before the request
+    scenarios = [
+        ('auth-signup', 'post', f'{api}/auth/signup/', {
+            'email': 'new@example.com', 'password': 'Str0ng-pass!', 'password_confirm': 'Str0ng-pass!',
+            'first_name': 'New', 'last_name': 'User',
+        }, False),
+        ('auth-login', 'post', f'{api}/auth/login/', {'email': owner.email, 'password': SEED_PASSWORD}, False),
+        ('auth-token-refresh', 'post', f'{api}/auth/token/refresh/', {'refresh': str(refresh)}, False),
+        ('auth-password-reset', 'post', f'{api}/auth/password-reset/', {'email': owner.email}, False),
+        ('auth-password-confirm', 'post', f'{api}/auth/password-confirm/', lambda: {
+            'email': owner.email, 'otp_code': latest_otp(),
+            'new_password': SEED_PASSWORD, 'confirm_password': SEED_PASSWORD,
+        }, False),
+        ('post-list', 'get', f'{api}/posts/', None, True),
+        ('post-changes', 'get', f'{api}/posts/changes/', None, True),
+        ('post-create', 'post', f'{api}/posts/', {'title': 'A new post', 'body': 'A new post body'}, True),
+        ('post-detail', 'get', f'{api}/posts/{hot_post.id}/', None, True),
+        ('post-update', 'put', f'{api}/posts/{own_post.id}/', {'title': 'Updated title'}, True),
+        ('post-like', 'post', f'{api}/posts/{hot_post.id}/like/', None, True),
+        ('post-likes-list', 'get', f'{api}/posts/{hot_post.id}/likes/', None, True),
+        ('post-events-token', 'post', f'{api}/posts/{hot_post.id}/events/token/', None, True),
+        ('comment-list', 'get', f'{api}/comments/?post_id={hot_post.id}', None, True),
+        ('comment-create', 'post', f'{api}/comments/', {'post_id': str(hot_post.id), 'body': 'Nice post'}, True),
+        ('comment-update', 'put', f'{api}/comments/{own_comment.id}/', {
+            'post_id': str(hot_post.id), 'body': 'Edited comment',
+        }, True),
+        ('comment-like', 'post', f'{api}/comments/{own_comment.id}/like/', None, True),
+        ('comment-likes-list', 'get', f'{api}/comments/{own_comment.id}/likes/', None, True),
+        ('user-follow', 'post', f'{api}/users/{other.id}/follow/', None, True),
+        ('timeline', 'get', f'{api}/timeline/', None, True),
+        ('comment-delete', 'delete', f'{api}/comments/{own_comment.id}/', None, True),
+        ('post-delete', 'delete', f'{api}/posts/{own_post.id}/', None, True),
+    ]
+
+    for name, method, path, data, authenticated in scenarios:
+        if callable(data):
+            data = data()
+        client.credentials(**(
+            {'HTTP_AUTHORIZATION': f'Bearer {refresh.access_token}'} if authenticated else {}
+        ))
+        # Budgets are for a cold cache, whatever the previous requests left in it
+        cache.clear()
+        clear_local_caches()
+
+        def send(method=method, path=path, data=data):
+            response = getattr(client, method)(path, data, format='json')
+            if response.streaming:
+                # Streamed list endpoints run their queries while the body is consumed
+                b''.join(response.streaming_content)
+            return response
+
+        yield name, send
@@ -0,0 +1,43 @@
+from rest_framework.utils import encoders
+from rest_framework.renderers import JSONRenderer
+from .middleware import serializer_timer
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer built on orjson.
+
+    The output is byte-for-byte the same as JSONRenderer's for serializer output,
+    where datetimes are already strings. Other data can differ: raw datetimes keep
+    their microseconds, and NaN and Infinity become null where JSONRenderer raises.
+    UUIDs are encoded natively; anything else orjson does not know goes through
+    DRF's JSONEncoder. Falls back to the stdlib renderer when orjson is not
+    installed or indented output is requested. Rendering counts towards the
+    request's serializer time.
+    """
+    options = orjson.OPT_NON_STR_KEYS | orjson.OPT_UTC_Z if orjson else 0
+    default = encoders.JSONEncoder().default
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        with serializer_timer():
+            return self._render(data, accepted_media_type, renderer_context)
+
+    def _render(self, data, accepted_media_type, renderer_context):
+        if orjson is None or not self.compact or self.ensure_ascii:
+            return super().render(data, accepted_media_type, renderer_context)
+        if data is None:
+            return b''
+        if self.get_indent(accepted_media_type, renderer_context or {}) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        ret = orjson.dumps(data, default=self.default, option=self.options)
+
+        # Match JSONRenderer: escape \u2028 and \u2029 so the output is a strict javascript subset
+        if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+        return ret
@@ -0,0 +1,80 @@
+"""
+The OpenAPI schema, generated once per process instead of on every request.
+
+drf-spectacular introspects every view to build the schema, which takes far
+longer than any API request. CachedSchemaView keeps the rendered schema per
+format, version and language, and serves it with an ETag so that clients
+revalidate with a 304. With OPENAPI_SCHEMA_FILE pointing at a schema written
+at build time by `manage.py spectacular`, nothing is generated at runtime.
+"""
+import hashlib
+import json
+import threading
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.http import parse_etags
+from drf_spectacular.views import SCHEMA_KWARGS, SpectacularAPIView
+from drf_spectacular.utils import extend_schema
+
+# Variants are few (formats x versions x languages); the limit only guards
+# against made-up version parameters
+MAX_CACHED_SCHEMAS = 32
+
+_schemas = {}
+_rendered = {}
+_lock = threading.Lock()
+
+
+def _load_schema_file(path):
+    with open(path, 'rb') as f:
+        if path.endswith('.json'):
+            return json.load(f)
+        import yaml
+
+        return yaml.safe_load(f)
+
+
+class CachedSchemaView(SpectacularAPIView):
+    @extend_schema(**SCHEMA_KWARGS)
+    def get(self, request, *args, **kwargs):
+        version = self.api_version or request.version or self._get_version_parameter(request)
+        lang = request.GET.get('lang') if settings.USE_I18N else None
+        if lang not in dict(settings.LANGUAGES):
+            lang = None
+        renderer = request.accepted_renderer
+        key = (type(renderer), version, lang)
+        rendered = _rendered.get(key)
+        if rendered is None:
+            with _lock:
+                rendered = _rendered.get(key) or self._render(request, version, lang, key)
+
+        content, etag = rendered
+        if etag in (tag.removeprefix('W/') for tag in parse_etags(request.headers.get('If-None-Match', ''))):
+            response = HttpResponseNotModified()
+        else:
+            content_type = renderer.media_type
+            if renderer.charset:
+                content_type += f'; charset={renderer.charset}'
+            response = HttpResponse(content, content_type=content_type)
+            response['Content-Disposition'] = f'inline; filename="{self._get_filename(request, version)}"'
+        response['ETag'] = etag
+        # Cacheable, but revalidated so a deploy with a new schema shows up at once
+        response['Cache-Control'] = 'no-cache'
+        return response
+
+    def _render(self, request, version, lang, key):
+        data = _schemas.get((version, lang))
+        if data is None:
+            if settings.OPENAPI_SCHEMA_FILE and not lang and version in (None, self.api_version):
+                data = _load_schema_file(settings.OPENAPI_SCHEMA_FILE)
+            else:
+                data = super().get(request).data
+            if len(_schemas) < MAX_CACHED_SCHEMAS:
+                _schemas[(version, lang)] = data
+        renderer = request.accepted_renderer
+        content = renderer.render(data, renderer.media_type, {'request': request})
+        rendered = (content, f'"{hashlib.sha256(content).hexdigest()[:32]}"')
+        if len(_rendered) < MAX_CACHED_SCHEMAS:
+            _rendered[key] = rendered
+        return rendered
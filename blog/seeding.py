@@ -0,0 +1,289 @@
+"""
+Deterministic synthetic data for benchmarks.
+
+Popularity is skewed with a Zipf distribution: a few authors write most posts,
+a few posts collect most comments and likes.
+
+seed_dataset() builds small datasets in one transaction. For production-sized
+ones, generate_chunk() builds a table in independent chunks: every chunk has
+its own random generator, and ids are derived from row numbers, so the data
+depends only on the seed, whatever the number of worker processes. Row numbers
+continue from the rows already in the database, so running again with the same
+seed adds rows instead of colliding with the ones it inserted before.
+"""
+import bisect
+import functools
+import hashlib
+import itertools
+import math
+import random
+import uuid
+from datetime import timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.db import connections, transaction
+from django.utils import timezone
+from authentication.models import User
+from comments.models import Comment
+from posts.models import Post
+from .importing import explicit_timestamps
+
+SEED_EMAIL_DOMAIN = 'bench.local'
+SEED_PASSWORD = 'benchmark-password'
+
+WORDS = (
+    'django api post comment like user feed cache query index latency worker '
+    'request response serializer database redis timeline author review draft '
+    'release deploy python model view blog page update write read share'
+).split()
+
+
+def zipf_cum_weights(n, s):
+    return list(itertools.accumulate(1 / (rank ** s) for rank in range(1, n + 1)))
+
+
+def seed_email(index):
+    return f'user{index}@{SEED_EMAIL_DOMAIN}'
+
+
+def _text(rng, min_words, max_words):
+    return ' '.join(rng.choices(WORDS, k=rng.randint(min_words, max_words)))
+
+
+def _uuid(rng):
+    return uuid.UUID(int=rng.getrandbits(128), version=4)
+
+
+def seed_dataset(users=100, posts=1000, comments=5000, likes=20000, seed=0, skew=1.1, batch_size=1000):
+    """
+    Insert a synthetic dataset and return the number of rows created per model.
+
+    All seeded users share SEED_PASSWORD so login can be benchmarked.
+    """
+    rng = random.Random(seed)
+    password = make_password(SEED_PASSWORD)
+    user_weights = zipf_cum_weights(users, skew)
+    post_weights = zipf_cum_weights(posts, skew)
+
+    with transaction.atomic():
+        start = User.objects.filter(email__endswith=f'@{SEED_EMAIL_DOMAIN}').count()
+        user_objs = User.objects.bulk_create([
+            User(
+                email=seed_email(i), username=seed_email(i), password=password,
+                first_name=f'User{i}', last_name='Bench',
+            )
+            for i in range(start, start + users)
+        ], batch_size=batch_size)
+        user_ids = [user.pk for user in user_objs]
+        if None in user_ids:
+            user_ids = list(
+                User.objects.filter(email__in=[u.email for u in user_objs])
+                .order_by('id').values_list('id', flat=True)
+            )
+
+        post_objs = Post.objects.bulk_create([
+            Post(
+                id=_uuid(rng),
+                title=_text(rng, 3, 10).capitalize(),
+                body=_text(rng, 30, 400),
+                author_id=rng.choices(user_ids, cum_weights=user_weights)[0],
+            )
+            for _ in range(posts)
+        ], batch_size=batch_size)
+        post_ids = [post.id for post in post_objs]
+
+        Comment.objects.bulk_create([
+            Comment(
+                id=_uuid(rng),
+                post_id=rng.choices(post_ids, cum_weights=post_weights)[0],
+                author_id=rng.choice(user_ids),
+                body=_text(rng, 3, 60),
+            )
+            for _ in range(comments)
+        ], batch_size=batch_size)
+
+        like_pairs = set()
+        for _ in range(likes):
+            like_pairs.add((
+                rng.choices(post_ids, cum_weights=post_weights)[0],
+                rng.choice(user_ids),
+            ))
+        Post.likes.through.objects.bulk_create([
+            Post.likes.through(post_id=post_id, user_id=user_id)
+            for post_id, user_id in sorted(like_pairs)
+        ], batch_size=batch_size, ignore_conflicts=True)
+
+    return {'users': users, 'posts': posts, 'comments': comments, 'likes': len(like_pairs)}
+
+
+# Rows per unit of work in generate_chunk(); chunking never changes the data
+SEED_CHUNK_SIZE = 20000
+SEED_TABLES = ('users', 'posts', 'comments', 'post_likes', 'comment_likes')
+
+
+@functools.lru_cache(maxsize=8)
+def _cached_cum_weights(n, s):
+    return zipf_cum_weights(n, s)
+
+
+def _zipf_index(rng, n, s):
+    """
+    Draw a row number in range(n), rank 1 being the most popular.
+
+    Ranks are scattered over the rows by a fixed permutation, so popular
+    posts are spread over time instead of all being the oldest.
+    """
+    cum_weights = _cached_cum_weights(n, s)
+    rank = bisect.bisect(cum_weights, rng.random() * cum_weights[-1])
+    step = next(p for p in (7919, 104729, 1299709) if math.gcd(p, n) == 1)
+    return min(rank, n - 1) * step % n
+
+
+def _row_uuid(plan, table, index):
+    index += plan['first_index'][table]
+    digest = hashlib.blake2b(f"{plan['seed']}:{table}:{index}".encode(), digest_size=16).digest()
+    return uuid.UUID(bytes=digest, version=4)
+
+
+@functools.lru_cache(maxsize=1)
+def _corpus():
+    return random.Random(0).choices(WORDS, k=100_000)
+
+
+def _lognormal_text(rng, median_words, sigma, min_words, max_words):
+    # Real posts and comments have a long tail of lengths. Slicing a shared
+    # corpus is much faster than drawing every word.
+    words = max(min_words, min(int(rng.lognormvariate(math.log(median_words), sigma)), max_words))
+    corpus = _corpus()
+    start = rng.randrange(len(corpus) - words)
+    return ' '.join(corpus[start:start + words])
+
+
+def seed_plan(users, posts, comments, post_likes, comment_likes, seed=0, skew=1.1, days=365):
+    """Return the parameters shared by every chunk of one run."""
+    first_user_id = (User.objects.order_by('-pk').values_list('pk', flat=True).first() or 0) + 1
+    return {
+        'rows': {
+            'users': users, 'posts': posts, 'comments': comments,
+            'post_likes': post_likes, 'comment_likes': comment_likes,
+        },
+        'seed': seed,
+        'skew': skew,
+        'first_user_id': first_user_id,
+        'first_index': {'posts': Post.all_objects.count(), 'comments': Comment.all_objects.count()},
+        'first_email_index': User.objects.filter(email__endswith=f'@{SEED_EMAIL_DOMAIN}').count(),
+        'password': make_password(SEED_PASSWORD),
+        'end': timezone.now(),
+        'span': timedelta(days=days),
+    }
+
+
+def _post_time(plan, index):
+    # Posts are evenly spread over the span, oldest first
+    return plan['end'] - plan['span'] * (1 - (index + 1) / plan['rows']['posts'])
+
+
+def _users(plan, rng, indexes):
+    password = plan['password']
+    for i in indexes:
+        email = seed_email(plan['first_email_index'] + i)
+        yield User(
+            id=plan['first_user_id'] + i, email=email, username=email, password=password,
+            first_name=f'User{i}', last_name='Bench', date_joined=plan['end'] - plan['span'],
+        )
+
+
+def _posts(plan, rng, indexes):
+    n_users = plan['rows']['users']
+    for i in indexes:
+        created_at = _post_time(plan, i)
+        yield Post(
+            id=_row_uuid(plan, 'posts', i),
+            title=_text(rng, 3, 12).capitalize(),
+            body=_lognormal_text(rng, 120, 0.9, 5, 3000),
+            author_id=plan['first_user_id'] + _zipf_index(rng, n_users, plan['skew']),
+            created_at=created_at, updated_at=created_at,
+        )
+
+
+def _comments(plan, rng, indexes):
+    n_posts, n_users = plan['rows']['posts'], plan['rows']['users']
+    for i in indexes:
+        post = _zipf_index(rng, n_posts, plan['skew'])
+        created_at = min(plan['end'], _post_time(plan, post) + timedelta(hours=rng.expovariate(1 / 12)))
+        yield Comment(
+            id=_row_uuid(plan, 'comments', i),
+            post_id=_row_uuid(plan, 'posts', post),
+            author_id=plan['first_user_id'] + rng.randrange(n_users),
+            body=_lognormal_text(rng, 15, 1.0, 1, 400),
+            created_at=created_at,
+        )
+
+
+def _like_pairs(plan, rng, indexes, target_table):
+    n_targets, n_users = plan['rows'][target_table], plan['rows']['users']
+    pairs = set()
+    for _ in indexes:
+        pairs.add((
+            _row_uuid(plan, target_table, _zipf_index(rng, n_targets, plan['skew'])),
+            plan['first_user_id'] + rng.randrange(n_users),
+        ))
+    return sorted(pairs)
+
+
+def _post_likes(plan, rng, indexes):
+    for post_id, user_id in _like_pairs(plan, rng, indexes, 'posts'):
+        yield Post.likes.through(post_id=post_id, user_id=user_id)
+
+
+def _comment_likes(plan, rng, indexes):
+    for comment_id, user_id in _like_pairs(plan, rng, indexes, 'comments'):
+        yield Comment.likes.through(comment_id=comment_id, user_id=user_id)
+
+
+_GENERATORS = {
+    'users': (User, _users),
+    'posts': (Post, _posts),
+    'comments': (Comment, _comments),
+    'post_likes': (Post.likes.through, _post_likes),
+    'comment_likes': (Comment.likes.through, _comment_likes),
+}
+
+
+def seed_chunks(plan, table):
+    """Return the chunk numbers of `table`, to be passed to generate_chunk()."""
+    return range(math.ceil(plan['rows'][table] / SEED_CHUNK_SIZE))
+
+
+def generate_chunk(plan, table, chunk):
+    """Return the model instances of one chunk of `table`."""
+    model, generate = _GENERATORS[table]
+    rng = random.Random(f"{plan['seed']}:{table}:{chunk}")
+    indexes = range(chunk * SEED_CHUNK_SIZE, min((chunk + 1) * SEED_CHUNK_SIZE, plan['rows'][table]))
+    return list(generate(plan, rng, indexes))
+
+
+def insert_chunk(table, objs, batch_size=5000):
+    """
+    Insert the output of generate_chunk() and return the number of rows.
+
+    Like pairs drawn twice within a chunk are inserted once, and ones drawn in
+    several chunks are skipped as conflicts, so like tables end up with
+    somewhat fewer rows than requested.
+    """
+    model, _ = _GENERATORS[table]
+    with explicit_timestamps(), transaction.atomic():
+        model.objects.bulk_create(objs, batch_size=batch_size, ignore_conflicts=table.endswith('_likes'))
+    return len(objs)
+
+
+def seed_chunk_in_process(plan, table, chunk, batch_size=None):
+    """
+    Generate a chunk in a worker process, and insert it unless `batch_size`
+    is None, in which case the instances are returned to the parent.
+    """
+    try:
+        objs = generate_chunk(plan, table, chunk)
+        return objs if batch_size is None else insert_chunk(table, objs, batch_size)
+    finally:
+        connections.close_all()
@@ -3,6 +3,7 @@ import os
 from decouple import config
 from pathlib import Path
 from datetime import timedelta
+from django.core.exceptions import ImproperlyConfigured
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -28,10 +29,14 @@ INSTALLED_APPS = [
     "blog",
     "authentication",
     "posts",
-    "comments"
+    "comments",
+    "follows",
 ]
 
 MIDDLEWARE = [
+    "blog.middleware.PerformanceMiddleware",
+    "blog.middleware.CompressionMiddleware",
+    "blog.middleware.ReplicaMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "corsheaders.middleware.CorsMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
@@ -64,15 +69,61 @@ WSGI_APPLICATION = "blog.wsgi.application"
 
 DATABASES = {
     "default": {
-        "ENGINE": "django.db.backends.mysql",
+        "ENGINE": config('DB_ENGINE', default='django.db.backends.mysql'),
         "NAME": config('DB_NAME'),
-        "USER": config('DB_USER'),
-        "PASSWORD": config('DB_PASSWORD'),
+        "USER": config('DB_USER', default=''),
+        "PASSWORD": config('DB_PASSWORD', default=''),
         "HOST": config('DB_HOST', default='localhost'),
-        "PORT": config('DB_PORT', default='3306'),
+        # Empty uses the driver's default port (3306 for MySQL, 5432 for PostgreSQL)
+        "PORT": config('DB_PORT', default=''),
+        # Keep each worker's connection for DB_CONN_MAX_AGE seconds instead of reconnecting on every
+        # request, checking it is still usable before reuse.
+        "CONN_MAX_AGE": config('DB_CONN_MAX_AGE', default=60, cast=int),
+        "CONN_HEALTH_CHECKS": config('DB_CONN_HEALTH_CHECKS', default=True, cast=bool),
     }
 }
 
+# Bounded per-process connection pool, for ASGI where connections cannot be kept per thread.
+# PostgreSQL uses Django's native pool (psycopg 3), MySQL the pooled backend in blog.db_backends.
+DB_POOL = config('DB_POOL', default=False, cast=bool)
+DB_POOL_MIN_SIZE = config('DB_POOL_MIN_SIZE', default=2, cast=int)
+DB_POOL_MAX_SIZE = config('DB_POOL_MAX_SIZE', default=10, cast=int)
+DB_POOL_TIMEOUT = config('DB_POOL_TIMEOUT', default=10, cast=float)
+
+# Set by blog.asgi. Requests there run in short-lived threads, so a connection kept
+# per thread is never reused or closed: without the pool, reconnect on every request.
+DJANGO_ASGI = config('DJANGO_ASGI', default=False, cast=bool)
+
+if DB_POOL or DJANGO_ASGI:
+    DATABASES['default']['CONN_MAX_AGE'] = 0
+if DB_POOL:
+    if DATABASES['default']['ENGINE'] == 'django.db.backends.postgresql':
+        DATABASES['default']['OPTIONS'] = {'pool': {
+            'min_size': DB_POOL_MIN_SIZE, 'max_size': DB_POOL_MAX_SIZE, 'timeout': DB_POOL_TIMEOUT,
+        }}
+    elif DATABASES['default']['ENGINE'] == 'django.db.backends.mysql':
+        DATABASES['default']['ENGINE'] = 'blog.db_backends.mysql_pool'
+
+# Optional read replicas, as comma-separated host[:port] entries (database file paths for SQLite).
+# GET requests read from a replica unless the user wrote within DB_REPLICA_PIN_SECONDS;
+# a failing replica is skipped for DB_REPLICA_RETRY_SECONDS.
+DB_REPLICAS_STR = config('DB_REPLICAS', default='')
+DB_REPLICA_PIN_SECONDS = config('DB_REPLICA_PIN_SECONDS', default=10, cast=int)
+DB_REPLICA_RETRY_SECONDS = config('DB_REPLICA_RETRY_SECONDS', default=30, cast=int)
+
+DATABASE_REPLICAS = []
+for index, replica in enumerate((r.strip() for r in DB_REPLICAS_STR.split(',') if r.strip()), start=1):
+    alias = f'replica{index}'
+    if DATABASES['default']['ENGINE'] == 'django.db.backends.sqlite3':
+        DATABASES[alias] = {**DATABASES['default'], 'NAME': replica}
+    else:
+        host, _, port = replica.partition(':')
+        DATABASES[alias] = {**DATABASES['default'], 'HOST': host, 'PORT': port or DATABASES['default']['PORT']}
+    DATABASES[alias]['TEST'] = {'MIRROR': 'default'}
+    DATABASE_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ['blog.db_router.ReplicaRouter']
+
 
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -115,11 +166,38 @@ MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'authentication.authentication.CachedJWTAuthentication',
     ),
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
+    'DEFAULT_RENDERER_CLASSES': (
+        'blog.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+    'DEFAULT_PARSER_CLASSES': (
+        'blog.parsers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ),
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 10,
+    # Proxies in front of the app (nginx in production): anonymous throttles key on the client
+    # address the nearest proxy appended to X-Forwarded-For, not on entries the client sent itself.
+    # 0 ignores X-Forwarded-For and uses the connection's address.
+    'NUM_PROXIES': config('NUM_PROXIES', default=1, cast=int),
+    'DEFAULT_THROTTLE_CLASSES': (
+        'blog.throttling.AnonSlidingWindowThrottle',
+        'blog.throttling.UserSlidingWindowThrottle',
+        'blog.throttling.ScopedSlidingWindowThrottle',
+    ),
+    'DEFAULT_THROTTLE_RATES': {
+        'anon': config('THROTTLE_RATE_ANON', default='120/min'),
+        'user': config('THROTTLE_RATE_USER', default='600/min'),
+        'signup': config('THROTTLE_RATE_SIGNUP', default='10/hour'),
+        'login': config('THROTTLE_RATE_LOGIN', default='10/min'),
+        'password_reset': config('THROTTLE_RATE_PASSWORD_RESET', default='5/hour'),
+        'password_confirm': config('THROTTLE_RATE_PASSWORD_CONFIRM', default='10/hour'),
+        'likes': config('THROTTLE_RATE_LIKES', default='60/min'),
+    },
 }
 
 SPECTACULAR_SETTINGS = {
@@ -128,6 +206,8 @@ SPECTACULAR_SETTINGS = {
     'VERSION': '1.0.0',
     'SERVE_INCLUDE_SCHEMA': False,
 }
+# Schema written at build time by `manage.py spectacular`; without it the schema is generated on first request
+OPENAPI_SCHEMA_FILE = config('OPENAPI_SCHEMA_FILE', default='')
 
 CORS_ALLOWED_ORIGINS = [
     "http://localhost:3000",
@@ -151,4 +231,120 @@ AUTH_USER_MODEL = 'authentication.User'
 AUTHENTICATION_BACKENDS = [
     'authentication.backends.EmailBackend',
     'django.contrib.auth.backends.ModelBackend',
-]
\ No newline at end of file
+]
+
+REDIS_URL = config('REDIS_URL', default='')
+# Seconds to wait for Redis to accept a connection and to answer a command
+REDIS_CONNECT_TIMEOUT = config('REDIS_CONNECT_TIMEOUT', default=1.0, cast=float)
+REDIS_SOCKET_TIMEOUT = config('REDIS_SOCKET_TIMEOUT', default=2.0, cast=float)
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    # Per-process throttle counters while Redis is unreachable (blog.throttling)
+    'throttle_fallback': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'throttle-fallback',
+    },
+}
+if REDIS_URL:
+    CACHES['default'] = {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': REDIS_URL,
+        'OPTIONS': {
+            'socket_connect_timeout': REDIS_CONNECT_TIMEOUT,
+            'socket_timeout': REDIS_SOCKET_TIMEOUT,
+        },
+    }
+elif DATABASE_REPLICAS:
+    # blog.db_router pins users to the primary in the cache; per-process memory would let
+    # another worker serve a replica read right after a write
+    raise ImproperlyConfigured("DB_REPLICAS requires REDIS_URL, so every worker sees the primary pin")
+
+# Without a broker, tasks run inline so local development needs no worker.
+CELERY_BROKER_URL = config('CELERY_BROKER_URL', default=REDIS_URL or 'memory://')
+CELERY_TASK_ALWAYS_EAGER = config('CELERY_TASK_ALWAYS_EAGER', default=not REDIS_URL, cast=bool)
+
+# Home timeline: posts are copied into followers' timelines at write time,
+# except for authors above the follower limit, whose posts are merged in at read time.
+TIMELINE_MAX_ENTRIES = config('TIMELINE_MAX_ENTRIES', default=800, cast=int)
+TIMELINE_FANOUT_FOLLOWER_LIMIT = config('TIMELINE_FANOUT_FOLLOWER_LIMIT', default=10000, cast=int)
+TIMELINE_FANOUT_BATCH_SIZE = config('TIMELINE_FANOUT_BATCH_SIZE', default=1000, cast=int)
+
+# Write-behind like buffering (requires REDIS_URL): post like toggles are
+# recorded in Redis and flushed to the database every LIKE_BUFFER_FLUSH_INTERVAL seconds.
+LIKE_BUFFER_ENABLED = config('LIKE_BUFFER_ENABLED', default=False, cast=bool)
+LIKE_BUFFER_FLUSH_INTERVAL = config('LIKE_BUFFER_FLUSH_INTERVAL', default=5, cast=float)
+LIKE_BUFFER_BATCH_SIZE = config('LIKE_BUFFER_BATCH_SIZE', default=1000, cast=int)
+
+# Post change feed (/posts/changes/): changes younger than POSTS_SYNC_LAG_SECONDS are held back,
+# and deletions are remembered for POSTS_SYNC_TOMBSTONE_DAYS.
+POSTS_SYNC_LAG_SECONDS = config('POSTS_SYNC_LAG_SECONDS', default=5, cast=int)
+POSTS_SYNC_TOMBSTONE_DAYS = config('POSTS_SYNC_TOMBSTONE_DAYS', default=30, cast=int)
+
+CELERY_BEAT_SCHEDULE = {
+    'prune-post-tombstones': {
+        'task': 'posts.tasks.prune_post_tombstones',
+        'schedule': 24 * 60 * 60,
+    },
+    'purge-deleted': {
+        'task': 'posts.tasks.purge_deleted',
+        'schedule': 60 * 60,
+    },
+    'trim-timelines': {
+        'task': 'follows.tasks.trim_timelines',
+        'schedule': 60 * 60,
+    },
+}
+if LIKE_BUFFER_ENABLED:
+    CELERY_BEAT_SCHEDULE['flush-like-buffer'] = {
+        'task': 'posts.tasks.flush_like_buffer',
+        'schedule': LIKE_BUFFER_FLUSH_INTERVAL,
+    }
+
+# Paginated totals over unfiltered tables at least this large are estimated from
+# table statistics (PostgreSQL); other totals are cached for PAGINATION_COUNT_CACHE_SECONDS.
+PAGINATION_ESTIMATE_THRESHOLD = config('PAGINATION_ESTIMATE_THRESHOLD', default=100000, cast=int)
+PAGINATION_COUNT_CACHE_SECONDS = config('PAGINATION_COUNT_CACHE_SECONDS', default=60, cast=int)
+# The first page of the post list is cached for FEED_CACHE_SECONDS (0 disables)
+FEED_CACHE_SECONDS = config('FEED_CACHE_SECONDS', default=5, cast=int)
+
+# Expensive cached values are refilled by one request at a time (blog.cache_fill): others
+# get the previous value for up to CACHE_FILL_STALE_SECONDS past its expiry, or wait for
+# the fill. The fill lock expires after CACHE_FILL_LOCK_SECONDS; CACHE_FILL_BETA > 1
+# refreshes values earlier.
+CACHE_FILL_STALE_SECONDS = config('CACHE_FILL_STALE_SECONDS', default=30, cast=int)
+CACHE_FILL_LOCK_SECONDS = config('CACHE_FILL_LOCK_SECONDS', default=10, cast=int)
+CACHE_FILL_BETA = config('CACHE_FILL_BETA', default=1.0, cast=float)
+
+# Hot posts and authenticated users are cached in each worker's memory in front of
+# the shared cache (blog.local_cache); invalidations reach every worker over Redis pub/sub.
+LOCAL_CACHE_MAX_ENTRIES = config('LOCAL_CACHE_MAX_ENTRIES', default=2000, cast=int)
+LOCAL_CACHE_SECONDS = config('LOCAL_CACHE_SECONDS', default=10, cast=float)
+SHARED_CACHE_SECONDS = config('SHARED_CACHE_SECONDS', default=300, cast=int)
+
+# Per-request instrumentation (blog.middleware.PerformanceMiddleware)
+PERF_QUERY_BUDGET = config('PERF_QUERY_BUDGET', default=30, cast=int)
+PERF_SERVER_TIMING = config('PERF_SERVER_TIMING', default=DEBUG, cast=bool)
+METRICS_TOKEN = config('METRICS_TOKEN', default='')
+
+# Responses smaller than this are not worth compressing (blog.middleware.CompressionMiddleware)
+COMPRESS_MIN_SIZE = config('COMPRESS_MIN_SIZE', default=1024, cast=int)
+# Rows fetched per database round trip and encoded per chunk by streaming list endpoints
+STREAMING_JSON_CHUNK_SIZE = config('STREAMING_JSON_CHUNK_SIZE', default=500, cast=int)
+
+# Rows per DELETE statement when deleting a post's or user's dependent rows (posts.deletion)
+DELETE_BATCH_SIZE = config('DELETE_BATCH_SIZE', default=5000, cast=int)
+# Soft-deleted posts and comments are purged for good after this many days
+SOFT_DELETE_RETENTION_DAYS = config('SOFT_DELETE_RETENTION_DAYS', default=30, cast=int)
+
+# Live post updates over server-sent events (posts.events, ASGI only)
+LIVE_HEARTBEAT_SECONDS = config('LIVE_HEARTBEAT_SECONDS', default=15, cast=int)
+LIVE_RETRY_MS = config('LIVE_RETRY_MS', default=3000, cast=int)
+# Like count updates per post/comment are sent at most once per interval
+LIVE_COALESCE_INTERVAL = config('LIVE_COALESCE_INTERVAL', default=1.0, cast=float)
+# Events buffered per client before a slow client is told to resync and dropped
+LIVE_EVENTS_QUEUE_SIZE = config('LIVE_EVENTS_QUEUE_SIZE', default=100, cast=int)
+# Seconds a stream token (for EventSource, which cannot send headers) can be used to open a stream
+LIVE_STREAM_TOKEN_SECONDS = config('LIVE_STREAM_TOKEN_SECONDS', default=30, cast=int)
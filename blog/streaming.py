@@ -0,0 +1,51 @@
+"""
+Streaming JSON responses for large unpaginated lists.
+
+Rows are encoded and sent in batches as they are read, so a thread with
+tens of thousands of comments never exists as one Python list or one
+rendered string in the worker.
+"""
+from itertools import islice
+
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from rest_framework.renderers import JSONRenderer
+
+
+def can_stream(request):
+    """Streaming bypasses the renderer, so only use it for compact JSON output."""
+    renderer = getattr(request, 'accepted_renderer', None)
+    return (
+        isinstance(renderer, JSONRenderer)
+        and renderer.get_indent(request.accepted_media_type, {}) is None
+    )
+
+
+def _encode(renderer, rows, prefix, suffix):
+    yield prefix
+    first = True
+    rows = iter(rows)
+    while batch := list(islice(rows, settings.STREAMING_JSON_CHUNK_SIZE)):
+        # Render the batch as an array and strip the brackets to get comma separated items
+        encoded = renderer.render(batch)[1:-1]
+        yield encoded if first else b',' + encoded
+        first = False
+    yield suffix
+
+
+class StreamingJSONResponse(StreamingHttpResponse):
+    """
+    Stream `rows` as a JSON array, or as the last member `key` of `envelope`.
+
+    The output is byte-identical to rendering the complete list with `renderer`.
+    """
+
+    def __init__(self, rows, renderer, envelope=None, key=None, **kwargs):
+        kwargs.setdefault('content_type', 'application/json')
+        if envelope is None:
+            prefix, suffix = b'[', b']'
+        else:
+            head = renderer.render(envelope)[:-1]
+            prefix = head + (b',' if envelope else b'') + renderer.render(key) + b':['
+            suffix = b']}'
+        super().__init__(_encode(renderer, rows, prefix, suffix), **kwargs)
@@ -0,0 +1,637 @@
+import csv
+import gzip
+import importlib.util
+import json
+import os
+import tempfile
+import threading
+import time
+from io import StringIO
+from unittest import mock, skipUnless
+
+import fakeredis
+import redis
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.management import CommandError, call_command
+from django.db import connection, connections
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework import serializers
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+from rest_framework.throttling import SimpleRateThrottle
+from rest_framework_simplejwt.tokens import RefreshToken
+from authentication.models import User
+from comments.models import Comment
+from comments.serializers import CommentSerializer
+from posts.models import Post
+from posts.serializers import PostSerializer
+from . import db_pool, db_router, middleware
+from .benchmarking import build_comment_page, build_post_page
+from .cache_fill import get_or_fill, store
+from .db_pool import ConnectionPool, PoolTimeout
+from .fast_serializers import compile_serializer
+from .local_cache import CHANNEL, TieredCache, _listen, clear_local_caches
+from .query_budgets import budget_requests, load_budgets
+from .renderers import FastJSONRenderer
+from .seeding import seed_dataset
+from .throttling import SlidingWindowThrottle
+
+# Nothing listens here, so connecting fails at once
+DOWN_REDIS_URL = 'redis://127.0.0.1:1/0'
+DOWN_REDIS_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': DOWN_REDIS_URL},
+    'throttle_fallback': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'throttle-fallback'},
+}
+
+
+@override_settings(LIKE_BUFFER_ENABLED=False)
+class QueryBudgetTests(TransactionTestCase):
+    # Autocommit, as in production, so on_commit work runs inside each request
+
+    def test_endpoints_run_their_budgeted_queries(self):
+        budgets = load_budgets()
+        for name, send in budget_requests():
+            with self.subTest(name):
+                self.assertIn(name, budgets, "no budget; run check_query_budgets --update")
+                if connection.vendor == 'sqlite':
+                    # Budgets are recorded on SQLite
+                    with self.assertNumQueries(budgets[name]):
+                        response = send()
+                else:
+                    with CaptureQueriesContext(connection) as queries:
+                        response = send()
+                    self.assertLessEqual(len(queries), budgets[name])
+                self.assertLess(response.status_code, 400)
+
+
+class CompiledSerializerTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        seed_dataset(users=5, posts=12, comments=40, likes=30, seed=0)
+
+    def assertSameOutput(self, serializer_class, objs):
+        compiled = compile_serializer(serializer_class)
+        expected = JSONRenderer().render(serializer_class(objs, many=True).data)
+        self.assertEqual(JSONRenderer().render(compiled.many(objs)), expected)
+        self.assertEqual(JSONRenderer().render(list(compiled.iter(objs))), expected)
+
+    def test_built_pages_match_drf(self):
+        self.assertSameOutput(PostSerializer, build_post_page(30))
+        self.assertSameOutput(CommentSerializer, build_comment_page(30))
+
+    def test_database_rows_match_drf(self):
+        self.assertSameOutput(PostSerializer, list(Post.objects.with_counts()))
+        self.assertSameOutput(CommentSerializer, list(Comment.objects.with_counts()))
+
+    @override_settings(TIME_ZONE='America/New_York')
+    def test_datetimes_use_the_current_time_zone(self):
+        self.assertSameOutput(PostSerializer, list(Post.objects.with_counts()))
+
+    def test_custom_to_representation_is_refused(self):
+        class CustomSerializer(serializers.Serializer):
+            def to_representation(self, instance):
+                return {}
+
+        with self.assertRaises(TypeError):
+            compile_serializer(CustomSerializer)
+
+
+class FastJSONRendererTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        seed_dataset(users=5, posts=12, comments=40, likes=30, seed=0)
+
+    def assertSameBytes(self, data, **context):
+        self.assertEqual(
+            FastJSONRenderer().render(data, renderer_context=context),
+            JSONRenderer().render(data, renderer_context=context),
+        )
+
+    def test_serializer_pages_render_identically(self):
+        post = Post.objects.order_by('id').first()
+        Post.objects.filter(pk=post.pk).update(title='Line\u2028separator — and ünïcode')
+        self.assertSameBytes(PostSerializer(Post.objects.with_counts(), many=True).data)
+        self.assertSameBytes(PostSerializer(build_post_page(30), many=True).data)
+        self.assertSameBytes(PostSerializer(Post.objects.with_counts(), many=True).data, indent=2)
+
+
+class MetricsTests(TestCase):
+    def test_not_served_without_a_token_outside_debug(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 404)
+        with override_settings(DEBUG=True):
+            self.assertEqual(self.client.get('/metrics').status_code, 200)
+
+    @override_settings(METRICS_TOKEN='metrics-token')
+    def test_token_is_required(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 403)
+        self.assertEqual(self.client.get('/metrics', headers={'Authorization': 'Bearer wrong'}).status_code, 403)
+        response = self.client.get('/metrics', headers={'Authorization': 'Bearer metrics-token'})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'worker_requests_total', response.content)
+
+    @override_settings(PERF_SERVER_TIMING=True)
+    def test_serializer_time_comes_from_compiled_serializers_and_rendering(self):
+        user = User.objects.create_user(email='reader@example.com', password='Str0ng-pass!')
+        Post.objects.create(title='Timed post', body='A post to serialize', author=user)
+        api = APIClient()
+        api.force_authenticate(user)
+        timer = mock.MagicMock(wraps=middleware.serializer_timer)
+        with mock.patch('blog.fast_serializers.serializer_timer', timer), \
+                mock.patch('blog.renderers.serializer_timer', timer):
+            response = api.get('/api/v1/posts/?page_size=5')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(timer.call_count, 2)
+        self.assertIn('serialize;dur=', response['Server-Timing'])
+        # DRF's own serializers are left alone
+        for cls in (serializers.Serializer, serializers.ListSerializer):
+            self.assertEqual(cls.data.fget.__module__, 'rest_framework.serializers')
+
+
+class FakeConnection:
+    def __init__(self):
+        self.broken = False
+        self.closed = False
+
+    def ping(self):
+        if self.broken:
+            raise OSError("server has gone away")
+
+    def close(self):
+        self.closed = True
+
+
+class ConnectionPoolTests(SimpleTestCase):
+    def setUp(self):
+        self.opened = []
+
+    def connect(self):
+        self.opened.append(FakeConnection())
+        return self.opened[-1]
+
+    def checkout(self, pool):
+        return pool.get(self.connect, FakeConnection.ping)
+
+    def test_first_checkout_opens_min_size(self):
+        pool = ConnectionPool('pooled', max_size=4, timeout=1, min_size=3)
+        conn = self.checkout(pool)
+        self.assertEqual(len(self.opened), 3)
+        self.assertEqual(pool.stats(), {'size': 3, 'idle': 2, 'in_use': 1, 'max_size': 4})
+        self.checkout(pool)
+        self.assertEqual(len(self.opened), 3)
+        pool.put(conn)
+        self.assertIs(self.checkout(pool), conn)
+
+    def test_returned_connection_is_reused(self):
+        pool = ConnectionPool('pooled', max_size=2, timeout=1)
+        conn = self.checkout(pool)
+        pool.put(conn)
+        self.assertIs(self.checkout(pool), conn)
+        self.assertEqual(len(self.opened), 1)
+
+    def test_broken_connections_are_discarded(self):
+        pool = ConnectionPool('pooled', max_size=2, timeout=1)
+        first, second = self.checkout(pool), self.checkout(pool)
+        pool.discard(first)
+        self.assertTrue(first.closed)
+        # Went away while idle
+        pool.put(second)
+        second.broken = True
+        replacement = self.checkout(pool)
+        self.assertTrue(second.closed)
+        self.assertNotIn(replacement, (first, second))
+        self.assertEqual(pool.stats(), {'size': 1, 'idle': 0, 'in_use': 1, 'max_size': 2})
+
+    def test_checkout_waits_for_a_free_connection(self):
+        pool = ConnectionPool('pooled', max_size=1, timeout=0.1)
+        self.checkout(pool)
+        with self.assertRaises(PoolTimeout):
+            self.checkout(pool)
+
+
+@skipUnless(importlib.util.find_spec('MySQLdb'), "mysqlclient is not installed")
+class MySQLPoolBackendTests(SimpleTestCase):
+    def setUp(self):
+        from .db_backends.mysql_pool.base import DatabaseWrapper
+
+        self.pool = ConnectionPool('pooled', max_size=2, timeout=1)
+        patcher = mock.patch.dict(db_pool.pools, {'pooled': self.pool})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.conn = self.pool.get(FakeConnection, FakeConnection.ping)
+        self.wrapper = DatabaseWrapper({'ENGINE': 'blog.db_backends.mysql_pool', 'NAME': 'blog'}, alias='pooled')
+        self.wrapper.connection, self.wrapper.autocommit = self.conn, True
+
+    def test_closing_returns_the_connection_to_the_pool(self):
+        self.wrapper.close()
+        self.assertIsNone(self.wrapper.connection)
+        self.assertFalse(self.conn.closed)
+        self.assertEqual(self.pool.stats(), {'size': 1, 'idle': 1, 'in_use': 0, 'max_size': 2})
+
+    def test_connection_after_an_error_is_discarded(self):
+        self.wrapper.errors_occurred = True
+        self.wrapper.close()
+        self.assertTrue(self.conn.closed)
+        self.assertEqual(self.pool.stats(), {'size': 0, 'idle': 0, 'in_use': 0, 'max_size': 2})
+
+
+class CacheFillTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.computations = 0
+        self.lock = threading.Lock()
+
+    def compute(self, value='fresh', seconds=0.2):
+        def compute():
+            with self.lock:
+                self.computations += 1
+            time.sleep(seconds)
+            return value
+        return compute
+
+    def fill_concurrently(self, key, threads=16):
+        results = []
+        start = threading.Barrier(threads)
+
+        def worker():
+            start.wait()
+            value = get_or_fill('test', key, self.compute(), 60)
+            with self.lock:
+                results.append(value)
+
+        workers = [threading.Thread(target=worker) for _ in range(threads)]
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+        return results
+
+    def test_a_cold_key_is_computed_once(self):
+        results = self.fill_concurrently('cache-fill-test:cold')
+        self.assertEqual(self.computations, 1)
+        self.assertEqual(results, ['fresh'] * 16)
+
+    def test_an_expired_key_is_refreshed_once_while_others_get_the_old_value(self):
+        store('cache-fill-test:expired', 'old', timeout=-1)
+        results = self.fill_concurrently('cache-fill-test:expired')
+        self.assertEqual(self.computations, 1)
+        self.assertEqual(results.count('fresh'), 1)
+        self.assertEqual(results.count('old'), 15)
+        self.assertEqual(get_or_fill('test', 'cache-fill-test:expired', self.compute('newer'), 60), 'fresh')
+
+    def test_a_fresh_key_is_not_recomputed(self):
+        get_or_fill('test', 'cache-fill-test:fresh', self.compute(seconds=0), 60)
+        get_or_fill('test', 'cache-fill-test:fresh', self.compute('newer', seconds=0), 60)
+        self.assertEqual(self.computations, 1)
+
+    def test_stale_caps_how_long_an_expired_value_is_kept(self):
+        get_or_fill('test', 'cache-fill-test:capped', self.compute(seconds=0), 0.1, stale=0.1)
+        time.sleep(0.3)
+        self.assertIsNone(cache.get('cache-fill-test:capped'))
+
+
+class TieredCacheTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.tiered = TieredCache('tiered-test')
+        self.loads = 0
+        # The listener is started by the pub/sub test itself
+        patcher = mock.patch('blog.local_cache._start_listener')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def use_redis(self, client):
+        patcher = mock.patch('blog.local_cache.get_redis', return_value=client)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def load(self, value='loaded'):
+        def load():
+            self.loads += 1
+            return value
+        return load
+
+    def test_local_hit(self):
+        self.assertEqual(self.tiered.get(1, self.load()), 'loaded')
+        self.assertEqual(self.tiered.get(1, self.load('reloaded')), 'loaded')
+        self.assertEqual(self.loads, 1)
+
+    def test_shared_hit(self):
+        self.use_redis(fakeredis.FakeRedis())
+        cache.set('tiered-test:1', 'shared')
+        self.assertEqual(self.tiered.get(1, self.load()), 'shared')
+        self.assertEqual(self.loads, 0)
+        # And the other way round: a miss fills the shared level for other workers
+        self.assertEqual(self.tiered.get(2, self.load()), 'loaded')
+        self.assertEqual(cache.get('tiered-test:2'), 'loaded')
+
+    def test_invalidation_reaches_other_processes(self):
+        server = fakeredis.FakeServer()
+        client = fakeredis.FakeRedis(server=server)
+        self.use_redis(client)
+        with mock.patch.object(redis.Redis, 'from_url', return_value=fakeredis.FakeRedis(server=server)):
+            threading.Thread(target=_listen, daemon=True).start()
+            deadline = time.monotonic() + 5
+            while not client.pubsub_numsub(CHANNEL)[0][1]:
+                self.assertLess(time.monotonic(), deadline, "the listener did not subscribe")
+                time.sleep(0.01)
+
+        self.tiered.get(1, self.load())
+        cache.delete('tiered-test:1')
+        # As another worker's invalidate() would
+        client.publish(CHANNEL, 'tiered-test:1')
+        deadline = time.monotonic() + 5
+        while self.tiered.local.get('1') is not None:
+            self.assertLess(time.monotonic(), deadline, "the local entry was not dropped")
+            time.sleep(0.01)
+        self.assertEqual(self.tiered.get(1, self.load('reloaded')), 'reloaded')
+
+    @override_settings(CACHES=DOWN_REDIS_CACHES)
+    def test_falls_back_to_the_loader_and_local_cache_when_redis_is_down(self):
+        self.use_redis(redis.Redis.from_url(DOWN_REDIS_URL))
+        with self.assertLogs('blog.local_cache', 'WARNING'):
+            self.assertEqual(self.tiered.get(1, self.load()), 'loaded')
+        self.assertEqual(self.tiered.get(1, self.load('reloaded')), 'loaded')
+        self.assertEqual(self.loads, 1)
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReplicaRoutingTests(TransactionTestCase):
+    # Two extra aliases for this class: 'replica' mirrors the test database,
+    # 'broken_replica' is an empty SQLite database where every query fails.
+    # '__all__' picks them up once they are registered in setUpClass().
+    databases = '__all__'
+    replicas = ('replica', 'broken_replica')
+
+    @classmethod
+    def setUpClass(cls):
+        cls.broken_replica_file = tempfile.NamedTemporaryFile(suffix='.sqlite3')
+        replicas = {
+            'replica': connections['default'].settings_dict,
+            'broken_replica': {'ENGINE': 'django.db.backends.sqlite3', 'NAME': cls.broken_replica_file.name},
+        }
+        configured = connections.configure_settings({'default': connections.settings['default'], **replicas})
+        for alias in cls.replicas:
+            # Mirrors are not flushed between tests
+            connections.settings[alias] = {**configured[alias], 'TEST': {'MIRROR': 'default'}}
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        for alias in cls.replicas:
+            connections[alias].close()
+            del connections[alias]
+            del connections.settings[alias]
+        cls.broken_replica_file.close()
+
+    def setUp(self):
+        cache.clear()
+        clear_local_caches()
+        db_router._unhealthy.clear()
+        self.user = User.objects.create_user(email='replica@example.com', password='Str0ng-pass!')
+        self.post = Post.objects.create(title='Replicated', body='A replicated post body', author=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(self.user).access_token}')
+
+    def send(self, method, path, data=None):
+        """Send a request, returning the response and the number of queries run on each database."""
+        with CaptureQueriesContext(connections['default']) as primary, \
+                CaptureQueriesContext(connections['replica']) as replica:
+            response = getattr(self.client, method)(path, data, format='json')
+        # Let the next request reach a database again
+        clear_local_caches()
+        return response, len(primary), len(replica)
+
+    def test_get_requests_read_from_the_replica(self):
+        response, primary, replica = self.send('get', f'/api/v1/posts/{self.post.id}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['title'], 'Replicated')
+        self.assertEqual(primary, 0)
+        self.assertGreater(replica, 0)
+
+    def test_unsafe_methods_use_the_primary(self):
+        for method, path, data in [
+            ('post', '/api/v1/posts/', {'title': 'Another post', 'body': 'Another post body'}),
+            ('put', f'/api/v1/posts/{self.post.id}/', {'title': 'Renamed'}),
+            ('delete', f'/api/v1/posts/{self.post.id}/', None),
+        ]:
+            with self.subTest(method):
+                # Not pinned by the previous write
+                cache.clear()
+                response, primary, replica = self.send(method, path, data)
+                self.assertLess(response.status_code, 400)
+                self.assertGreater(primary, 0)
+                self.assertEqual(replica, 0)
+
+    @override_settings(DB_REPLICA_PIN_SECONDS=1)
+    def test_a_write_pins_the_user_to_the_primary_for_the_pin_window(self):
+        self.send('put', f'/api/v1/posts/{self.post.id}/', {'title': 'Renamed'})
+        response, primary, replica = self.send('get', f'/api/v1/posts/{self.post.id}/')
+        self.assertEqual(response.data['title'], 'Renamed')
+        self.assertEqual(replica, 0)
+
+        time.sleep(1.1)
+        response, primary, replica = self.send('get', f'/api/v1/posts/{self.post.id}/')
+        self.assertEqual(primary, 0)
+        self.assertGreater(replica, 0)
+
+    @override_settings(DATABASE_REPLICAS=['broken_replica'])
+    def test_a_failing_replica_falls_back_to_the_primary(self):
+        # The failed attempt is a 500 that the middleware replaces, as in production
+        self.client.raise_request_exception = False
+        with self.assertLogs('blog.middleware', 'WARNING'):
+            response, primary, replica = self.send('get', f'/api/v1/posts/{self.post.id}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['title'], 'Replicated')
+        self.assertGreater(primary, 0)
+        # Skipped until DB_REPLICA_RETRY_SECONDS have passed
+        self.assertIn('broken_replica', db_router._unhealthy)
+        self.assertIsNone(db_router.choose_replica())
+
+
+@mock.patch.dict(SimpleRateThrottle.THROTTLE_RATES, {'login': '2/min'})
+class ThrottlingTests(TestCase):
+    login_url = '/api/v1/auth/login/'
+
+    def setUp(self):
+        cache.clear()
+        caches['throttle_fallback'].clear()
+        self.now = 1000.0
+        for target, value in [
+            ('blog.throttling._script', None),
+            ('blog.throttling.get_redis', mock.Mock(return_value=fakeredis.FakeRedis())),
+        ]:
+            patcher = mock.patch(target, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        patcher = mock.patch.object(SlidingWindowThrottle, 'timer', lambda throttle: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def login(self, forwarded_for='203.0.113.7, 10.0.0.1'):
+        # 10.0.0.1 plays the proxy's view of the client; anything before it is up to the client
+        return self.client.post(
+            self.login_url, {'email': 'nobody@example.com', 'password': 'wrong'},
+            content_type='application/json', headers={'X-Forwarded-For': forwarded_for},
+        )
+
+    def test_a_full_window_is_refused_with_retry_after(self):
+        self.assertNotEqual(self.login().status_code, 429)
+        self.now += 20
+        self.assertNotEqual(self.login().status_code, 429)
+        self.now += 10
+        response = self.login()
+        self.assertEqual(response.status_code, 429)
+        # Until the first request leaves the window
+        self.assertEqual(response['Retry-After'], '30')
+
+    def test_the_window_slides(self):
+        self.login()
+        self.now += 30
+        self.login()
+        self.now += 29
+        self.assertEqual(self.login().status_code, 429)
+        # The first request is out of the window, the second one still in it
+        self.now += 2
+        self.assertNotEqual(self.login().status_code, 429)
+        self.assertEqual(self.login().status_code, 429)
+
+    @override_settings(REST_FRAMEWORK={**settings.REST_FRAMEWORK, 'NUM_PROXIES': 1})
+    def test_rotating_x_forwarded_for_does_not_reset_the_limit(self):
+        self.login('198.51.100.1, 10.0.0.1')
+        self.login('198.51.100.2, 10.0.0.1')
+        self.assertEqual(self.login('198.51.100.3, 10.0.0.1').status_code, 429)
+        self.assertNotEqual(self.login('198.51.100.3, 10.0.0.2').status_code, 429)
+
+    @override_settings(CACHES=DOWN_REDIS_CACHES)
+    def test_counts_in_process_memory_when_redis_is_down(self):
+        with mock.patch('blog.throttling.get_redis', return_value=redis.Redis.from_url(DOWN_REDIS_URL)):
+            self.login()
+            self.login()
+            response = self.login()
+        self.assertEqual(response.status_code, 429)
+        self.assertTrue(response.has_header('Retry-After'))
+
+
+class ExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            email='secret@example.com', password='Str0ng-pass!', first_name='Ada', last_name='Lovelace',
+            is_staff=True,
+        )
+        cls.post = Post.objects.create(title='Exported post', body='An exported post body', author=cls.user)
+        cls.comment = Comment.objects.create(post=cls.post, body='An exported comment', author=cls.user)
+        cls.post.likes.add(cls.user)
+
+    def export(self, directory, *args):
+        call_command('export_blog', directory, *args, stdout=StringIO())
+
+    def read_jsonl(self, path, opener=open):
+        with opener(path, 'rt') as f:
+            return [json.loads(line) for line in f]
+
+    def test_jsonl_rows(self):
+        with tempfile.TemporaryDirectory() as directory:
+            self.export(directory)
+            self.assertEqual(self.read_jsonl(os.path.join(directory, 'users.jsonl')), [{
+                'id': self.user.pk, 'first_name': 'Ada', 'last_name': 'Lovelace',
+                'date_joined': self.user.date_joined.isoformat().replace('+00:00', 'Z'), 'followers_count': 0,
+            }])
+            [post] = self.read_jsonl(os.path.join(directory, 'posts.jsonl'))
+            self.assertEqual(
+                (post['id'], post['author_id'], post['title'], post['deleted_at']),
+                (str(self.post.pk), self.user.pk, 'Exported post', None),
+            )
+            [comment] = self.read_jsonl(os.path.join(directory, 'comments.jsonl'))
+            self.assertEqual((comment['id'], comment['post_id']), (str(self.comment.pk), str(self.post.pk)))
+            self.assertEqual(
+                self.read_jsonl(os.path.join(directory, 'post_likes.jsonl')),
+                [{'post_id': str(self.post.pk), 'user_id': self.user.pk}],
+            )
+            self.assertEqual(self.read_jsonl(os.path.join(directory, 'comment_likes.jsonl')), [])
+
+            # No credentials, emails or permission flags anywhere
+            for name in os.listdir(directory):
+                with open(os.path.join(directory, name)) as f:
+                    content = f.read()
+                for leaked in ('secret@example.com', self.user.password, 'password', 'is_staff', 'email'):
+                    self.assertNotIn(leaked, content, name)
+
+    def test_csv_with_gzip(self):
+        with tempfile.TemporaryDirectory() as directory:
+            self.export(directory, '--format', 'csv', '--gzip', '--tables', 'users', 'post_likes')
+            self.assertEqual(sorted(name for name in os.listdir(directory) if not name.endswith('.checkpoint')), [
+                'post_likes.csv.gz', 'users.csv.gz',
+            ])
+            with gzip.open(os.path.join(directory, 'users.csv.gz'), 'rt') as f:
+                rows = list(csv.reader(f))
+            self.assertEqual(rows, [
+                ['id', 'first_name', 'last_name', 'date_joined', 'followers_count'],
+                [str(self.user.pk), 'Ada', 'Lovelace', self.user.date_joined.isoformat().replace('+00:00', 'Z'), '0'],
+            ])
+
+
+class ExportImportTests(TransactionTestCase):
+    def snapshot(self):
+        return {
+            'users': list(User.objects.order_by('pk').values_list('pk', 'first_name', 'last_name', 'date_joined')),
+            'posts': list(Post.all_objects.order_by('pk').values_list(
+                'pk', 'author_id', 'title', 'body', 'created_at', 'updated_at', 'deleted_at',
+            )),
+            'comments': list(Comment.all_objects.order_by('pk').values_list(
+                'pk', 'post_id', 'author_id', 'body', 'created_at', 'deleted_at',
+            )),
+            'post_likes': set(Post.likes.through.objects.values_list('post_id', 'user_id')),
+            'comment_likes': set(Comment.likes.through.objects.values_list('comment_id', 'user_id')),
+        }
+
+    def test_an_export_imports_back(self):
+        seed_dataset(users=4, posts=6, comments=10, likes=8, seed=0)
+        Post.objects.filter(pk=Post.objects.order_by('pk').first().pk).soft_delete()
+        expected = self.snapshot()
+
+        with tempfile.TemporaryDirectory() as directory:
+            call_command('export_blog', directory, stdout=StringIO())
+            call_command('flush', interactive=False)
+            call_command('import_blog', directory, stdout=StringIO())
+
+        self.assertEqual(self.snapshot(), expected)
+        # Emails are not exported
+        user = User.objects.order_by('pk').first()
+        self.assertEqual(user.email, f'user-{user.pk}@imported.invalid')
+        self.assertFalse(user.has_usable_password())
+
+    def test_a_missing_required_field_is_named(self):
+        with tempfile.TemporaryDirectory() as directory:
+            with open(os.path.join(directory, 'users.jsonl'), 'w') as f:
+                f.write(json.dumps({'first_name': 'No id'}) + '\n')
+            with self.assertRaisesMessage(CommandError, "users.jsonl:1: missing required field 'id'"):
+                call_command('import_blog', directory, stdout=StringIO())
+
+
+class SeedBlogTests(TransactionTestCase):
+    def seed(self):
+        call_command(
+            'seed_blog', '--users', '5', '--posts', '20', '--comments', '30', '--post-likes', '40',
+            '--comment-likes', '10', '--random-seed', '3', stdout=StringIO(),
+        )
+
+    def test_rerunning_with_the_same_seed_adds_rows(self):
+        self.seed()
+        first_posts = set(Post.objects.values_list('pk', flat=True))
+        first_comments = set(Comment.objects.values_list('pk', flat=True))
+        post_likes = Post.likes.through.objects.count()
+        comment_likes = Comment.likes.through.objects.count()
+        self.seed()
+
+        self.assertEqual(User.objects.count(), 10)
+        self.assertEqual(Post.objects.count(), 40)
+        self.assertEqual(Comment.objects.count(), 60)
+        self.assertLess(first_posts, set(Post.objects.values_list('pk', flat=True)))
+        # The second run's comments and likes point at its own rows
+        self.assertEqual(Comment.objects.filter(post__in=first_posts).count(), 30)
+        self.assertEqual(Post.likes.through.objects.filter(post__in=first_posts).count(), post_likes)
+        self.assertEqual(Comment.likes.through.objects.filter(comment__in=first_comments).count(), comment_likes)
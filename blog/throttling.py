@@ -0,0 +1,83 @@
+"""
+Sliding-window throttles that share their counters across workers.
+
+With REDIS_URL configured, each throttle key is a Redis sorted set of request
+timestamps, trimmed and checked in a single Lua script so concurrent workers
+cannot race past the limit. Without Redis the throttles fall back to DRF's
+cache-based implementation. If Redis is unreachable they count in a per-process
+cache instead, since the default cache is Redis too.
+"""
+import uuid
+
+from django.core.cache import caches
+from redis.exceptions import RedisError
+from rest_framework.throttling import (
+    AnonRateThrottle, ScopedRateThrottle, SimpleRateThrottle, UserRateThrottle
+)
+from .redis_client import get_redis
+
+# Returns 0 if the request is allowed, otherwise milliseconds until a slot frees
+SLIDING_WINDOW_SCRIPT = """
+local now = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local limit = tonumber(ARGV[3])
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now - window)
+if redis.call('ZCARD', KEYS[1]) < limit then
+    redis.call('ZADD', KEYS[1], now, ARGV[4])
+    redis.call('PEXPIRE', KEYS[1], window)
+    return 0
+end
+local oldest = redis.call('ZRANGE', KEYS[1], 0, 0, 'WITHSCORES')
+return math.max(1, tonumber(oldest[2]) + window - now)
+"""
+
+_script = None
+
+
+def _get_script(client):
+    global _script
+    if _script is None:
+        _script = client.register_script(SLIDING_WINDOW_SCRIPT)
+    return _script
+
+
+class SlidingWindowThrottle(SimpleRateThrottle):
+    retry_after_ms = None
+
+    def allow_request(self, request, view):
+        client = get_redis()
+        if client is None or self.rate is None:
+            return super().allow_request(request, view)
+
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+
+        now_ms = int(self.timer() * 1000)
+        try:
+            self.retry_after_ms = _get_script(client)(
+                keys=[self.key],
+                args=[now_ms, self.duration * 1000, self.num_requests, uuid.uuid4().hex],
+            )
+        except RedisError:
+            self.retry_after_ms = None
+            self.cache = caches['throttle_fallback']
+            return super().allow_request(request, view)
+        return self.retry_after_ms == 0
+
+    def wait(self):
+        if self.retry_after_ms is None:
+            return super().wait()
+        return self.retry_after_ms / 1000
+
+
+class AnonSlidingWindowThrottle(AnonRateThrottle, SlidingWindowThrottle):
+    """Throttle anonymous requests per IP address."""
+
+
+class UserSlidingWindowThrottle(UserRateThrottle, SlidingWindowThrottle):
+    """Throttle authenticated requests per user."""
+
+
+class ScopedSlidingWindowThrottle(ScopedRateThrottle, SlidingWindowThrottle):
+    """Throttle views that set `throttle_scope`, per user or per IP for anonymous requests."""
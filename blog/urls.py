@@ -2,19 +2,24 @@ from django.contrib import admin
 from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
-from drf_spectacular.views import SpectacularAPIView, SpectacularSwaggerView, SpectacularRedocView
+from drf_spectacular.views import SpectacularSwaggerView, SpectacularRedocView
+from .schema import CachedSchemaView
+from .views import healthz_view, metrics_view
 
 API_VERSION = getattr(settings, 'API_VERSION', 'v1')
 
 urlpatterns = [
     path("", SpectacularSwaggerView.as_view(url_name="schema"), name="swagger-ui"),
     path("admin/", admin.site.urls),
-    path("api/schema/", SpectacularAPIView.as_view(), name="schema"),
+    path("metrics", metrics_view, name="metrics"),
+    path("healthz", healthz_view, name="healthz"),
+    path("api/schema/", CachedSchemaView.as_view(), name="schema"),
     path("api/docs/", SpectacularSwaggerView.as_view(url_name="schema"), name="swagger-ui"),
     path("api/redoc/", SpectacularRedocView.as_view(url_name="schema"), name="redoc"),
     path(f"api/{API_VERSION}/auth/", include("authentication.urls")),
     path(f"api/{API_VERSION}/posts/", include("posts.urls")),
     path(f"api/{API_VERSION}/", include("comments.urls")),
+    path(f"api/{API_VERSION}/", include("follows.urls")),
 ]
 
 if settings.DEBUG:
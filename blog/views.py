@@ -0,0 +1,50 @@
+import logging
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.http import Http404, HttpResponse, HttpResponseForbidden, JsonResponse
+from django.views.decorators.cache import never_cache
+from .metrics import render_metrics
+from .redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+
+def metrics_view(request):
+    token = settings.METRICS_TOKEN
+    if not token:
+        # Only served without a token in development
+        if not settings.DEBUG:
+            raise Http404
+    elif request.headers.get('Authorization') != f'Bearer {token}':
+        return HttpResponseForbidden()
+    return HttpResponse(render_metrics(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+def _check_database():
+    with connections[DEFAULT_DB_ALIAS].cursor() as cursor:
+        cursor.execute('SELECT 1')
+
+
+def _check_cache():
+    client = get_redis()
+    if client is not None:
+        client.ping()
+    else:
+        cache.get('healthz')
+
+
+@never_cache
+def healthz_view(request):
+    """Liveness and readiness: one round trip each to the database and the cache."""
+    checks = {}
+    for name, check in (('database', _check_database), ('cache', _check_cache)):
+        try:
+            check()
+            checks[name] = 'ok'
+        except Exception:
+            logger.warning("Health check of the %s failed", name, exc_info=True)
+            checks[name] = 'error'
+    healthy = all(status == 'ok' for status in checks.values())
+    return JsonResponse(checks, status=200 if healthy else 503)
@@ -0,0 +1,56 @@
+"""
+Startup work done once per process instead of on its first requests.
+
+gunicorn.conf.py calls warm_up() once the app is loaded: with preload_app in
+the master, before the workers are forked, and otherwise in each worker.
+Preloaded workers share the loaded modules and caches copy-on-write, and a
+worker recycled by --max-requests serves its first request at full speed.
+gc.freeze() then moves everything loaded so far out of the garbage
+collector's reach: collections in the workers no longer touch those objects,
+which would copy their pages. Other servers (runserver, a bare uvicorn) skip
+the warm-up.
+
+Pillow is not loaded here: it is only imported on the first image upload.
+"""
+import gc
+
+from django.apps import apps
+from django.conf import settings
+from django.db import connections
+from django.urls import get_resolver
+from rest_framework import serializers
+
+
+def _project_serializers():
+    app_modules = {
+        config.name for config in apps.get_app_configs() if config.path.startswith(str(settings.BASE_DIR))
+    }
+    pending, found = [serializers.ModelSerializer], []
+    while pending:
+        cls = pending.pop()
+        pending.extend(cls.__subclasses__())
+        if cls.__module__.split('.')[0] in app_modules:
+            found.append(cls)
+    return found
+
+
+def warm_up(freeze=True):
+    # Imports every view and serializer and compiles the URL patterns
+    get_resolver().reverse_dict
+    for model in apps.get_models():
+        model._meta.get_fields()
+    for serializer_class in _project_serializers():
+        serializer_class().fields
+
+    from comments.serializers import CommentSerializer
+    from posts.serializers import PostSerializer
+    from .fast_serializers import compile_serializer
+
+    compile_serializer(PostSerializer)
+    compile_serializer(CommentSerializer)
+
+    # Nothing opened here may be inherited by forked workers
+    connections.close_all()
+    if freeze:
+        gc.collect()
+        gc.freeze()
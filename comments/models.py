@@ -1,8 +1,32 @@
 import uuid
 from django.db import models
+from django.utils import timezone
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
 from django.conf import settings
 
 
+class CommentQuerySet(models.QuerySet):
+    def with_counts(self):
+        """Load authors and likes counts in the same query."""
+        likes = (
+            Comment.likes.through.objects.filter(comment=OuterRef('pk'))
+            .order_by().values('comment').annotate(n=Count('*')).values('n')
+        )
+        return self.select_related('author').annotate(likes_total=Coalesce(Subquery(likes), 0))
+
+    def soft_delete(self):
+        """Mark the comments deleted in one UPDATE; purge_deleted() removes them later."""
+        return self.update(deleted_at=timezone.now())
+
+
+class CommentManager(models.Manager.from_queryset(CommentQuerySet)):
+    """Default manager: soft-deleted comments are left out."""
+
+    def get_queryset(self):
+        return super().get_queryset().filter(deleted_at__isnull=True)
+
+
 class Comment(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     post = models.ForeignKey('posts.Post', on_delete=models.CASCADE, related_name='comments')
@@ -10,13 +34,24 @@ class Comment(models.Model):
     author = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='comments')
     likes = models.ManyToManyField(settings.AUTH_USER_MODEL, related_name='liked_comments', blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    deleted_at = models.DateTimeField(null=True, blank=True)
+
+    objects = CommentManager()
+    all_objects = CommentQuerySet.as_manager()
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # A post's live comments, newest first
+            models.Index(fields=['post', 'deleted_at', '-created_at'], name='comments_live_post_idx'),
+            models.Index(fields=['deleted_at'], name='comments_deleted_idx'),
+        ]
 
     def __str__(self):
         return f"Comment by {self.author.email} on {self.post.title[:50]}..."
     
     @property
     def likes_count(self):
+        if hasattr(self, 'likes_total'):
+            return self.likes_total
         return self.likes.count()
\ No newline at end of file
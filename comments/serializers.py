@@ -32,7 +32,10 @@ class CommentCreateSerializer(serializers.ModelSerializer):
     
     def validate_post_id(self, value):
         try:
-            Post.objects.get(id=value)
+            return Post.objects.only('id').get(id=value)
         except Post.DoesNotExist:
             raise serializers.ValidationError("Post with this ID does not exist.")
-        return value
+    
+    def validate(self, attrs):
+        attrs['post'] = attrs.pop('post_id')
+        return attrs
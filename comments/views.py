@@ -4,11 +4,18 @@ from rest_framework import status
 from rest_framework.permissions import IsAuthenticated
 from drf_spectacular.utils import extend_schema, OpenApiParameter
 from drf_spectacular.types import OpenApiTypes
+from django.conf import settings
 from django.shortcuts import get_object_or_404
 from django.db import transaction
 from .models import Comment
 from .serializers import CommentSerializer, CommentCreateSerializer
+from posts import events
+from posts.cache import invalidate_post
+from posts.deletion import soft_delete_comment
 from posts.models import Post
+from blog.database import toggle_row
+from blog.fast_serializers import compile_serializer
+from blog.streaming import StreamingJSONResponse, can_stream
 
 
 class CommentListView(APIView):
@@ -40,10 +47,13 @@ class CommentListView(APIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        post = get_object_or_404(Post, id=post_id)
-        comments = Comment.objects.filter(post=post)
-        serializer = CommentSerializer(comments, many=True)
-        return Response(serializer.data)
+        post = get_object_or_404(Post.objects.only('id'), id=post_id)
+        comments = Comment.objects.with_counts().filter(post=post)
+        serializer = compile_serializer(CommentSerializer)
+        if can_stream(request):
+            rows = serializer.iter(comments.iterator(chunk_size=settings.STREAMING_JSON_CHUNK_SIZE))
+            return StreamingJSONResponse(rows, request.accepted_renderer)
+        return Response(serializer.many(comments))
     
     @extend_schema(
         tags=['Comments'],
@@ -60,15 +70,13 @@ class CommentListView(APIView):
         serializer = CommentCreateSerializer(data=request.data)
         
         if serializer.is_valid():
-            post_id = serializer.validated_data['post_id']
-            post = get_object_or_404(Post, id=post_id)
-            
             with transaction.atomic():
-                comment = serializer.save(
-                    post=post,
-                    author=request.user
-                )
+                comment = serializer.save(author=request.user)
+                invalidate_post(comment.post_id)
+            # A new comment has no likes yet
+            comment.likes_total = 0
             response_serializer = CommentSerializer(comment)
+            events.publish_comment(comment, response_serializer.data)
             return Response(response_serializer.data, status=status.HTTP_201_CREATED)
         
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
@@ -90,9 +98,9 @@ class CommentDetailView(APIView):
         }
     )
     def put(self, request, comment_id):
-        comment = get_object_or_404(Comment, id=comment_id)
+        comment = get_object_or_404(Comment.objects.with_counts(), id=comment_id)
         
-        if comment.author != request.user:
+        if comment.author_id != request.user.pk:
             return Response(
                 {'error': 'You can only edit your own comments.'},
                 status=status.HTTP_403_FORBIDDEN
@@ -119,21 +127,22 @@ class CommentDetailView(APIView):
         }
     )
     def delete(self, request, comment_id):
-        comment = get_object_or_404(Comment, id=comment_id)
+        comment = get_object_or_404(Comment.objects.only('id', 'author_id', 'post_id'), id=comment_id)
         
-        if comment.author != request.user:
+        if comment.author_id != request.user.pk:
             return Response(
                 {'error': 'You can only delete your own comments.'},
                 status=status.HTTP_403_FORBIDDEN
             )
         
-        comment.delete()
+        soft_delete_comment(comment)
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
 class CommentLikeView(APIView):
     permission_classes = [IsAuthenticated]
     serializer_class = None
+    throttle_scope = 'likes'
     
     @extend_schema(
         tags=['Likes'],
@@ -153,21 +162,17 @@ class CommentLikeView(APIView):
         }
     )
     def post(self, request, comment_id):
-        comment = get_object_or_404(Comment, id=comment_id)
+        comment = get_object_or_404(Comment.objects.only('id', 'post_id'), id=comment_id)
         
-        if request.user in comment.likes.all():
-            comment.likes.remove(request.user)
-            liked = False
-            message = "Comment unliked successfully"
-        else:
-            comment.likes.add(request.user)
-            liked = True
-            message = "Comment liked successfully"
+        liked = toggle_row(Comment.likes.through, comment_id=comment.pk, user_id=request.user.pk)
+        message = "Comment liked successfully" if liked else "Comment unliked successfully"
+        likes_count = comment.likes_count
+        events.publish_comment_likes(comment, likes_count)
         
         return Response({
             'message': message,
             'liked': liked,
-            'likes_count': comment.likes_count
+            'likes_count': likes_count
         })
 
 
@@ -204,19 +209,27 @@ class CommentLikesListView(APIView):
         }
     )
     def get(self, request, comment_id):
-        comment = get_object_or_404(Comment, id=comment_id)
-        
-        likes_data = []
-        for user in comment.likes.all():
-            likes_data.append({
+        comment = get_object_or_404(Comment.objects.only('id', 'created_at'), id=comment_id)
+        liked_at = comment.created_at.isoformat()
+        users = comment.likes.only('id', 'email', 'first_name', 'last_name')
+        rows = (
+            {
                 'id': str(user.id),
                 'email': user.email,
                 'first_name': user.first_name,
                 'last_name': user.last_name,
-                'liked_at': comment.created_at.isoformat()
-            })
-        
+                'liked_at': liked_at
+            }
+            for user in users.iterator(chunk_size=settings.STREAMING_JSON_CHUNK_SIZE)
+        )
+        if can_stream(request):
+            return StreamingJSONResponse(
+                rows, request.accepted_renderer,
+                envelope={'likes_count': users.count()}, key='liked_by'
+            )
+
+        likes_data = list(rows)
         return Response({
-            'likes_count': comment.likes_count,
+            'likes_count': len(likes_data),
             'liked_by': likes_data
         })
\ No newline at end of file
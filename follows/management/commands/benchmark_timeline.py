@@ -0,0 +1,63 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count, Q
+from authentication.models import User
+from blog.benchmarking import percentile
+from posts.models import Post
+from follows.timeline import get_timeline_post_ids
+
+
+class Command(BaseCommand):
+    help = "Compare home timeline read latency: materialized timeline vs. join query"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', help="Email of the reader (defaults to the user following the most authors)")
+        parser.add_argument('--iterations', type=int, default=200)
+        parser.add_argument('--page-size', type=int, default=10)
+
+    def handle(self, *args, **options):
+        user = self.get_user(options['user'])
+        page_size = options['page_size']
+
+        def materialized():
+            post_ids = get_timeline_post_ids(user, page_size)
+            return list(Post.objects.select_related('author').filter(id__in=post_ids))
+
+        def join():
+            return list(
+                Post.objects.select_related('author')
+                .filter(Q(author__followers__follower=user) | Q(author=user))
+                .distinct()[:page_size]
+            )
+
+        self.stdout.write(f"Reader: {user.email} ({user.following.count()} followed authors)")
+        for name, func in (('materialized', materialized), ('join', join)):
+            timings = self.measure(func, options['iterations'])
+            self.stdout.write(
+                f"{name:>12}: p50={percentile(timings, 50):.2f}ms "
+                f"p95={percentile(timings, 95):.2f}ms "
+                f"mean={statistics.mean(timings):.2f}ms"
+            )
+
+    def get_user(self, email):
+        if email:
+            try:
+                return User.objects.get(email=email)
+            except User.DoesNotExist:
+                raise CommandError(f"No user found with email {email}")
+        user = User.objects.annotate(n=Count('following')).order_by('-n').first()
+        if user is None:
+            raise CommandError("No users to benchmark")
+        return user
+
+    @staticmethod
+    def measure(func, iterations):
+        func()
+        timings = []
+        for _ in range(iterations):
+            start = time.perf_counter()
+            func()
+            timings.append((time.perf_counter() - start) * 1000)
+        return timings
@@ -0,0 +1,31 @@
+from celery import shared_task
+from posts.models import Post
+from . import timeline
+
+
+@shared_task
+def fan_out_post(post_id):
+    post = Post.objects.select_related('author').filter(id=post_id).first()
+    if post is None:
+        return 0
+    return timeline.fan_out_post(post)
+
+
+@shared_task
+def backfill_timeline(follower_id, followee_id):
+    timeline.backfill_timeline(follower_id, followee_id)
+
+
+@shared_task
+def backfill_followers(author_id):
+    return timeline.backfill_followers(author_id)
+
+
+@shared_task
+def prune_timeline(follower_id, followee_id):
+    timeline.prune_timeline(follower_id, followee_id)
+
+
+@shared_task
+def trim_timelines():
+    return timeline.trim_timelines()
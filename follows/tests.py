@@ -0,0 +1,101 @@
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+from authentication.models import User
+from posts.models import Post
+from .models import TimelineEntry
+from .tasks import fan_out_post
+
+
+class TimelineTests(TestCase):
+    def setUp(self):
+        self.reader = User.objects.create_user(email='reader@example.com', password='Str0ng-pass!')
+        self.author = User.objects.create_user(email='author@example.com', password='Str0ng-pass!')
+        self.api = APIClient()
+        self.api.force_authenticate(self.reader)
+
+    def request(self, method, path, data=None, user=None):
+        # Timeline writes are Celery tasks run inline once the request commits
+        self.api.force_authenticate(user or self.reader)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = getattr(self.api, method)(path, data, format='json')
+        self.assertLess(response.status_code, 400)
+        return response
+
+    def follow(self, followee, follower=None):
+        return self.request('post', f'/api/v1/users/{followee.id}/follow/', user=follower)
+
+    def write(self, author, title):
+        post = Post.objects.create(title=title, body='A timeline post body', author=author)
+        fan_out_post(post.id)
+        return post
+
+    def timeline(self, **params):
+        return self.request('get', '/api/v1/timeline/', params).data
+
+    def timeline_titles(self, **params):
+        return [post['title'] for post in self.timeline(**params)['results']]
+
+    def test_new_posts_are_fanned_out_to_followers(self):
+        self.follow(self.author)
+        self.request('post', '/api/v1/posts/', {'title': 'Fresh post', 'body': 'A fresh post body'}, user=self.author)
+        self.assertTrue(TimelineEntry.objects.filter(user=self.reader, post__title='Fresh post').exists())
+        self.assertEqual(self.timeline_titles(), ['Fresh post'])
+
+    def test_following_backfills_and_unfollowing_prunes(self):
+        self.write(self.author, 'Older post')
+        self.follow(self.author)
+        self.assertEqual(self.timeline_titles(), ['Older post'])
+        self.follow(self.author)
+        self.assertEqual(self.timeline_titles(), [])
+
+    def test_deleted_posts_leave_timelines(self):
+        self.follow(self.author)
+        post = self.write(self.author, 'Short-lived post')
+        self.request('delete', f'/api/v1/posts/{post.id}/', user=self.author)
+        self.assertFalse(TimelineEntry.objects.filter(post=post).exists())
+        self.assertEqual(self.timeline_titles(), [])
+
+    @override_settings(TIMELINE_FANOUT_FOLLOWER_LIMIT=1)
+    def test_posts_of_authors_above_the_fanout_limit_are_merged_in_order(self):
+        celebrity = User.objects.create_user(email='celebrity@example.com', password='Str0ng-pass!')
+        fan = User.objects.create_user(email='fan@example.com', password='Str0ng-pass!')
+        self.follow(self.author)
+        self.follow(celebrity)
+        self.follow(celebrity, follower=fan)
+        for i in range(3):
+            self.write(self.author, f'Author post {i}')
+            self.write(celebrity, f'Celebrity post {i}')
+        self.assertFalse(TimelineEntry.objects.filter(user=self.reader, post__author=celebrity).exists())
+
+        self.assertEqual(self.timeline_titles(), [
+            'Celebrity post 2', 'Author post 2', 'Celebrity post 1', 'Author post 1',
+            'Celebrity post 0', 'Author post 0',
+        ])
+        self.assertEqual(self.timeline_titles(page_size=2, page=2), ['Celebrity post 1', 'Author post 1'])
+
+    @override_settings(TIMELINE_FANOUT_FOLLOWER_LIMIT=1)
+    def test_posts_written_above_the_fanout_limit_are_copied_when_the_author_drops_below_it(self):
+        fan = User.objects.create_user(email='fan@example.com', password='Str0ng-pass!')
+        self.follow(self.author)
+        self.write(self.author, 'Fanned out post')
+        self.follow(self.author, follower=fan)
+        self.write(self.author, 'Merged post')
+
+        self.follow(self.author, follower=fan)
+        self.assertEqual(self.timeline_titles(), ['Merged post', 'Fanned out post'])
+        self.assertTrue(TimelineEntry.objects.filter(user=self.reader, post__title='Merged post').exists())
+
+    @override_settings(TIMELINE_MAX_ENTRIES=5)
+    def test_pagination(self):
+        self.follow(self.author)
+        for i in range(7):
+            self.write(self.author, f'Post {i}')
+
+        first = self.timeline(page_size=2)
+        self.assertEqual([post['title'] for post in first['results']], ['Post 6', 'Post 5'])
+        self.assertIsNotNone(first['next'])
+        # Only the newest TIMELINE_MAX_ENTRIES are reachable
+        self.assertEqual(first['count'], 5)
+        last = self.timeline(page_size=2, page=3)
+        self.assertEqual([post['title'] for post in last['results']], ['Post 2'])
+        self.assertIsNone(last['next'])
@@ -0,0 +1,208 @@
+import heapq
+from operator import itemgetter
+
+from django.conf import settings
+from django.db.models import Count, Max
+from blog.database import delete_in_batches
+from posts.models import Post
+from .models import Follow, TimelineEntry
+
+
+def _bulk_insert(entries):
+    TimelineEntry.objects.bulk_create(entries, ignore_conflicts=True)
+
+
+def fan_out_post(post):
+    """
+    Write a post into the timelines of its author and the author's followers.
+
+    Authors above TIMELINE_FANOUT_FOLLOWER_LIMIT are skipped; their posts are
+    merged in when a follower reads the timeline instead.
+    """
+    _bulk_insert([TimelineEntry(user_id=post.author_id, post=post, created_at=post.created_at)])
+    if post.author.followers_count > settings.TIMELINE_FANOUT_FOLLOWER_LIMIT:
+        return 1
+
+    batch_size = settings.TIMELINE_FANOUT_BATCH_SIZE
+    follower_ids = (
+        Follow.objects.filter(followee_id=post.author_id)
+        .order_by()
+        .values_list('follower_id', flat=True)
+    )
+
+    written = 1
+    batch = []
+    for follower_id in follower_ids.iterator(chunk_size=batch_size):
+        batch.append(TimelineEntry(user_id=follower_id, post=post, created_at=post.created_at))
+        if len(batch) >= batch_size:
+            _bulk_insert(batch)
+            written += len(batch)
+            batch = []
+    if batch:
+        _bulk_insert(batch)
+        written += len(batch)
+    return written
+
+
+def backfill_timeline(follower_id, followee_id):
+    """
+    Copy a newly followed author's recent posts into the follower's timeline.
+
+    Nothing is copied from authors above TIMELINE_FANOUT_FOLLOWER_LIMIT, whose
+    posts are merged in when the timeline is read.
+    """
+    posts = (
+        Post.objects.filter(
+            author_id=followee_id,
+            author__followers_count__lte=settings.TIMELINE_FANOUT_FOLLOWER_LIMIT,
+        ).values_list('id', 'created_at')[:settings.TIMELINE_MAX_ENTRIES]
+    )
+    _bulk_insert([
+        TimelineEntry(user_id=follower_id, post_id=post_id, created_at=created_at)
+        for post_id, created_at in posts
+    ])
+    trim_timeline(follower_id)
+
+
+def rebuild_timeline(user_id):
+    """Materialize a user's timeline from scratch, e.g. after a bulk import."""
+    author_ids = [user_id] + list(
+        Follow.objects.filter(
+            follower_id=user_id,
+            followee__followers_count__lte=settings.TIMELINE_FANOUT_FOLLOWER_LIMIT,
+        ).values_list('followee_id', flat=True)
+    )
+    posts = (
+        Post.objects.filter(author_id__in=author_ids)
+        .values_list('id', 'created_at')[:settings.TIMELINE_MAX_ENTRIES]
+    )
+    _bulk_insert([
+        TimelineEntry(user_id=user_id, post_id=post_id, created_at=created_at)
+        for post_id, created_at in posts
+    ])
+    trim_timeline(user_id)
+
+
+def backfill_followers(author_id):
+    """
+    Copy an author's posts that were not fanned out into their followers' timelines.
+
+    Run when the author drops back to TIMELINE_FANOUT_FOLLOWER_LIMIT followers:
+    posts written above the limit were only merged in at read time, which stops
+    now. They are the posts newer than the last one found in a follower's
+    timeline. The hourly trim_timelines task trims the timelines afterwards.
+    """
+    last_fanned_out = (
+        TimelineEntry.objects.filter(post__author_id=author_id)
+        .exclude(user_id=author_id)
+        .aggregate(created_at=Max('created_at'))['created_at']
+    )
+    posts = Post.objects.filter(author_id=author_id)
+    if last_fanned_out is not None:
+        posts = posts.filter(created_at__gt=last_fanned_out)
+    posts = list(posts.values_list('id', 'created_at')[:settings.TIMELINE_MAX_ENTRIES])
+    if not posts:
+        return 0
+
+    batch_size = settings.TIMELINE_FANOUT_BATCH_SIZE
+    follower_ids = (
+        Follow.objects.filter(followee_id=author_id)
+        .order_by()
+        .values_list('follower_id', flat=True)
+    )
+    written = 0
+    for follower_id in follower_ids.iterator(chunk_size=batch_size):
+        TimelineEntry.objects.bulk_create([
+            TimelineEntry(user_id=follower_id, post_id=post_id, created_at=created_at)
+            for post_id, created_at in posts
+        ], batch_size=batch_size, ignore_conflicts=True)
+        written += len(posts)
+    return written
+
+
+def prune_timeline(follower_id, followee_id):
+    """Remove an unfollowed author's posts from the follower's timeline."""
+    TimelineEntry.objects.filter(user_id=follower_id, post__author_id=followee_id).delete()
+
+
+def trim_timeline(user_id):
+    """Delete a user's timeline entries beyond the newest TIMELINE_MAX_ENTRIES."""
+    cutoff = (
+        TimelineEntry.objects.filter(user_id=user_id)
+        .values_list('created_at', flat=True)[settings.TIMELINE_MAX_ENTRIES:]
+        .first()
+    )
+    if cutoff is None:
+        return 0
+    return delete_in_batches(
+        TimelineEntry.objects.filter(user_id=user_id, created_at__lte=cutoff),
+        settings.DELETE_BATCH_SIZE,
+    )
+
+
+def trim_timelines():
+    """Trim every timeline that fan-out has grown past TIMELINE_MAX_ENTRIES."""
+    user_ids = list(
+        TimelineEntry.objects.order_by()
+        .values('user_id')
+        .annotate(entries=Count('id'))
+        .filter(entries__gt=settings.TIMELINE_MAX_ENTRIES)
+        .values_list('user_id', flat=True)
+    )
+    return sum(trim_timeline(user_id) for user_id in user_ids)
+
+
+class Timeline:
+    """
+    A user's home timeline as a sequence of post ids, newest first, for a Paginator.
+
+    Materialized entries are merged with posts from followed authors whose posts
+    are not fanned out on write, minus those already materialized. Slicing reads
+    only as many rows from each source as the slice needs, so the first page
+    stays cheap however long the timeline is. Only the newest
+    TIMELINE_MAX_ENTRIES posts can be reached.
+    """
+
+    def __init__(self, user):
+        self.entries = (
+            TimelineEntry.objects.filter(user=user)
+            .order_by('-created_at')
+            .values_list('created_at', 'post_id')
+        )
+        heavy_author_ids = list(
+            Follow.objects.filter(
+                follower=user,
+                followee__followers_count__gt=settings.TIMELINE_FANOUT_FOLLOWER_LIMIT,
+            ).values_list('followee_id', flat=True)
+        )
+        self.merged_posts = (
+            Post.objects.filter(author_id__in=heavy_author_ids)
+            .exclude(timeline_entries__user=user)
+            .order_by('-created_at')
+            .values_list('created_at', 'id')
+        ) if heavy_author_ids else None
+
+    def count(self):
+        limit = settings.TIMELINE_MAX_ENTRIES
+        count = self.entries[:limit].count()
+        if self.merged_posts is not None:
+            count += self.merged_posts[:limit].count()
+        return min(count, limit)
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice) or index.step is not None:
+            raise TypeError("Timelines only support slicing")
+        limit = settings.TIMELINE_MAX_ENTRIES
+        stop = limit if index.stop is None else min(index.stop, limit)
+        rows = list(self.entries[:stop])
+        if self.merged_posts is not None:
+            rows = heapq.merge(rows, list(self.merged_posts[:stop]), key=itemgetter(0), reverse=True)
+        return [post_id for _, post_id in rows][index.start:stop]
+
+
+def get_timeline_post_ids(user, limit=None):
+    """Return the ids of the newest `limit` (by default TIMELINE_MAX_ENTRIES) posts in a user's home timeline."""
+    return Timeline(user)[:limit]
@@ -0,0 +1,7 @@
+from django.urls import path
+from . import views
+
+urlpatterns = [
+    path('users/<int:user_id>/follow/', views.FollowView.as_view(), name='user-follow'),
+    path('timeline/', views.TimelineView.as_view(), name='timeline'),
+]
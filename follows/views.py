@@ -0,0 +1,110 @@
+from rest_framework.views import APIView
+from rest_framework.response import Response
+from rest_framework import status
+from rest_framework.permissions import IsAuthenticated
+from drf_spectacular.utils import extend_schema
+from django.conf import settings
+from django.shortcuts import get_object_or_404
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from authentication.models import User
+from posts import like_buffer
+from posts.models import Post
+from posts.serializers import PostSerializer
+from posts.views import PostPagination
+from blog.fast_serializers import compile_serializer
+from .models import Follow
+from .tasks import backfill_followers, backfill_timeline, prune_timeline
+from .timeline import Timeline
+
+
+class FollowView(APIView):
+    permission_classes = [IsAuthenticated]
+    serializer_class = None
+
+    @extend_schema(
+        tags=['Follows'],
+        summary="Follow/Unfollow user",
+        description="Follow or unfollow another user",
+        responses={
+            200: {
+                'type': 'object',
+                'properties': {
+                    'message': {'type': 'string'},
+                    'following': {'type': 'boolean'},
+                    'followers_count': {'type': 'integer'}
+                }
+            },
+            400: "Bad Request - Cannot follow yourself",
+            404: "User not found",
+            401: "Unauthorized"
+        }
+    )
+    def post(self, request, user_id):
+        followee = get_object_or_404(User, id=user_id)
+
+        if followee.pk == request.user.pk:
+            return Response(
+                {'error': 'You cannot follow yourself'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        with transaction.atomic():
+            deleted, _ = Follow.objects.filter(follower=request.user, followee=followee).delete()
+            if deleted:
+                User.objects.filter(pk=followee.pk).update(followers_count=F('followers_count') - 1)
+                following = False
+                message = "User unfollowed successfully"
+                task = prune_timeline
+            else:
+                try:
+                    with transaction.atomic():
+                        Follow.objects.create(follower=request.user, followee=followee)
+                    created = True
+                except IntegrityError:
+                    # A concurrent request followed first and counted it
+                    created = False
+                if created:
+                    User.objects.filter(pk=followee.pk).update(followers_count=F('followers_count') + 1)
+                following = True
+                message = "User followed successfully"
+                task = backfill_timeline
+
+            follower_id = request.user.pk
+            transaction.on_commit(lambda: task.delay(follower_id, followee.pk))
+
+            # Read inside the transaction, which holds the row since the update
+            followee.refresh_from_db(fields=['followers_count'])
+            if deleted and followee.followers_count == settings.TIMELINE_FANOUT_FOLLOWER_LIMIT:
+                # Back under the fan-out limit: posts that were merged in at read time must be copied
+                transaction.on_commit(lambda: backfill_followers.delay(followee.pk))
+
+        return Response({
+            'message': message,
+            'following': following,
+            'followers_count': followee.followers_count
+        })
+
+
+class TimelineView(APIView):
+    permission_classes = [IsAuthenticated]
+    pagination_class = PostPagination
+
+    @extend_schema(
+        tags=['Follows'],
+        summary="Home timeline",
+        description="Get a paginated list of posts by the authenticated user and the authors they follow",
+        responses={
+            200: PostSerializer(many=True),
+            401: "Unauthorized"
+        }
+    )
+    def get(self, request):
+        paginator = self.pagination_class()
+        page_ids = paginator.paginate_queryset(Timeline(request.user), request)
+
+        posts_by_id = Post.objects.with_counts().in_bulk(page_ids)
+        posts = [posts_by_id[post_id] for post_id in page_ids if post_id in posts_by_id]
+        like_buffer.attach_likes_counts(posts)
+
+        return paginator.get_paginated_response(compile_serializer(PostSerializer).many(posts))
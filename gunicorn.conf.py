@@ -0,0 +1,79 @@
+"""
+gunicorn settings, sized from the host and overridable with GUNICORN_* variables.
+
+Worker classes:
+- gthread (default): each worker serves GUNICORN_THREADS requests at once, so
+  a request waiting on MySQL or SMTP no longer blocks the whole worker.
+- sync: one request per worker.
+- uvicorn: the ASGI application, needed for the live update streams.
+"""
+import os
+
+# Imported as a module: a module-level name `config` would be read as gunicorn's own setting
+import decouple
+
+
+def available_cpus():
+    """CPUs this process may use, honouring affinity and a container's cgroup CPU quota."""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+    try:
+        with open('/sys/fs/cgroup/cpu.max') as f:
+            quota, period = f.read().split()
+        if quota != 'max':
+            cpus = min(cpus, max(1, int(quota) // int(period)))
+    except (OSError, ValueError):
+        pass
+    return cpus
+
+
+WORKER_CLASSES = {
+    'sync': 'sync',
+    'gthread': 'gthread',
+    'uvicorn': 'uvicorn.workers.UvicornWorker',
+}
+
+_worker_class = decouple.config('GUNICORN_WORKER_CLASS', default='gthread')
+if _worker_class not in WORKER_CLASSES:
+    raise ValueError(f"GUNICORN_WORKER_CLASS must be one of {', '.join(WORKER_CLASSES)}")
+_cpus = available_cpus()
+
+wsgi_app = 'blog.asgi:application' if _worker_class == 'uvicorn' else 'blog.wsgi:application'
+worker_class = WORKER_CLASSES[_worker_class]
+# Sync workers sit idle while waiting on I/O, so run two per core; threaded and
+# async workers overlap their own I/O and need one per core
+workers = decouple.config('GUNICORN_WORKERS', default=_cpus * 2 + 1 if _worker_class == 'sync' else _cpus + 1, cast=int)
+threads = decouple.config('GUNICORN_THREADS', default=4 if _worker_class == 'gthread' else 1, cast=int)
+
+bind = f"0.0.0.0:{decouple.config('PORT', default='80')}"
+# Longer than the load balancer's idle timeout (60s on most), so the balancer
+# closes idle connections first and never sends a request on a closing one
+keepalive = decouple.config('GUNICORN_KEEPALIVE', default=75, cast=int)
+timeout = decouple.config('GUNICORN_TIMEOUT', default=120, cast=int)
+graceful_timeout = decouple.config('GUNICORN_GRACEFUL_TIMEOUT', default=30, cast=int)
+max_requests = decouple.config('GUNICORN_MAX_REQUESTS', default=1000, cast=int)
+max_requests_jitter = decouple.config('GUNICORN_MAX_REQUESTS_JITTER', default=100, cast=int)
+
+# Load and warm the app once in the master (see blog.warmup)
+preload_app = decouple.config('GUNICORN_PRELOAD', default=True, cast=bool)
+# Worker heartbeats go to a tmpfs, not the container's overlay filesystem
+worker_tmp_dir = '/dev/shm' if os.path.isdir('/dev/shm') else None
+
+# gunicorn's own per-worker request counts and durations, sent over StatsD
+statsd_host = decouple.config('GUNICORN_STATSD_HOST', default='') or None
+statsd_prefix = 'blog'
+
+
+def when_ready(server):
+    # The master loaded the app before this with preload_app; warm it before forking
+    if server.cfg.preload_app:
+        from blog.warmup import warm_up
+        warm_up()
+
+
+def post_worker_init(worker):
+    if not worker.cfg.preload_app:
+        from blog.warmup import warm_up
+        warm_up()
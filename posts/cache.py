@@ -0,0 +1,61 @@
+"""
+Post detail payloads, cached per worker and in Redis (blog.local_cache).
+
+The author's name and email are filled in from the user cache on every read,
+so changing a user does not have to invalidate all of their posts. Anything
+that changes a post, its likes or its comments calls invalidate_post(),
+including deleting a user, for every post they liked or commented on.
+
+The first page of the post list is cached under a key that includes a feed
+version. Creating, editing or deleting a post, or deleting a user, calls
+invalidate_feed(), which replaces the version, so every cached page size and
+URL is dropped at once.
+Likes and comments only reach the feed when the page expires.
+"""
+import hashlib
+import uuid
+
+from django.core.cache import cache
+from django.db import transaction
+from authentication.cache import get_user
+from blog.local_cache import TieredCache
+from .models import Post
+from .serializers import PostDetailSerializer
+
+post_details = TieredCache('post')
+
+FEED_VERSION_KEY = 'feed:version'
+
+
+def _load(post_id):
+    post = Post.objects.with_counts().filter(pk=post_id).first()
+    if post is None:
+        return None
+    return post.author_id, dict(PostDetailSerializer(post).data)
+
+
+def get_post_detail(post_id):
+    """Return the PostDetailSerializer data of a live post, or None."""
+    cached = post_details.get(post_id, lambda: _load(post_id))
+    if cached is None:
+        return None
+    author_id, data = cached
+    author = get_user(author_id)
+    if author is None:
+        return None
+    return {**data, 'author': str(author), 'author_email': author.email}
+
+
+def invalidate_post(post_id):
+    post_details.invalidate(post_id)
+
+
+def feed_key(request):
+    """Return the cache key of a first feed page; the absolute URL also fixes the next page link."""
+    version = cache.get(FEED_VERSION_KEY, '')
+    return f'feed:{version}:' + hashlib.md5(request.build_absolute_uri().encode()).hexdigest()
+
+
+def invalidate_feed():
+    """Drop every cached feed page, after the transaction commits."""
+    transaction.on_commit(lambda: cache.set(FEED_VERSION_KEY, uuid.uuid4().hex, None))
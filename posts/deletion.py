@@ -0,0 +1,123 @@
+"""
+Deleting posts and users without Django's cascade collector, and soft deletes.
+
+Model.delete() loads every dependent row (each comment, each like) into memory
+and sends signals for them before deleting anything. For a popular post or an
+active user that can outlast the request timeout. These helpers delete the
+dependent rows first with batched DELETE statements, then delete the post or
+user itself with Model.delete(), which has little left to collect and still
+sends post_delete for the post (recording its sync tombstone).
+
+A failure part way leaves the post or user in place, so the delete can be retried.
+
+The API only soft-deletes: one UPDATE sets deleted_at, which hides the row
+from the default managers. purge_deleted() hard-deletes rows soft-deleted more
+than SOFT_DELETE_RETENTION_DAYS ago.
+"""
+from datetime import timedelta
+from functools import partial
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from blog.database import delete_in_batches
+from authentication.models import User
+from comments.models import Comment
+from follows.models import Follow, TimelineEntry
+from follows.tasks import backfill_followers
+from . import like_buffer
+from .cache import invalidate_feed, invalidate_post
+from .models import Post, PostTombstone
+
+
+def _delete_comments(comments):
+    batch_size = settings.DELETE_BATCH_SIZE
+    delete_in_batches(Comment.likes.through.objects.filter(comment__in=comments.values('pk')), batch_size)
+    return delete_in_batches(comments, batch_size)
+
+
+def soft_delete_post(post):
+    """Soft-delete a post with its comments, and take it out of home timelines."""
+    with transaction.atomic():
+        Post.objects.filter(pk=post.pk).soft_delete()
+        Comment.objects.filter(post_id=post.pk).soft_delete()
+        delete_in_batches(TimelineEntry.objects.filter(post_id=post.pk), settings.DELETE_BATCH_SIZE)
+        PostTombstone.objects.create(post_id=post.pk)
+        invalidate_post(post.pk)
+        invalidate_feed()
+
+
+def soft_delete_comment(comment):
+    Comment.objects.filter(pk=comment.pk).soft_delete()
+    invalidate_post(comment.post_id)
+
+
+def delete_post(post):
+    batch_size = settings.DELETE_BATCH_SIZE
+    _delete_comments(Comment.all_objects.filter(post_id=post.pk))
+    delete_in_batches(Post.likes.through.objects.filter(post_id=post.pk), batch_size)
+    delete_in_batches(TimelineEntry.objects.filter(post_id=post.pk), batch_size)
+    post.delete()
+    invalidate_post(post.pk)
+    invalidate_feed()
+    if like_buffer.enabled():
+        like_buffer.discard_post(post.pk)
+
+
+def delete_user(user):
+    batch_size = settings.DELETE_BATCH_SIZE
+    while True:
+        posts = list(Post.all_objects.filter(author_id=user.pk).only('pk', 'deleted_at')[:batch_size])
+        if not posts:
+            break
+        for post in posts:
+            delete_post(post)
+
+    # Their likes and comments are counted in other posts' cached details
+    counted_in = set(Post.likes.through.objects.filter(user_id=user.pk).values_list('post_id', flat=True))
+    counted_in.update(Comment.all_objects.filter(author_id=user.pk).values_list('post_id', flat=True))
+
+    _delete_comments(Comment.all_objects.filter(author_id=user.pk))
+    delete_in_batches(Post.likes.through.objects.filter(user_id=user.pk), batch_size)
+    delete_in_batches(Comment.likes.through.objects.filter(user_id=user.pk), batch_size)
+    delete_in_batches(TimelineEntry.objects.filter(user_id=user.pk), batch_size)
+
+    # Follows of other users decrement their followers_count, as the unfollow view does
+    follows = Follow.objects.filter(follower_id=user.pk)
+    while True:
+        followee_ids = list(follows.values_list('followee_id', flat=True)[:batch_size])
+        if not followee_ids:
+            break
+        with transaction.atomic():
+            User.objects.filter(pk__in=followee_ids).update(followers_count=F('followers_count') - 1)
+            Follow.objects.filter(follower_id=user.pk, followee_id__in=followee_ids).delete()
+            # Authors back under the fan-out limit, see follows.timeline.backfill_followers()
+            for author_id in User.objects.filter(
+                pk__in=followee_ids, followers_count=settings.TIMELINE_FANOUT_FOLLOWER_LIMIT,
+            ).values_list('pk', flat=True):
+                transaction.on_commit(partial(backfill_followers.delay, author_id))
+    delete_in_batches(Follow.objects.filter(followee_id=user.pk), batch_size)
+
+    user.delete()
+    for post_id in counted_in:
+        invalidate_post(post_id)
+    if counted_in:
+        invalidate_feed()
+    if like_buffer.enabled():
+        like_buffer.discard_user(user.pk)
+
+
+def purge_deleted():
+    """Hard-delete posts and comments soft-deleted over SOFT_DELETE_RETENTION_DAYS ago."""
+    cutoff = timezone.now() - timedelta(days=settings.SOFT_DELETE_RETENTION_DAYS)
+    expired = Post.all_objects.filter(deleted_at__lt=cutoff).order_by('deleted_at').only('pk', 'deleted_at')
+    purged = 0
+    while True:
+        posts = list(expired[:settings.DELETE_BATCH_SIZE])
+        if not posts:
+            break
+        for post in posts:
+            delete_post(post)
+        purged += len(posts)
+    return purged + _delete_comments(Comment.all_objects.filter(deleted_at__lt=cutoff))
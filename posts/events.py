@@ -0,0 +1,121 @@
+"""
+Live post updates as server-sent events.
+
+Views publish events on the post's channel after their transaction commits;
+GET /api/v1/posts/<post_id>/events/ streams them to the client. It runs
+under the ASGI application only, so that each open stream costs a coroutine
+rather than a worker. Like counts are coalesced into at most one update per
+LIVE_COALESCE_INTERVAL. A client that falls LIVE_EVENTS_QUEUE_SIZE events
+behind gets a `resync` event and is disconnected; it should refetch the post
+and its comments before reconnecting.
+
+Browsers' EventSource cannot send headers, so the stream also accepts a
+`?token=` from POST /api/v1/posts/<post_id>/events/token/. Such a token is
+signed, only opens this post's stream, and expires after
+LIVE_STREAM_TOKEN_SECONDS, so a URL that ends up in logs is soon useless.
+"""
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core import signing
+from django.core.handlers.asgi import ASGIRequest
+from django.db import connections, transaction
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import require_GET
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from authentication.authentication import CachedJWTAuthentication
+from authentication.cache import get_user
+from blog import pubsub
+from blog.renderers import FastJSONRenderer
+from .models import Post
+
+STREAM_TOKEN_SALT = 'posts.events.stream'
+
+
+def channel(post_id):
+    return f'post:{post_id}:events'
+
+
+def _publish_on_commit(post_id, event, data, coalesce_key=''):
+    payload = FastJSONRenderer().render(data)
+    transaction.on_commit(lambda: pubsub.publish(channel(post_id), event, payload, coalesce_key))
+
+
+def publish_comment(comment, data):
+    _publish_on_commit(comment.post_id, 'comment', data)
+
+
+def publish_post_likes(post_id, likes_count):
+    _publish_on_commit(post_id, 'post_likes', {'post_id': post_id, 'likes_count': likes_count}, 'post')
+
+
+def publish_comment_likes(comment, likes_count):
+    _publish_on_commit(
+        comment.post_id, 'comment_likes',
+        {'comment_id': comment.pk, 'likes_count': likes_count}, f'comment:{comment.pk}',
+    )
+
+
+def make_stream_token(user_id, post_id):
+    """Return a token that opens the post's event stream for LIVE_STREAM_TOKEN_SECONDS."""
+    return signing.dumps({'user': user_id, 'post': str(post_id)}, salt=STREAM_TOKEN_SALT)
+
+
+def _stream_token_user(raw_token, post_id):
+    try:
+        claims = signing.loads(raw_token, salt=STREAM_TOKEN_SALT, max_age=settings.LIVE_STREAM_TOKEN_SECONDS)
+    except signing.BadSignature:
+        # Also raised for an expired token (SignatureExpired)
+        raise InvalidToken("Stream token is invalid or expired")
+    if claims.get('post') != str(post_id):
+        raise InvalidToken("Stream token is for another post")
+    return get_user(claims['user'])
+
+
+def _authorize(request, post_id):
+    """Return an error response, or None if the user may follow the post."""
+    try:
+        raw_token = request.GET.get('token')
+        if raw_token:
+            user = _stream_token_user(raw_token, post_id)
+        else:
+            user = (CachedJWTAuthentication().authenticate(request) or (None,))[0]
+        if user is None:
+            return JsonResponse({'detail': 'Authentication credentials were not provided.'}, status=401)
+        if not Post.objects.filter(pk=post_id).exists():
+            return JsonResponse({'detail': 'No Post matches the given query.'}, status=404)
+        return None
+    except (AuthenticationFailed, InvalidToken) as exc:
+        return JsonResponse(exc.detail if isinstance(exc.detail, dict) else {'detail': exc.detail}, status=401)
+    finally:
+        # Don't hold a database connection for the lifetime of the stream
+        connections.close_all()
+
+
+async def _stream(post_id):
+    async with pubsub.subscribe(channel(post_id)) as subscription:
+        yield f'retry: {settings.LIVE_RETRY_MS}\n\n'.encode()
+        while True:
+            message = await subscription.get(settings.LIVE_HEARTBEAT_SECONDS)
+            if message is None:
+                yield b': keep-alive\n\n'
+                continue
+            event, data = message
+            yield b'event: ' + event + b'\ndata: ' + data + b'\n\n'
+            if message is pubsub.RESYNC:
+                return
+
+
+@require_GET
+async def post_events_view(request, post_id):
+    if not isinstance(request, ASGIRequest):
+        return JsonResponse({'detail': 'Live updates are only served by the ASGI application.'}, status=501)
+
+    error = await sync_to_async(_authorize)(request, post_id)
+    if error is not None:
+        return error
+
+    response = StreamingHttpResponse(_stream(post_id), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Tell nginx not to buffer the stream
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -0,0 +1,201 @@
+"""
+Write-behind buffering of post likes.
+
+When LIKE_BUFFER_ENABLED is set, like toggles only touch Redis: each post's
+likers are kept in a set (so repeated intents are idempotent) and the latest
+intent per (post, user) is recorded in a pending hash. A periodic task flushes
+the pending hash to the database in batches. Each user's liked posts are kept
+in a set too, so deleting a user only touches the posts they liked.
+"""
+import uuid
+
+from django.conf import settings
+from blog.redis_client import get_redis
+from authentication.models import User
+from .models import Post
+
+PENDING_KEY = 'likes:pending'
+FLUSHING_KEY = 'likes:flushing'
+
+TOGGLE_SCRIPT = """
+local liked
+if redis.call('SISMEMBER', KEYS[1], ARGV[1]) == 1 then
+    redis.call('SREM', KEYS[1], ARGV[1])
+    redis.call('SREM', KEYS[3], ARGV[3])
+    liked = 0
+else
+    redis.call('SADD', KEYS[1], ARGV[1])
+    redis.call('SADD', KEYS[3], ARGV[3])
+    liked = 1
+end
+redis.call('HSET', KEYS[2], ARGV[2], liked)
+return {liked, redis.call('SCARD', KEYS[1])}
+"""
+
+# Publish a freshly loaded likers set unless another loader got there first
+PUBLISH_SCRIPT = """
+if redis.call('EXISTS', KEYS[3]) == 1 then
+    redis.call('DEL', KEYS[1])
+    return 0
+end
+if redis.call('EXISTS', KEYS[1]) == 1 then
+    redis.call('RENAME', KEYS[1], KEYS[2])
+else
+    redis.call('DEL', KEYS[2])
+end
+redis.call('SET', KEYS[3], 1)
+return 1
+"""
+
+
+def enabled():
+    return settings.LIKE_BUFFER_ENABLED and get_redis() is not None
+
+
+def _likers_key(post_id):
+    return f'likes:post:{post_id}:users'
+
+
+def _ready_key(post_id):
+    return f'likes:post:{post_id}:ready'
+
+
+def _liked_key(user_id):
+    return f'likes:user:{user_id}:posts'
+
+
+def load_post(post_id, force=False):
+    """Load a post's likers from the database into Redis if not already there."""
+    client = get_redis()
+    if force:
+        client.delete(_ready_key(post_id))
+    elif client.exists(_ready_key(post_id)):
+        return
+
+    tmp_key = f'likes:load:{uuid.uuid4().hex}'
+    user_ids = (
+        Post.likes.through.objects.filter(post_id=post_id)
+        .values_list('user_id', flat=True)
+        .iterator(chunk_size=settings.LIKE_BUFFER_BATCH_SIZE)
+    )
+    pipe = client.pipeline(transaction=False)
+    for user_id in user_ids:
+        pipe.sadd(tmp_key, user_id)
+        # Harmless if another loader publishes first: discard_user() only removes
+        pipe.sadd(_liked_key(user_id), str(post_id))
+    pipe.execute()
+    client.eval(PUBLISH_SCRIPT, 3, tmp_key, _likers_key(post_id), _ready_key(post_id))
+
+
+def toggle_like(post_id, user_id):
+    """Toggle a like in Redis and return (liked, likes_count)."""
+    load_post(post_id)
+    liked, count = get_redis().eval(
+        TOGGLE_SCRIPT, 3, _likers_key(post_id), PENDING_KEY, _liked_key(user_id),
+        user_id, f'{post_id}:{user_id}', str(post_id),
+    )
+    return bool(liked), count
+
+
+def get_likes_counts(post_ids):
+    """Return {post_id: buffered likes count} for the loaded posts among `post_ids`, in one round trip."""
+    post_ids = list(post_ids)
+    if not post_ids:
+        return {}
+    pipe = get_redis().pipeline(transaction=False)
+    for post_id in post_ids:
+        pipe.exists(_ready_key(post_id))
+        pipe.scard(_likers_key(post_id))
+    results = pipe.execute()
+    return {
+        post_id: count
+        for post_id, ready, count in zip(post_ids, results[::2], results[1::2]) if ready
+    }
+
+
+def get_likes_count(post_id):
+    """Return the buffered likes count, or None if the post is not loaded."""
+    return get_likes_counts([post_id]).get(post_id)
+
+
+def attach_likes_counts(posts):
+    """Fetch the buffered likes counts of a page of posts at once, for Post.likes_count."""
+    if enabled():
+        counts = get_likes_counts(post.pk for post in posts)
+        for post in posts:
+            post.buffered_likes_count = counts.get(post.pk)
+    return posts
+
+
+def flush():
+    """Apply pending like intents to the database. Returns the number applied."""
+    client = get_redis()
+    # A leftover flushing hash means a previous flush died; retry it first
+    if not client.exists(FLUSHING_KEY):
+        if not client.exists(PENDING_KEY):
+            return 0
+        client.rename(PENDING_KEY, FLUSHING_KEY)
+
+    pending = client.hgetall(FLUSHING_KEY)
+    likes, unlikes = {}, {}
+    for field, liked in pending.items():
+        post_id, user_id = field.decode().split(':')
+        target = likes if liked == b'1' else unlikes
+        target.setdefault(post_id, []).append(int(user_id))
+
+    post_ids = set(likes) | set(unlikes)
+    existing_posts = {
+        str(post_id) for post_id in Post.objects.filter(id__in=post_ids).values_list('id', flat=True)
+    }
+    liker_ids = {user_id for user_ids in likes.values() for user_id in user_ids}
+    existing_users = set(User.objects.filter(id__in=liker_ids).values_list('id', flat=True))
+
+    through = Post.likes.through
+    batch_size = settings.LIKE_BUFFER_BATCH_SIZE
+    rows = [
+        through(post_id=post_id, user_id=user_id)
+        for post_id, user_ids in likes.items() if post_id in existing_posts
+        for user_id in user_ids if user_id in existing_users
+    ]
+    through.objects.bulk_create(rows, batch_size=batch_size, ignore_conflicts=True)
+    for post_id, user_ids in unlikes.items():
+        for start in range(0, len(user_ids), batch_size):
+            through.objects.filter(
+                post_id=post_id, user_id__in=user_ids[start:start + batch_size]
+            ).delete()
+
+    client.delete(FLUSHING_KEY)
+    return len(pending)
+
+
+def discard_post(post_id):
+    """Drop a deleted post's likers set. Its pending intents are skipped by flush()."""
+    get_redis().delete(_likers_key(post_id), _ready_key(post_id))
+
+
+def discard_user(user_id):
+    """Remove a deleted user from the likers sets of the posts they liked."""
+    client = get_redis()
+    pipe = client.pipeline(transaction=False)
+    for post_id in client.smembers(_liked_key(user_id)):
+        pipe.srem(_likers_key(post_id.decode()), user_id)
+    pipe.delete(_liked_key(user_id))
+    pipe.execute()
+
+
+def rebuild(post_ids=None):
+    """
+    Flush pending intents, then reload likers sets from the database.
+
+    Reloads the given posts, or every post currently loaded in Redis.
+    """
+    flush()
+    client = get_redis()
+    if post_ids is None:
+        post_ids = [
+            key.decode().split(':')[2]
+            for key in client.scan_iter(match='likes:post:*:ready')
+        ]
+    for post_id in post_ids:
+        load_post(post_id, force=True)
+    return len(post_ids)
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand, CommandError
+from posts import like_buffer
+
+
+class Command(BaseCommand):
+    help = "Flush buffered post likes and rebuild the Redis likers sets from the database"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'post_ids', nargs='*',
+            help="Posts to rebuild (defaults to every post currently loaded in Redis)"
+        )
+
+    def handle(self, *args, **options):
+        if not like_buffer.enabled():
+            raise CommandError("Like buffering is disabled (set LIKE_BUFFER_ENABLED and REDIS_URL)")
+
+        rebuilt = like_buffer.rebuild(options['post_ids'] or None)
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt likes for {rebuilt} post(s)"))
@@ -0,0 +1,28 @@
+from django.db import migrations
+
+# Must match the expression in PostQuerySet.search() for the index to be used
+CREATE_INDEX = (
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS posts_post_search_gin "
+    "ON posts_post USING GIN (to_tsvector('english', title || ' ' || body))"
+)
+DROP_INDEX = "DROP INDEX CONCURRENTLY IF EXISTS posts_post_search_gin"
+
+
+def run_on_postgresql(sql):
+    def operation(apps, schema_editor):
+        if schema_editor.connection.vendor == 'postgresql':
+            schema_editor.execute(sql)
+    return operation
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('posts', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(run_on_postgresql(CREATE_INDEX), run_on_postgresql(DROP_INDEX)),
+    ]
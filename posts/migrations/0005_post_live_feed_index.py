@@ -0,0 +1,29 @@
+from django.db import migrations
+
+# PostgreSQL can't read ORDER BY created_at off posts_post_live_created_idx after
+# an IS NULL test on its first column, so the feed gets a partial index there
+CREATE_INDEX = (
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS posts_post_live_feed "
+    "ON posts_post (created_at DESC) WHERE deleted_at IS NULL"
+)
+DROP_INDEX = "DROP INDEX CONCURRENTLY IF EXISTS posts_post_live_feed"
+
+
+def run_on_postgresql(sql):
+    def operation(apps, schema_editor):
+        if schema_editor.connection.vendor == 'postgresql':
+            schema_editor.execute(sql)
+    return operation
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('posts', '0004_post_soft_delete'),
+    ]
+
+    operations = [
+        migrations.RunPython(run_on_postgresql(CREATE_INDEX), run_on_postgresql(DROP_INDEX)),
+    ]
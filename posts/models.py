@@ -1,8 +1,55 @@
-from django.db import models
+from django.db import connections, models
+from django.db.models import BooleanField, Count, OuterRef, Q, Subquery
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Coalesce
 from django.conf import settings
+from django.utils import timezone
 import uuid
 
 
+class PostQuerySet(models.QuerySet):
+    def with_counts(self):
+        """Load authors and likes/comments counts in the same query."""
+        from comments.models import Comment
+        likes = (
+            Post.likes.through.objects.filter(post=OuterRef('pk'))
+            .order_by().values('post').annotate(n=Count('*')).values('n')
+        )
+        comments = (
+            Comment.objects.filter(post=OuterRef('pk'))
+            .order_by().values('post').annotate(n=Count('*')).values('n')
+        )
+        return self.select_related('author').annotate(
+            likes_total=Coalesce(Subquery(likes), 0),
+            comments_total=Coalesce(Subquery(comments), 0),
+        )
+
+    def search(self, query):
+        """Full-text search over title and body, backed by a GIN index on PostgreSQL."""
+        connection = connections[self.db]
+        if connection.vendor != 'postgresql':
+            return self.filter(Q(title__icontains=query) | Q(body__icontains=query))
+        # Spelled out rather than built with SearchVector so it matches the index expression
+        table = connection.ops.quote_name(self.model._meta.db_table)
+        matches = RawSQL(
+            f"to_tsvector('english', {table}.\"title\" || ' ' || {table}.\"body\") "
+            "@@ websearch_to_tsquery('english', %s)",
+            [query], output_field=BooleanField(),
+        )
+        return self.filter(matches)
+
+    def soft_delete(self):
+        """Mark the posts deleted in one UPDATE; purge_deleted() removes them later."""
+        return self.update(deleted_at=timezone.now())
+
+
+class PostManager(models.Manager.from_queryset(PostQuerySet)):
+    """Default manager: soft-deleted posts are left out."""
+
+    def get_queryset(self):
+        return super().get_queryset().filter(deleted_at__isnull=True)
+
+
 class Post(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     title = models.CharField(max_length=200)
@@ -12,19 +59,53 @@ class Post(models.Model):
     likes = models.ManyToManyField(settings.AUTH_USER_MODEL, related_name='liked_posts', blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    deleted_at = models.DateTimeField(null=True, blank=True)
+    
+    objects = PostManager()
+    all_objects = PostQuerySet.as_manager()
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Change feed keyset: /posts/changes/
+            models.Index(fields=['updated_at', 'id'], name='posts_post_updated_id_idx'),
+            # Live posts newest first, and the purge's range scan (PostgreSQL's feed uses posts_post_live_feed)
+            models.Index(fields=['deleted_at', '-created_at'], name='posts_post_live_created_idx'),
+        ]
     
     def __str__(self):
         return self.title
     
     @property
     def likes_count(self):
+        from . import like_buffer
+        if hasattr(self, 'buffered_likes_count'):
+            # Set for a whole page by like_buffer.attach_likes_counts()
+            count = self.buffered_likes_count
+        else:
+            count = like_buffer.get_likes_count(self.pk) if like_buffer.enabled() else None
+        if count is not None:
+            return count
+        if hasattr(self, 'likes_total'):
+            return self.likes_total
         return self.likes.count()
     
     @property
     def comments_count(self):
+        if hasattr(self, 'comments_total'):
+            return self.comments_total
         return self.comments.count()
 
 
+class PostTombstone(models.Model):
+    """Records a deleted post so sync clients can drop it from their cache."""
+    post_id = models.UUIDField()
+    deleted_at = models.DateTimeField(default=timezone.now)
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['deleted_at', 'post_id'], name='posts_tombstone_deleted_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.post_id} deleted at {self.deleted_at}"
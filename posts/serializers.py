@@ -57,22 +57,5 @@ class PostUpdateSerializer(serializers.ModelSerializer):
         return value
 
 
-class PostDetailSerializer(serializers.ModelSerializer):
-    author = serializers.StringRelatedField(read_only=True)
-    author_email = serializers.CharField(source='author.email', read_only=True)
-    
-    @extend_schema_field(serializers.IntegerField)
-    def likes_count(self, obj):
-        return obj.likes_count
-    
-    @extend_schema_field(serializers.IntegerField)
-    def comments_count(self, obj):
-        return obj.comments_count
-    
-    class Meta:
-        model = Post
-        fields = [
-            'id', 'title', 'body', 'cover_photo', 'author', 'author_email',
-            'likes_count', 'comments_count', 'created_at', 'updated_at'
-        ]
-        read_only_fields = ['id', 'author', 'created_at', 'updated_at']
+class PostDetailSerializer(PostSerializer):
+    """Same representation as PostSerializer, documented as its own schema component."""
@@ -0,0 +1,10 @@
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+from .models import Post, PostTombstone
+
+
+@receiver(post_delete, sender=Post)
+def record_tombstone(sender, instance, **kwargs):
+    # Soft-deleted posts got their tombstone when they were soft-deleted
+    if 'deleted_at' in instance.get_deferred_fields() or instance.deleted_at is None:
+        PostTombstone.objects.create(post_id=instance.pk)
@@ -0,0 +1,98 @@
+"""
+Incremental post sync for clients that keep a local copy of the feed.
+
+A cursor is the (timestamp, post id) position of the last change a client
+has applied. Changes are read in that order from Post.updated_at and from
+PostTombstone.deleted_at. Changes younger than POSTS_SYNC_LAG_SECONDS are held
+back, so a transaction that commits after a later-stamped one is not skipped.
+Like and comment counts are not tracked as changes.
+"""
+import base64
+import binascii
+import uuid
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+from .models import Post, PostTombstone
+
+_TIMESTAMP_FORMAT = '%Y%m%dT%H%M%S.%f'
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+class CursorExpired(Exception):
+    pass
+
+
+def encode_cursor(timestamp, post_id):
+    raw = f"{timestamp.astimezone(dt_timezone.utc).strftime(_TIMESTAMP_FORMAT)}|{post_id.hex}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        timestamp, post_id = raw.split('|')
+        return (
+            datetime.strptime(timestamp, _TIMESTAMP_FORMAT).replace(tzinfo=dt_timezone.utc),
+            uuid.UUID(hex=post_id),
+        )
+    except (ValueError, binascii.Error, UnicodeDecodeError):
+        raise InvalidCursor(cursor)
+
+
+def _after(queryset, timestamp_field, id_field, position):
+    timestamp, post_id = position
+    return queryset.filter(
+        Q(**{f'{timestamp_field}__gt': timestamp})
+        | Q(**{timestamp_field: timestamp, f'{id_field}__gt': post_id})
+    )
+
+
+def get_changes(cursor, limit):
+    """
+    Return (posts, deleted_ids, next_cursor, has_more) for up to `limit`
+    changes after `cursor`, or from the beginning if `cursor` is None.
+    """
+    position = decode_cursor(cursor) if cursor else None
+    now = timezone.now()
+    if position and position[0] < now - timedelta(days=settings.POSTS_SYNC_TOMBSTONE_DAYS):
+        raise CursorExpired(cursor)
+
+    until = now - timedelta(seconds=settings.POSTS_SYNC_LAG_SECONDS)
+    posts = Post.objects.with_counts().filter(updated_at__lte=until).order_by('updated_at', 'id')
+    tombstones = (
+        PostTombstone.objects.filter(deleted_at__lte=until)
+        .order_by('deleted_at', 'post_id').values_list('deleted_at', 'post_id')
+    )
+    if position:
+        posts = _after(posts, 'updated_at', 'id', position)
+        tombstones = _after(tombstones, 'deleted_at', 'post_id', position)
+
+    changes = sorted(
+        [(post.updated_at, post.id.hex, post) for post in posts[:limit + 1]]
+        + [(deleted_at, post_id.hex, post_id) for deleted_at, post_id in tombstones[:limit + 1]],
+        key=lambda change: change[:2],
+    )
+    has_more = len(changes) > limit
+    changes = changes[:limit]
+    if changes:
+        timestamp, post_hex, _ = changes[-1]
+        cursor = encode_cursor(timestamp, uuid.UUID(hex=post_hex))
+
+    return (
+        [change for _, _, change in changes if isinstance(change, Post)],
+        [change for _, _, change in changes if isinstance(change, uuid.UUID)],
+        cursor,
+        has_more,
+    )
+
+
+def prune_tombstones():
+    """Delete tombstones older than any cursor get_changes() still accepts."""
+    cutoff = timezone.now() - timedelta(days=settings.POSTS_SYNC_TOMBSTONE_DAYS)
+    return PostTombstone.objects.filter(deleted_at__lt=cutoff).delete()[0]
@@ -0,0 +1,19 @@
+from celery import shared_task
+from . import deletion, like_buffer, sync
+
+
+@shared_task
+def flush_like_buffer():
+    if not like_buffer.enabled():
+        return 0
+    return like_buffer.flush()
+
+
+@shared_task
+def prune_post_tombstones():
+    return sync.prune_tombstones()
+
+
+@shared_task
+def purge_deleted():
+    return deletion.purge_deleted()
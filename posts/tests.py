@@ -0,0 +1,356 @@
+import asyncio
+import uuid
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+import fakeredis
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+from authentication.models import User
+from blog import pubsub
+from comments.models import Comment
+from follows.models import Follow, TimelineEntry
+from blog.local_cache import clear_local_caches
+from . import like_buffer
+from .cache import get_post_detail
+from .deletion import delete_post, purge_deleted, soft_delete_post
+from .events import channel
+from .models import Post, PostTombstone
+from .sync import encode_cursor
+
+
+class PostEventsTests(TransactionTestCase):
+    # Events are published on commit, so requests must really commit
+
+    def setUp(self):
+        self.user = User.objects.create_user(email='reader@example.com', password='Str0ng-pass!')
+        self.post = Post.objects.create(title='Live post', body='A post with live updates', author=self.user)
+        self.other_post = Post.objects.create(title='Other post', body='Another post body', author=self.user)
+        self.access_token = str(RefreshToken.for_user(self.user).access_token)
+        self.api = APIClient()
+        self.api.force_authenticate(self.user)
+        # In process, whether or not REDIS_URL is set
+        self.broker = pubsub.LocalBroker()
+        original, pubsub._broker = pubsub._broker, self.broker
+        self.addCleanup(setattr, pubsub, '_broker', original)
+
+    def events_url(self, post, token=None):
+        url = f'/api/v1/posts/{post.id}/events/'
+        return f'{url}?token={token}' if token else url
+
+    def stream_token(self, post):
+        response = self.api.post(f'/api/v1/posts/{post.id}/events/token/')
+        self.assertEqual(response.status_code, 200)
+        return response.data['token']
+
+    async def open_stream(self, url, **kwargs):
+        response = await self.async_client.get(url, **kwargs)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        stream = response.streaming_content
+        # The subscription is in place once the first chunk is out
+        self.assertTrue((await self.read(stream)).startswith(b'retry: '))
+        return stream
+
+    async def read(self, stream):
+        return await asyncio.wait_for(anext(stream), 5)
+
+    async def disconnect(self, stream):
+        # As the ASGI handler does when the client goes away: cancel the pending read
+        read = asyncio.ensure_future(anext(stream))
+        await asyncio.sleep(0)
+        read.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await read
+        self.assertEqual(self.broker._subscribers, {})
+
+    async def test_streams_new_comments(self):
+        token = await sync_to_async(self.stream_token)(self.post)
+        stream = await self.open_stream(self.events_url(self.post, token))
+
+        response = await sync_to_async(self.api.post)(
+            '/api/v1/comments/', {'post_id': str(self.post.id), 'body': 'A live comment'}, format='json'
+        )
+        self.assertEqual(response.status_code, 201)
+        event = await self.read(stream)
+        self.assertTrue(event.startswith(b'event: comment\ndata: '))
+        self.assertIn(b'A live comment', event)
+        await self.disconnect(stream)
+
+    async def test_header_authentication(self):
+        stream = await self.open_stream(
+            self.events_url(self.post), headers={'Authorization': f'Bearer {self.access_token}'}
+        )
+        await self.disconnect(stream)
+
+    @override_settings(LIVE_EVENTS_QUEUE_SIZE=2)
+    async def test_slow_client_is_sent_resync(self):
+        stream = await self.open_stream(
+            self.events_url(self.post), headers={'Authorization': f'Bearer {self.access_token}'}
+        )
+        for i in range(3):
+            pubsub.publish(channel(self.post.id), 'comment', b'{"body": "comment %d"}' % i)
+        # Let the broker deliver all three before the stream reads any
+        await asyncio.sleep(0)
+        self.assertEqual(await self.read(stream), b'event: resync\ndata: {}\n\n')
+        with self.assertRaises(StopAsyncIteration):
+            await self.read(stream)
+        self.assertEqual(self.broker._subscribers, {})
+
+    async def assertRefused(self, url):
+        response = await self.async_client.get(url)
+        self.assertEqual(response.status_code, 401)
+
+    async def test_stream_token_only_opens_its_post(self):
+        token = await sync_to_async(self.stream_token)(self.post)
+        await self.assertRefused(self.events_url(self.other_post, token))
+
+    async def test_access_token_is_not_a_stream_token(self):
+        await self.assertRefused(self.events_url(self.post, self.access_token))
+
+    @override_settings(LIVE_STREAM_TOKEN_SECONDS=-1)
+    async def test_expired_stream_token_is_refused(self):
+        token = await sync_to_async(self.stream_token)(self.post)
+        await self.assertRefused(self.events_url(self.post, token))
+
+    def test_wsgi_requests_are_refused(self):
+        response = self.client.get(
+            self.events_url(self.post), headers={'Authorization': f'Bearer {self.access_token}'}
+        )
+        self.assertEqual(response.status_code, 501)
+
+
+@override_settings(LIKE_BUFFER_ENABLED=True)
+class LikeBufferTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        clear_local_caches()
+        self.redis = fakeredis.FakeRedis()
+        patcher = mock.patch('posts.like_buffer.get_redis', return_value=self.redis)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.author = User.objects.create_user(email='author@example.com', password='Str0ng-pass!')
+        self.reader = User.objects.create_user(email='reader@example.com', password='Str0ng-pass!')
+        self.post = Post.objects.create(title='Liked post', body='A post people like', author=self.author)
+
+    def likers(self, post):
+        return set(post.likes.values_list('id', flat=True))
+
+    def test_repeated_toggles_leave_one_intent(self):
+        self.assertEqual(like_buffer.toggle_like(self.post.pk, self.reader.pk), (True, 1))
+        self.assertEqual(like_buffer.toggle_like(self.post.pk, self.reader.pk), (False, 0))
+        self.assertEqual(like_buffer.toggle_like(self.post.pk, self.reader.pk), (True, 1))
+        self.assertEqual(self.redis.hlen(like_buffer.PENDING_KEY), 1)
+        # Nothing reaches the database before a flush
+        self.assertEqual(self.likers(self.post), set())
+
+        self.assertEqual(like_buffer.flush(), 1)
+        self.assertEqual(self.likers(self.post), {self.reader.pk})
+        self.assertEqual(like_buffer.flush(), 0)
+        self.assertEqual(self.likers(self.post), {self.reader.pk})
+
+    def test_flush_applies_likes_and_unlikes(self):
+        self.post.likes.add(self.author)
+        like_buffer.toggle_like(self.post.pk, self.author.pk)
+        like_buffer.toggle_like(self.post.pk, self.reader.pk)
+        gone = Post.objects.create(title='Deleted post', body='A post deleted before the flush', author=self.author)
+        like_buffer.toggle_like(gone.pk, self.reader.pk)
+        gone.delete()
+
+        self.assertEqual(like_buffer.flush(), 3)
+        self.assertEqual(self.likers(self.post), {self.reader.pk})
+        self.assertFalse(self.redis.exists(like_buffer.PENDING_KEY, like_buffer.FLUSHING_KEY))
+
+    def test_list_pages_read_buffered_counts_in_one_round_trip(self):
+        other = Post.objects.create(title='Other post', body='Another post people like', author=self.author)
+        like_buffer.toggle_like(self.post.pk, self.reader.pk)
+        like_buffer.toggle_like(other.pk, self.reader.pk)
+        like_buffer.toggle_like(other.pk, self.author.pk)
+
+        api = APIClient()
+        api.force_authenticate(self.reader)
+        with mock.patch.object(self.redis, 'pipeline', wraps=self.redis.pipeline) as pipeline, \
+                mock.patch.object(like_buffer, 'get_likes_count', side_effect=AssertionError("one lookup per post")):
+            response = api.get('/api/v1/posts/')
+        self.assertEqual(pipeline.call_count, 1)
+        counts = {post['title']: post['likes_count'] for post in response.data['results']}
+        self.assertEqual(counts, {'Liked post': 1, 'Other post': 2})
+
+    def test_deleting_a_user_removes_them_from_the_posts_they_liked(self):
+        other = Post.objects.create(title='Other post', body='Another post people like', author=self.author)
+        for post in (self.post, other):
+            like_buffer.toggle_like(post.pk, self.reader.pk)
+        like_buffer.toggle_like(other.pk, self.author.pk)
+
+        like_buffer.discard_user(self.reader.pk)
+        self.assertEqual(like_buffer.get_likes_counts([self.post.pk, other.pk]), {self.post.pk: 0, other.pk: 1})
+        self.assertFalse(self.redis.exists(like_buffer._liked_key(self.reader.pk)))
+
+    def test_rebuild_like_buffer_reloads_counts_from_the_database(self):
+        like_buffer.toggle_like(self.post.pk, self.reader.pk)
+        # Written behind the buffer's back
+        self.post.likes.add(self.author)
+        self.assertEqual(like_buffer.get_likes_count(self.post.pk), 1)
+
+        call_command('rebuild_like_buffer', stdout=StringIO())
+        self.assertEqual(self.likers(self.post), {self.reader.pk, self.author.pk})
+        self.assertEqual(like_buffer.get_likes_count(self.post.pk), 2)
+        self.assertEqual(self.redis.smembers(like_buffer._liked_key(self.author.pk)), {str(self.post.pk).encode()})
+
+
+class DeletionTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        clear_local_caches()
+        self.author = User.objects.create_user(email='author@example.com', password='Str0ng-pass!')
+        self.leaving = User.objects.create_user(email='leaving@example.com', password='Str0ng-pass!')
+        self.post = Post.objects.create(title='Staying post', body='A post that stays', author=self.author)
+
+    def test_delete_user_removes_their_rows_and_refreshes_counts(self):
+        own_post = Post.objects.create(title='Leaving post', body='A post that goes', author=self.leaving)
+        Comment.objects.create(post=own_post, body='A comment on it', author=self.author)
+        Comment.objects.create(post=self.post, body='A comment that goes', author=self.leaving)
+        self.post.likes.add(self.leaving)
+        Follow.objects.create(follower=self.leaving, followee=self.author)
+        User.objects.filter(pk=self.author.pk).update(followers_count=1)
+        before = get_post_detail(self.post.pk)
+        self.assertEqual((before['likes_count'], before['comments_count']), (1, 1))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('delete_user', 'leaving@example.com', stdout=StringIO())
+
+        self.assertFalse(User.objects.filter(pk=self.leaving.pk).exists())
+        self.assertFalse(Post.all_objects.filter(pk=own_post.pk).exists())
+        self.assertEqual(Comment.all_objects.count(), 0)
+        self.author.refresh_from_db()
+        self.assertEqual(self.author.followers_count, 0)
+        after = get_post_detail(self.post.pk)
+        self.assertEqual((after['likes_count'], after['comments_count']), (0, 0))
+
+    def test_delete_user_needs_an_existing_email(self):
+        with self.assertRaisesMessage(CommandError, 'No user with email nobody@example.com'):
+            call_command('delete_user', 'nobody@example.com')
+
+    @override_settings(SOFT_DELETE_RETENTION_DAYS=30)
+    def test_purge_deleted_only_purges_rows_past_the_retention_period(self):
+        expired = Post.objects.create(title='Expired post', body='Deleted long ago', author=self.author)
+        recent = Post.objects.create(title='Recent post', body='Deleted just now', author=self.author)
+        Comment.objects.create(post=expired, body='On the expired post', author=self.leaving)
+        old_comment = Comment.objects.create(post=self.post, body='Deleted long ago', author=self.leaving)
+        new_comment = Comment.objects.create(post=self.post, body='Deleted just now', author=self.leaving)
+        long_ago = timezone.now() - timedelta(days=31)
+        Post.all_objects.filter(pk=expired.pk).update(deleted_at=long_ago)
+        Post.all_objects.filter(pk=recent.pk).update(deleted_at=timezone.now() - timedelta(days=29))
+        Comment.all_objects.filter(pk=old_comment.pk).update(deleted_at=long_ago)
+        Comment.all_objects.filter(pk=new_comment.pk).update(deleted_at=timezone.now())
+
+        purge_deleted()
+        self.assertEqual(
+            set(Post.all_objects.values_list('title', flat=True)), {'Staying post', 'Recent post'}
+        )
+        self.assertEqual(set(Comment.all_objects.values_list('pk', flat=True)), {new_comment.pk})
+
+    def test_deleting_a_post_soft_deletes_it_with_its_comments(self):
+        comment = Comment.objects.create(post=self.post, body='A comment on it', author=self.leaving)
+        other = Post.objects.create(title='Other post', body='A post that stays too', author=self.author)
+        Comment.objects.create(post=other, body='Another comment', author=self.leaving)
+        TimelineEntry.objects.create(user=self.leaving, post=self.post, created_at=self.post.created_at)
+        api = APIClient()
+        api.force_authenticate(self.author)
+
+        self.assertEqual(api.delete(f'/api/v1/posts/{self.post.pk}/').status_code, 204)
+        self.assertFalse(Post.objects.filter(pk=self.post.pk).exists())
+        self.assertIsNotNone(Post.all_objects.get(pk=self.post.pk).deleted_at)
+        self.assertFalse(Comment.objects.filter(pk=comment.pk).exists())
+        self.assertIsNotNone(Comment.all_objects.get(pk=comment.pk).deleted_at)
+        self.assertFalse(TimelineEntry.objects.filter(post_id=self.post.pk).exists())
+        self.assertTrue(PostTombstone.objects.filter(post_id=self.post.pk).exists())
+        self.assertEqual(api.get(f'/api/v1/posts/{self.post.pk}/').status_code, 404)
+
+        # Soft-deleted comments are not counted either
+        Comment.objects.filter(post=other).soft_delete()
+        self.assertEqual(Post.objects.with_counts().get(pk=other.pk).comments_total, 0)
+
+    @override_settings(DELETE_BATCH_SIZE=2)
+    def test_hard_delete_removes_dependent_rows_in_batches(self):
+        readers = [
+            User.objects.create_user(email=f'reader{i}@example.com', password='Str0ng-pass!') for i in range(5)
+        ]
+        self.post.likes.add(*readers)
+        for reader in readers:
+            Comment.objects.create(post=self.post, body='A comment', author=reader).likes.add(self.author)
+
+        post_id = self.post.pk
+        with CaptureQueriesContext(connection) as queries:
+            delete_post(self.post)
+        comment_deletes = [
+            query for query in queries if query['sql'].startswith('DELETE FROM "comments_comment" WHERE')
+        ]
+        # Five rows, two at a time
+        self.assertEqual(len(comment_deletes), 3)
+        self.assertFalse(Post.all_objects.filter(pk=post_id).exists())
+        self.assertEqual(Comment.all_objects.count(), 0)
+        self.assertEqual(Comment.likes.through.objects.count(), 0)
+        self.assertEqual(Post.likes.through.objects.count(), 0)
+        self.assertTrue(PostTombstone.objects.filter(post_id=post_id).exists())
+
+
+@override_settings(POSTS_SYNC_LAG_SECONDS=0, POSTS_SYNC_TOMBSTONE_DAYS=30)
+class PostChangesTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        clear_local_caches()
+        self.author = User.objects.create_user(email='author@example.com', password='Str0ng-pass!')
+        self.api = APIClient()
+        self.api.force_authenticate(self.author)
+        self.posts = [
+            Post.objects.create(title=f'Post {i}', body='A post to sync', author=self.author) for i in range(3)
+        ]
+
+    def changes(self, since=None, limit=2):
+        params = {'limit': limit, **({'since': since} if since else {})}
+        response = self.api.get('/api/v1/posts/changes/', params)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_cursor_pages_through_changes(self):
+        first = self.changes()
+        self.assertEqual([post['title'] for post in first['posts']], ['Post 0', 'Post 1'])
+        self.assertTrue(first['has_more'])
+        second = self.changes(first['cursor'])
+        self.assertEqual([post['title'] for post in second['posts']], ['Post 2'])
+        self.assertEqual((second['deleted'], second['has_more']), ([], False))
+
+        # Caught up: nothing new, and the cursor stays where it was
+        self.assertEqual(self.changes(second['cursor']), {
+            'posts': [], 'deleted': [], 'cursor': second['cursor'], 'has_more': False,
+        })
+
+        soft_delete_post(self.posts[0])
+        updated = self.posts[1]
+        updated.title = 'Post 1 updated'
+        updated.save()
+        third = self.changes(second['cursor'])
+        self.assertEqual(third['deleted'], [str(self.posts[0].pk)])
+        self.assertEqual([post['title'] for post in third['posts']], ['Post 1 updated'])
+
+    @override_settings(POSTS_SYNC_LAG_SECONDS=60)
+    def test_recent_changes_are_held_back(self):
+        self.assertEqual(self.changes(), {'posts': [], 'deleted': [], 'cursor': None, 'has_more': False})
+
+    def test_cursor_older_than_the_tombstones_is_gone(self):
+        cursor = encode_cursor(timezone.now() - timedelta(days=31), uuid.uuid4())
+        response = self.api.get('/api/v1/posts/changes/', {'since': cursor})
+        self.assertEqual(response.status_code, 410)
+
+    def test_invalid_cursor_and_limit_are_refused(self):
+        for params in ({'since': 'not-a-cursor'}, {'limit': 0}, {'limit': 'many'}):
+            self.assertEqual(self.api.get('/api/v1/posts/changes/', params).status_code, 400, params)
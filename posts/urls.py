@@ -1,9 +1,12 @@
 from django.urls import path
-from . import views
+from . import events, views
 
 urlpatterns = [
     path('', views.PostListView.as_view(), name='post-list'),
+    path('changes/', views.PostChangesView.as_view(), name='post-changes'),
     path('<uuid:post_id>/', views.PostDetailView.as_view(), name='post-detail'),
     path('<uuid:post_id>/like/', views.PostLikeView.as_view(), name='post-like'),
     path('<uuid:post_id>/likes/', views.PostLikesListView.as_view(), name='post-likes-list'),
+    path('<uuid:post_id>/events/', events.post_events_view, name='post-events'),
+    path('<uuid:post_id>/events/token/', views.PostEventsTokenView.as_view(), name='post-events-token'),
 ]
@@ -2,16 +2,28 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.permissions import IsAuthenticated
-from rest_framework.pagination import PageNumberPagination
-from drf_spectacular.utils import extend_schema
+from drf_spectacular.utils import extend_schema, OpenApiParameter
+from drf_spectacular.types import OpenApiTypes
+from django.conf import settings
+from django.http import Http404
 from django.shortcuts import get_object_or_404
+from django.db import transaction
 from .models import Post
+from . import events, like_buffer, sync
+from .cache import feed_key, get_post_detail, invalidate_feed, invalidate_post
+from .deletion import soft_delete_post
 from .serializers import (
     PostSerializer, PostCreateSerializer, PostUpdateSerializer, PostDetailSerializer
 )
+from follows.tasks import fan_out_post
+from blog.cache_fill import get_or_fill
+from blog.database import toggle_row
+from blog.fast_serializers import compile_serializer
+from blog.pagination import ApproximateCountPagination
+from blog.streaming import StreamingJSONResponse, can_stream
 
 
-class PostPagination(PageNumberPagination):
+class PostPagination(ApproximateCountPagination):
     page_size = 10
     page_size_query_param = 'page_size'
     max_page_size = 100
@@ -25,23 +37,58 @@ class PostListView(APIView):
         tags=['Posts'],
         summary="List all posts",
         description="Get a paginated list of all blog posts",
+        parameters=[
+            OpenApiParameter(
+                name='search',
+                type=OpenApiTypes.STR,
+                location=OpenApiParameter.QUERY,
+                description='Full-text search over title and body',
+                required=False
+            ),
+            OpenApiParameter(
+                name='exact_count',
+                type=OpenApiTypes.BOOL,
+                location=OpenApiParameter.QUERY,
+                description='Compute an exact total count instead of a cached or estimated one',
+                required=False
+            )
+        ],
         responses={
             200: PostSerializer(many=True),
             401: "Unauthorized"
         }
     )
     def get(self, request):
-        posts = Post.objects.all()
+        search = request.query_params.get('search', '').strip()
+        if not search and settings.FEED_CACHE_SECONDS and self.is_first_page(request):
+            # The same for every user, and never served stale for longer than it is cached
+            data = get_or_fill(
+                'feed',
+                feed_key(request),
+                lambda: self.list_posts(request, search).data,
+                settings.FEED_CACHE_SECONDS,
+                stale=settings.FEED_CACHE_SECONDS,
+            )
+            return Response(data)
+        return self.list_posts(request, search)
+    
+    def is_first_page(self, request):
+        params = request.query_params
+        return set(params) <= {'page', 'page_size'} and params.get('page', '1') == '1'
+    
+    def list_posts(self, request, search):
+        posts = Post.objects.with_counts()
+        if search:
+            posts = posts.search(search)
         
         paginator = self.pagination_class()
         page = paginator.paginate_queryset(posts, request)
         
         if page is not None:
-            serializer = PostSerializer(page, many=True)
-            return paginator.get_paginated_response(serializer.data)
+            like_buffer.attach_likes_counts(page)
+            return paginator.get_paginated_response(compile_serializer(PostSerializer).many(page))
         
-        serializer = PostSerializer(posts, many=True)
-        return Response(serializer.data)
+        return Response(compile_serializer(PostSerializer).many(posts))
     
     @extend_schema(
         tags=['Posts'],
@@ -58,11 +105,86 @@ class PostListView(APIView):
         serializer = PostCreateSerializer(data=request.data)
         if serializer.is_valid():
             post = serializer.save(author=request.user)
+            transaction.on_commit(lambda: fan_out_post.delay(str(post.id)))
+            invalidate_feed()
+            # A new post has no likes or comments yet
+            post.likes_total = post.comments_total = 0
             response_serializer = PostSerializer(post)
             return Response(response_serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+class PostChangesView(APIView):
+    permission_classes = [IsAuthenticated]
+    default_limit = 100
+    max_limit = 500
+    
+    @extend_schema(
+        tags=['Posts'],
+        summary="Post changes since a cursor",
+        description=(
+            "Posts created or updated and ids of posts deleted since `since`, oldest first. "
+            "Omit `since` to start from the beginning, then pass the returned cursor on the next call. "
+            "Fetch again while `has_more` is true."
+        ),
+        parameters=[
+            OpenApiParameter(
+                name='since',
+                type=OpenApiTypes.STR,
+                location=OpenApiParameter.QUERY,
+                description='Cursor returned by the previous call',
+                required=False
+            ),
+            OpenApiParameter(
+                name='limit',
+                type=OpenApiTypes.INT,
+                location=OpenApiParameter.QUERY,
+                description='Maximum number of changes (default 100, max 500)',
+                required=False
+            )
+        ],
+        responses={
+            200: {
+                'type': 'object',
+                'properties': {
+                    'posts': {'type': 'array', 'items': {'type': 'object'}},
+                    'deleted': {'type': 'array', 'items': {'type': 'string', 'format': 'uuid'}},
+                    'cursor': {'type': 'string', 'nullable': True},
+                    'has_more': {'type': 'boolean'}
+                }
+            },
+            400: "Invalid cursor or limit",
+            410: "Cursor too old; fetch the feed again",
+            401: "Unauthorized"
+        }
+    )
+    def get(self, request):
+        try:
+            limit = min(int(request.query_params.get('limit', self.default_limit)), self.max_limit)
+        except ValueError:
+            limit = 0
+        if limit < 1:
+            return Response({'error': 'limit must be a positive integer'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        try:
+            posts, deleted, cursor, has_more = sync.get_changes(request.query_params.get('since'), limit)
+        except sync.InvalidCursor:
+            return Response({'error': 'Invalid cursor'}, status=status.HTTP_400_BAD_REQUEST)
+        except sync.CursorExpired:
+            return Response(
+                {'error': 'Cursor is too old; fetch the feed again'},
+                status=status.HTTP_410_GONE
+            )
+        
+        like_buffer.attach_likes_counts(posts)
+        return Response({
+            'posts': compile_serializer(PostSerializer).many(posts),
+            'deleted': [str(post_id) for post_id in deleted],
+            'cursor': cursor,
+            'has_more': has_more
+        })
+
+
 class PostDetailView(APIView):
     permission_classes = [IsAuthenticated]
     
@@ -77,9 +199,10 @@ class PostDetailView(APIView):
         }
     )
     def get(self, request, post_id):
-        post = get_object_or_404(Post, id=post_id)
-        serializer = PostDetailSerializer(post)
-        return Response(serializer.data)
+        data = get_post_detail(post_id)
+        if data is None:
+            raise Http404("No Post matches the given query.")
+        return Response(data)
     
     @extend_schema(
         tags=['Posts'],
@@ -95,9 +218,9 @@ class PostDetailView(APIView):
         }
     )
     def put(self, request, post_id):
-        post = get_object_or_404(Post, id=post_id)
+        post = get_object_or_404(Post.objects.with_counts(), id=post_id)
         
-        if post.author != request.user:
+        if post.author_id != request.user.pk:
             return Response(
                 {'error': 'You can only edit your own posts'}, 
                 status=status.HTTP_403_FORBIDDEN
@@ -106,6 +229,8 @@ class PostDetailView(APIView):
         serializer = PostUpdateSerializer(post, data=request.data, partial=True)
         if serializer.is_valid():
             serializer.save()
+            invalidate_post(post.pk)
+            invalidate_feed()
             response_serializer = PostSerializer(post)
             return Response(response_serializer.data)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
@@ -122,21 +247,22 @@ class PostDetailView(APIView):
         }
     )
     def delete(self, request, post_id):
-        post = get_object_or_404(Post, id=post_id)
+        post = get_object_or_404(Post.objects.only('id', 'author_id'), id=post_id)
         
-        if post.author != request.user:
+        if post.author_id != request.user.pk:
             return Response(
                 {'error': 'You can only delete your own posts'}, 
                 status=status.HTTP_403_FORBIDDEN
             )
         
-        post.delete()
+        soft_delete_post(post)
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
 class PostLikeView(APIView):
     permission_classes = [IsAuthenticated]
     serializer_class = None
+    throttle_scope = 'likes'
     
     @extend_schema(
         tags=['Likes'],
@@ -156,21 +282,28 @@ class PostLikeView(APIView):
         }
     )
     def post(self, request, post_id):
-        post = get_object_or_404(Post, id=post_id)
+        post = get_object_or_404(Post.objects.only('id'), id=post_id)
         
-        if request.user in post.likes.all():
-            post.likes.remove(request.user)
-            liked = False
-            message = "Post unliked successfully"
-        else:
-            post.likes.add(request.user)
-            liked = True
-            message = "Post liked successfully"
+        if like_buffer.enabled():
+            liked, likes_count = like_buffer.toggle_like(post.pk, request.user.pk)
+            invalidate_post(post.pk)
+            events.publish_post_likes(post.pk, likes_count)
+            return Response({
+                'message': "Post liked successfully" if liked else "Post unliked successfully",
+                'liked': liked,
+                'likes_count': likes_count
+            })
+        
+        liked = toggle_row(Post.likes.through, post_id=post.pk, user_id=request.user.pk)
+        message = "Post liked successfully" if liked else "Post unliked successfully"
+        likes_count = post.likes_count
+        invalidate_post(post.pk)
+        events.publish_post_likes(post.pk, likes_count)
         
         return Response({
             'message': message,
             'liked': liked,
-            'likes_count': post.likes_count
+            'likes_count': likes_count
         })
 
 
@@ -207,21 +340,61 @@ class PostLikesListView(APIView):
         }
     )
     def get(self, request, post_id):
-        post = get_object_or_404(Post, id=post_id)
-        
-        likes_data = []
-        for user in post.likes.all():
-            likes_data.append({
+        post = get_object_or_404(Post.objects.only('id', 'created_at'), id=post_id)
+        liked_at = post.created_at.isoformat()
+        users = post.likes.only('id', 'email', 'first_name', 'last_name')
+        rows = (
+            {
                 'id': str(user.id),
                 'email': user.email,
                 'first_name': user.first_name,
                 'last_name': user.last_name,
-                'liked_at': post.created_at.isoformat()
-            })
-        
+                'liked_at': liked_at
+            }
+            for user in users.iterator(chunk_size=settings.STREAMING_JSON_CHUNK_SIZE)
+        )
+        if can_stream(request):
+            return StreamingJSONResponse(
+                rows, request.accepted_renderer,
+                envelope={'likes_count': users.count()}, key='liked_by'
+            )
+
+        likes_data = list(rows)
         return Response({
-            'likes_count': post.likes_count,
+            'likes_count': len(likes_data),
             'liked_by': likes_data
         })
 
 
+
+
+class PostEventsTokenView(APIView):
+    permission_classes = [IsAuthenticated]
+    serializer_class = None
+    
+    @extend_schema(
+        tags=['Posts'],
+        summary="Get a live updates token",
+        description=(
+            "Get a short-lived token that opens this post's event stream as `?token=`, "
+            "for clients such as EventSource that cannot send an Authorization header"
+        ),
+        request=None,
+        responses={
+            200: {
+                'type': 'object',
+                'properties': {
+                    'token': {'type': 'string'},
+                    'expires_in': {'type': 'integer'}
+                }
+            },
+            404: "Post not found",
+            401: "Unauthorized"
+        }
+    )
+    def post(self, request, post_id):
+        post = get_object_or_404(Post.objects.only('id'), id=post_id)
+        return Response({
+            'token': events.make_stream_token(request.user.pk, post.pk),
+            'expires_in': settings.LIVE_STREAM_TOKEN_SECONDS
+        })
@@ -6,5 +6,5 @@ python manage.py collectstatic --noinput
 # Run migrations
 python manage.py migrate
 
-# Start gunicorn
-exec gunicorn --bind 0.0.0.0:80 --workers 3 --timeout 120 --keep-alive 2 --max-requests 1000 --max-requests-jitter 100 blog.wsgi:application
+# Start gunicorn (settings in gunicorn.conf.py)
+exec gunicorn --config gunicorn.conf.py